@@ -0,0 +1,78 @@
+# benchmarks/bench_compare.py
+# draco_similarity.compare on synthetic document pairs of growing size, and
+# how many of the planted edits it recovers.
+#
+# Document B is A with 10% of sentences deleted, 10% new ones added, 20%
+# with one word replaced and 10% with their words shuffled (paraphrase
+# stand-in); the rest are unchanged. An all-pairs Jaccard scan is timed at
+# small sizes for reference.
+#
+#   python benchmarks/bench_compare.py [max_sentences]
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import draco_similarity  # noqa: E402
+
+
+def make_pair(n, seed=11):
+    rng = random.Random(seed)
+    vocab = ["w%s" % "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 8)))
+             for _ in range(30000)]
+    weights = [1.0 / (r + 1) ** 0.8 for r in range(len(vocab))]
+
+    def sentence():
+        return " ".join(rng.choices(vocab, weights, k=rng.randint(10, 24))).capitalize() + "."
+
+    a = [sentence() for _ in range(n)]
+    b, planted = [], {"edited": 0, "shuffled": 0}
+    for s in a:
+        r = rng.random()
+        if r < 0.10:
+            continue
+        words = s[:-1].split()
+        if r < 0.30:
+            words[rng.randrange(len(words))] = rng.choice(vocab)
+            planted["edited"] += 1
+        elif r < 0.40:
+            rng.shuffle(words)
+            planted["shuffled"] += 1
+        b.append(" ".join(words) + ".")
+        if rng.random() < 0.11:
+            b.append(sentence())
+    return a, b, planted
+
+
+def all_pairs(a, b):
+    sa = [draco_similarity.features(s) for s in a]
+    sb = [draco_similarity.features(s) for s in b]
+    return sum(1 for x in sa for y in sb if draco_similarity.score(x, y) >= draco_similarity.SIMILAR)
+
+
+def main():
+    top = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    sizes = [n for n in (500, 2000, 10000, 50000, 200000) if n <= top]
+    print(f"{'sentences':>10} {'compare s':>10} {'us/sent':>8} {'all-pairs s':>12} "
+          f"{'identical':>10} {'near-dup':>9} {'similar':>8} {'planted':>8} {'score':>6}")
+    for n in sizes:
+        a, b, planted = make_pair(n)
+        t = time.perf_counter()
+        res = draco_similarity.compare(a, b)
+        took = time.perf_counter() - t
+        ap = ""
+        if n <= 2000:
+            t = time.perf_counter()
+            all_pairs(a, b)
+            ap = f"{time.perf_counter() - t:.2f}"
+        kinds = {"identical": 0, "near_duplicate": 0, "similar": 0}
+        for p in res["pairs"]:
+            kinds[p["kind"]] += 1
+        print(f"{n:>10} {took:>10.3f} {took / (len(a) + len(b)) * 1e6:>8.1f} {ap:>12} "
+              f"{kinds['identical']:>10} {kinds['near_duplicate']:>9} {kinds['similar']:>8} "
+              f"{planted['edited'] + planted['shuffled']:>8} {res['similarity']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/bench_extract.py
+# DOCX/PPTX text extraction: the streaming lxml iterparse extractors in
+# draco_extract against the python-docx / python-pptx object model they
+# replaced.
+#
+# Each extraction runs in a forked child and its blocks are consumed as
+# they are produced (the object model builds its list first). Peak RSS is
+# the child's maximum resident set (os.wait4) minus that of a child which
+# extracts nothing. Linux/macOS only.
+#
+#   python benchmarks/bench_extract.py [paragraphs] [slides]
+import os
+import sys
+import time
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import draco_extract  # noqa: E402
+from docx import Document  # noqa: E402
+from pptx import Presentation  # noqa: E402
+from pptx.util import Inches  # noqa: E402
+
+
+def object_model_docx(path):
+    return [p.text for p in Document(path).paragraphs if p.text.strip()]
+
+
+def object_model_pptx(path):
+    out = []
+    for slide in Presentation(path).slides:
+        for shape in slide.shapes:
+            if hasattr(shape, "text") and (shape.text or "").strip():
+                out.append(shape.text)
+    return out
+
+
+def make_docx(path, n, rng):
+    words = "light energy plant cell water carbon process green leaf model data report result".split()
+    d = Document()
+    for i in range(n):
+        d.add_paragraph(" ".join(rng.choice(words) for _ in range(rng.randint(8, 30))).capitalize() + ".")
+        if i % 500 == 499:
+            t = d.add_table(rows=6, cols=4)
+            for cell in t._cells:
+                cell.text = rng.choice(words)
+    d.save(path)
+
+
+def make_pptx(path, n, rng):
+    words = "light energy plant cell water carbon process green leaf model data report result".split()
+    prs = Presentation()
+    for i in range(n):
+        s = prs.slides.add_slide(prs.slide_layouts[1])
+        s.shapes.title.text = f"Slide {i}"
+        s.placeholders[1].text = "\n".join(" ".join(rng.choice(words) for _ in range(12)) for _ in range(5))
+        s.notes_slide.notes_text_frame.text = " ".join(rng.choice(words) for _ in range(40))
+        if i % 10 == 0:
+            t = s.shapes.add_table(4, 3, Inches(1), Inches(5), Inches(6), Inches(1.5)).table
+            for r in range(4):
+                for c in range(3):
+                    t.cell(r, c).text = rng.choice(words)
+    prs.save(path)
+
+
+def measure(fn, path):
+    """(seconds, peak RSS in MB, characters) of fn(path) in a forked child."""
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(r)
+        t = time.perf_counter()
+        chars = sum(len(b) for b in fn(path)) if fn else 0
+        os.write(w, f"{time.perf_counter() - t} {chars}".encode())
+        os._exit(0)
+    os.close(w)
+    data = os.read(r, 100).decode().split()
+    os.close(r)
+    _, _, ru = os.wait4(pid, 0)
+    scale = 1024 if sys.platform != "darwin" else 1
+    return float(data[0]), ru.ru_maxrss * scale / 1e6, int(data[1])
+
+
+def main():
+    paras = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    slides = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    rng = random.Random(5)
+    tmp = tempfile.mkdtemp()
+    docx_path = os.path.join(tmp, "big.docx")
+    pptx_path = os.path.join(tmp, "big.pptx")
+    make_docx(docx_path, paras, rng)
+    make_pptx(pptx_path, slides, rng)
+    _, base, _ = measure(None, docx_path)
+    print(f"docx: {paras} paragraphs, {os.path.getsize(docx_path) / 1e6:.1f} MB; "
+          f"pptx: {slides} slides, {os.path.getsize(pptx_path) / 1e6:.1f} MB")
+    print(f"{'extractor':<30} {'seconds':>8} {'peak MB':>8} {'chars':>10}")
+    for label, fn, path in (
+        ("docx object model", object_model_docx, docx_path),
+        ("docx iterparse", draco_extract.iter_docx_blocks, docx_path),
+        ("pptx object model", object_model_pptx, pptx_path),
+        ("pptx iterparse (+notes)", draco_extract.iter_pptx_blocks, pptx_path),
+    ):
+        took, peak, chars = measure(fn, path)
+        print(f"{label:<30} {took:>8.3f} {max(0.0, peak - base):>8.1f} {chars:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/bench_pdf.py
+# PDF reports: core Helvetica with clean_unicode (the previous output, and
+# still the fallback without a TrueType font) against the embedded Unicode
+# font path, cold (font metrics parsed) and warm (metrics cached in-process).
+#
+# "lost" counts characters of the input that come out as "?" in the text
+# extracted back from the PDF. Set DRACO_PDF_FONT (and _BOLD /
+# DRACO_PDF_FALLBACK_FONTS) to try other fonts.
+#
+#   python benchmarks/bench_pdf.py [repeats]
+import io
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import draco_render  # noqa: E402
+from PyPDF2 import PdfReader  # noqa: E402
+
+LATIN = "photosynthesis light energy plant cell water carbon process green leaf model data report".split()
+MIXED = ["Energy — “E = mc²” → ∑ x² ≤ ∞ (résumé, naïve, 5 × 3 ÷ 2 ≈ π)",
+         "नमस्ते दुनिया, यह प्रकाश संश्लेषण पर एक रिपोर्ट है।",
+         "Progress ✓ ★ ☀ — emoji 😀 🚀",
+         "Ελληνικά και Кириллица: α β γ, Привет мир"]
+
+
+def documents(rng):
+    words = lambda n: " ".join(rng.choice(LATIN) for _ in range(n)).capitalize() + "."  # noqa: E731
+    return {
+        "latin, 10 paragraphs": [words(60) for _ in range(10)],
+        "latin, 400 paragraphs": [words(90) for _ in range(400)],
+        "mixed scripts, 40 paragraphs": [MIXED[i % len(MIXED)] + " " + words(30) for i in range(40)],
+    }
+
+
+def render(paragraphs, fonts):
+    buf = io.BytesIO()
+    t = time.perf_counter()
+    draco_render.render_pdf("Benchmark report", paragraphs, buf, fonts=fonts)
+    return time.perf_counter() - t, buf.getvalue()
+
+
+def lost(paragraphs, data):
+    text = "".join(p.extract_text() or "" for p in PdfReader(io.BytesIO(data)).pages)
+    return max(0, text.count("?") - sum(p.count("?") for p in paragraphs))
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    stack = draco_render.pdf_fonts()
+    print("fonts:", ", ".join(os.path.basename(r) for r, _ in stack) or "none found (Helvetica only)")
+    print(f"{'document':<30} {'output':<14} {'ms':>8} {'KB':>8} {'lost':>6}")
+    for label, paras in documents(random.Random(3)).items():
+        runs = [("helvetica", [])]
+        if stack:
+            runs += [("ttf cold", stack), ("ttf warm", stack)]
+        for name, fonts in runs:
+            if name == "ttf cold":
+                draco_render._ttf_metrics.clear()
+                took, data = render(paras, fonts)
+            else:
+                took, data = min(render(paras, fonts) for _ in range(repeats))
+            print(f"{label:<30} {name:<14} {took * 1000:>8.1f} {len(data) / 1024:>8.1f} {lost(paras, data):>6}")
+
+
+if __name__ == "__main__":
+    main()
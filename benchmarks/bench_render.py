@@ -0,0 +1,70 @@
+# benchmarks/bench_render.py
+# Render throughput and event-loop responsiveness: in-process threads vs the
+# draco_render worker pool.
+#
+# A heartbeat thread sleeps 5 ms in a loop and records how late it wakes up;
+# that lateness is what a websocket handler would see while documents render.
+#
+#   python benchmarks/bench_render.py [jobs] [concurrency]
+import os
+import sys
+import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import draco_render  # noqa: E402
+
+TICK = 0.005
+
+
+def make_specs(n, out_dir, tag):
+    para = ("Photosynthesis converts light energy into chemical energy. "
+            "Chlorophyll absorbs mostly blue and red light. ") * 6
+    kinds = ["pptx", "pdf", "docx"]
+    return [{"kind": kinds[i % 3], "title": f"Bench {tag} {i}", "bullets": [para] * 24,
+             "sources": ["https://example.org"], "out_dir": out_dir} for i in range(n)]
+
+
+def heartbeat(stop, lags):
+    while not stop.is_set():
+        t = time.perf_counter()
+        time.sleep(TICK)
+        lags.append(time.perf_counter() - t - TICK)
+
+
+def run(label, fn, specs, concurrency):
+    stop = threading.Event()
+    lags = []
+    hb = threading.Thread(target=heartbeat, args=(stop, lags), daemon=True)
+    hb.start()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as ex:
+        list(ex.map(fn, specs))
+    took = time.perf_counter() - t0
+    stop.set()
+    hb.join()
+    lags.sort()
+    p50 = lags[len(lags) // 2] * 1000
+    p99 = lags[int(len(lags) * 0.99)] * 1000
+    print(f"{label:<12} {len(specs) / took:6.1f} docs/s  heartbeat lag p50 {p50:6.2f} ms"
+          f"  p99 {p99:7.2f} ms  max {lags[-1] * 1000:7.2f} ms")
+
+
+def main():
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    with tempfile.TemporaryDirectory() as out_dir:
+        # distinct titles per run: render() would otherwise reuse the artifacts
+        run("in-process", draco_render.render_local, make_specs(jobs, out_dir, "local"), concurrency)
+        if draco_render.get_pool() is None:
+            print("worker pool unavailable on this platform")
+            return
+        specs = make_specs(jobs, out_dir, "pool")
+        draco_render.render(dict(specs[0], title="warm-up"))  # start the workers
+        run("pool", draco_render.render, specs, concurrency)
+
+
+if __name__ == "__main__":
+    main()
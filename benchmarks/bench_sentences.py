@@ -0,0 +1,77 @@
+# benchmarks/bench_sentences.py
+# Sentence splitting throughput on a large document: the shared draco_text
+# tokenizer against the two splitters it replaced (the naive regex in
+# main.py and the abbreviation-merging splitter rebuilt per PPTX render).
+#
+#   python benchmarks/bench_sentences.py [megabytes]
+import os
+import re
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import draco_text  # noqa: E402
+
+
+def old_naive(text):
+    parts = re.split(r"(?<=[.!?])\s+", text.strip())
+    return [p.strip() for p in parts if p and len(p.strip()) > 3]
+
+
+def old_pptx(text):
+    raw = [s.strip() for s in re.split(r"(?<=[.!?۔؟！。]|।)\s+", text) if s.strip()]
+    abbr = {"e.g.", "i.e.", "etc.", "mr.", "mrs.", "ms.", "dr.", "prof.", "sr.", "jr.", "vs.", "no.", "fig.", "al.", "u.s.", "u.k.", "dept.",
+            "inc.", "ltd.", "co.", "est.", "approx.", "misc.", "ref.", "ed.", "pp.", "vol.", "jan.", "feb.", "mar.", "apr.", "jun.", "jul.", "aug.", "sep.", "oct.", "nov.", "dec."}
+    merged = []
+    for seg in raw:
+        if merged and (merged[-1].lower().endswith(tuple(abbr)) or len(merged[-1]) <= 2 or re.search(r"\b[A-Z]\.\s*$", merged[-1])):
+            merged[-1] = (merged[-1] + " " + seg).strip()
+        else:
+            merged.append(seg)
+    return merged
+
+
+def make_text(mb, seed=3):
+    rng = random.Random(seed)
+    words = "the light energy plant cell water carbon process green leaf model data report result".split()
+    extras = ["Dr. Smith", "e.g. this", "the U.S. market", "Fig. 2", "J. Doe", "3.5 percent", "approx. ten"]
+    out, size = [], 0
+    while size < mb * 1024 * 1024:
+        n = rng.randint(6, 22)
+        s = " ".join(rng.choice(words) for _ in range(n))
+        if rng.random() < 0.2:
+            s += " " + rng.choice(extras) + " " + rng.choice(words)
+        s = s.capitalize() + rng.choice([".", ".", ".", "?", "!"])
+        if rng.random() < 0.05:
+            s += "\n\n"
+        out.append(s)
+        size += len(s) + 1
+    return " ".join(out)
+
+
+def bench(label, fn, text):
+    t = time.perf_counter()
+    n = len(fn(text))
+    took = time.perf_counter() - t
+    print(f"{label:<28} {took:7.3f} s  {len(text) / took / 1e6:6.1f} MB/s  {n} sentences")
+
+
+def main():
+    mb = float(sys.argv[1]) if len(sys.argv) > 1 else 8
+    text = make_text(mb)
+    print(f"document: {len(text) / 1e6:.1f} MB")
+    bench("naive regex (old)", old_naive, text)
+    bench("pptx abbreviation (old)", old_pptx, text)
+    bench("draco_text.split_sentences", lambda t: draco_text.split_sentences(t), text)
+    bench("draco_text.iter_sentences", lambda t: list(draco_text.iter_sentences(t)), text)
+    para = text[:200000]
+    draco_text.split_sentences(para)
+    t = time.perf_counter()
+    for _ in range(1000):
+        draco_text.split_sentences(para)
+    print(f"memoized repeat (200 KB)     {(time.perf_counter() - t) * 1000:7.3f} us/call")
+
+
+if __name__ == "__main__":
+    main()
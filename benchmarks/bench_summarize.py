@@ -0,0 +1,60 @@
+# benchmarks/bench_summarize.py
+# Time and peak memory of draco_summarize on synthetic documents.
+#
+# Sentences draw words from a Zipf-distributed vocabulary so term statistics
+# look like prose. Peak memory is measured with tracemalloc in a separate run
+# (tracing slows Python down) and excludes the input sentences themselves.
+#
+#   python benchmarks/bench_summarize.py [max_sentences]
+import os
+import sys
+import time
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import draco_summarize  # noqa: E402
+
+
+def make_sentences(n, vocab_size=20000, seed=7):
+    rng = random.Random(seed)
+    vocab = ["w%sx" % "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 8)))
+             for _ in range(vocab_size)]
+    weights = [1.0 / (r + 1) for r in range(vocab_size)]
+    words = rng.choices(vocab, weights, k=n * 18)
+    out = []
+    pos = 0
+    for _ in range(n):
+        k = rng.randint(8, 28)
+        out.append(" ".join(words[pos:pos + k]).capitalize() + ".")
+        pos += k
+        if pos > len(words) - 30:
+            pos = 0
+    return out
+
+
+def measure(fn):
+    t = time.perf_counter()
+    fn()
+    took = time.perf_counter() - t
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return took, peak
+
+
+def main():
+    top = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    sizes = [n for n in (300, 1000, 10000, 100000, 1000000) if n <= top]
+    print(f"{'sentences':>10} {'method':>9} {'summary s':>10} {'peak MB':>8} {'keypts s':>9} {'peak MB':>8}")
+    for n in sizes:
+        sents = make_sentences(n)
+        method = "textrank" if n <= draco_summarize.TEXTRANK_MAX_SENTENCES else "centroid"
+        st, sp = measure(lambda: draco_summarize.summarize(sents, 2200))
+        kt, kp = measure(lambda: draco_summarize.key_points(sents, 10))
+        print(f"{n:>10} {method:>9} {st:>10.3f} {sp / 1e6:>8.1f} {kt:>9.3f} {kp / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# draco_document.py
+# A document parsed once and shared by every text operation run on it.
+#
+# DocumentModel holds the text with its paragraphs, sentences, per-sentence
+# terms and term frequencies, each computed on first use and kept. Summary,
+# key points, flashcards and outline all read from one model: the text is
+# split and tokenized once, the frequencies are counted once for every
+# ranking, sentence rankings are cached per limit, and outline sections are
+# ranked from the document's own sentences. Rewrites work on the raw text.
+#
+# key_points_of() and the glossary are streaming instead: they walk the text
+# sentence by sentence (line by line) and keep only a bounded top-k, for
+# callers that need one answer from a large text.
+import re
+import heapq
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import draco_summarize
+import draco_text
+
+GLOSSARY_RE = re.compile(r"\b([A-Z][a-zA-Z]{2,}(?:[ \t]+[A-Z][a-zA-Z]{2,})*)\b")
+GLOSSARY_COUNTERS = 8          # candidate terms tracked per requested term
+GLOSSARY_DEFINED = 2           # a "Term: definition" line counts this many times
+MAX_DEFINITION = 200
+FORMAL = {
+    " can't ": " cannot ",
+    " won't ": " will not ",
+    " it's ": " it is ",
+    " isn't ": " is not ",
+    " don't ": " do not ",
+    " doesn't ": " does not ",
+    " i'm ": " I am ",
+}
+TONES = ("simple", "formal", "academic")
+
+
+def iter_sentences(text: str) -> Iterator[str]:
+    # same sentences as DocumentModel.sentences, produced lazily
+    return (s for s in draco_text.iter_sentences(text) if len(s) >= 4)
+
+
+def key_points_of(text: str, limit: int = 8) -> List[str]:
+    """Key points of `text` without materializing its sentences: memory is
+    the vocabulary plus a top-k heap (draco_summarize.rank_stream)."""
+    return draco_summarize.key_points_stream(lambda: iter_sentences(text), max(1, limit))
+
+
+def iter_lines(text: str) -> Iterator[str]:
+    start = 0
+    while start < len(text):
+        end = text.find("\n", start)
+        if end < 0:
+            end = len(text)
+        yield text[start:end]
+        start = end + 1
+
+
+def _glossary_candidates(line: str) -> Iterator[Tuple[str, str, int]]:
+    """(term, definition, weight) found on one line."""
+    if ':' in line:
+        k, _, d = line.partition(':')
+        k = k.strip()
+        if 2 <= len(k) <= 60:
+            yield k, " ".join(d.split())[:MAX_DEFINITION], GLOSSARY_DEFINED
+    for m in GLOSSARY_RE.finditer(line):
+        words = m.group(1).split()
+        before = line[:m.start()].rstrip()
+        if not before or before[-1] in ".!?:;\"'(":
+            # sentence-initial: drop a leading "The"/"In"/..., and a lone
+            # capitalized first word is just grammar
+            if words[0].lower() in draco_summarize.STOPWORDS:
+                words = words[1:]
+            elif len(words) == 1:
+                continue
+        w = " ".join(words)
+        if 3 <= len(w) <= 40:
+            yield w, "", 1
+
+
+class DocumentModel:
+    def __init__(self, text: str):
+        self.text = text or ""
+        self._paragraphs: Optional[List[str]] = None
+        self._sentences: Optional[Tuple[str, ...]] = None
+        self._tokens: Optional[List[List[str]]] = None
+        self._tf = None
+        self._sections: Optional[List[List[int]]] = None
+        self._ranks: Dict[int, List[int]] = {}
+
+    # ---- parsed structure ----
+    @property
+    def paragraphs(self) -> List[str]:
+        if self._paragraphs is None:
+            self._paragraphs = [p.strip() for p in self.text.split("\n\n") if p.strip()]
+        return self._paragraphs
+
+    @property
+    def sentences(self) -> Tuple[str, ...]:
+        # fragments of 3 characters or fewer are dropped
+        if self._sentences is None:
+            self._sentences = draco_text.split_sentences(self.text, min_len=4)
+        return self._sentences
+
+    @property
+    def tokens(self) -> List[List[str]]:
+        """draco_summarize.terms() of each sentence."""
+        if self._tokens is None:
+            self._tokens = [draco_summarize.terms(s) for s in self.sentences]
+        return self._tokens
+
+    @property
+    def term_frequencies(self):
+        """draco_summarize.term_stats() of the tokens: (sentences, document
+        frequency, total count) per term, counted once for every ranking."""
+        if self._tf is None:
+            self._tf = draco_summarize.term_stats(self.tokens)
+        return self._tf
+
+    @property
+    def sections(self) -> List[List[int]]:
+        """Indices into `sentences` for each of `paragraphs`. Blank lines
+        end sentences, so no sentence spans two paragraphs."""
+        if self._sections is None:
+            sections: List[List[int]] = []
+            ends = []  # end offset of each non-empty paragraph
+            pos = 0
+            for p in self.text.split("\n\n"):
+                pos += len(p) + 2
+                if p.strip():
+                    ends.append(pos)
+                    sections.append([])
+            cursor = 0
+            k = 0
+            for i, s in enumerate(self.sentences):
+                at = self.text.find(s, cursor)
+                if at < 0:
+                    continue
+                cursor = at + len(s)
+                while k < len(ends) - 1 and at >= ends[k]:
+                    k += 1
+                if sections:
+                    sections[k].append(i)
+            self._sections = sections
+        return self._sections
+
+    def ranked(self, limit: int) -> List[int]:
+        """draco_summarize.rank() over this document, cached per limit."""
+        order = self._ranks.get(limit)
+        if order is None:
+            order = self._ranks[limit] = draco_summarize.rank(self.sentences, limit, self.tokens,
+                                                              self.term_frequencies)
+        return order
+
+    # ---- operations ----
+    def summary(self, max_chars: int = 1200) -> str:
+        # extractive: the most representative sentences that fit in max_chars
+        if not self.text:
+            return "No content to summarize."
+        max_chars = max_chars or 1200
+        sents = self.sentences
+        if not sents:
+            s = " ".join(self.text.split())
+            return s[:max_chars] + ("…" if len(s) > max_chars else "")
+        return draco_summarize.summarize(sents, max_chars, self.ranked(draco_summarize.summary_limit(max_chars)))
+
+    def key_points(self, limit: int = 8) -> List[str]:
+        sents = self.sentences
+        return [sents[i].strip() for i in self.ranked(max(1, limit))]
+
+    def flashcards(self, limit: int = 8) -> List[Dict[str, str]]:
+        cards = []
+        for p in self.key_points(limit):
+            pl = p.strip().rstrip(".?!")
+            # question from the leading clause
+            q = "What is: " + (pl[:80] + ("…" if len(pl) > 80 else ""))
+            cards.append({"q": q, "a": pl})
+        return cards
+
+    def outline(self, max_sections: int = 6) -> List[Dict]:
+        # each paragraph's key points, ranked from the document's own
+        # sentences and tokens rather than a re-parse of the paragraph
+        outline = []
+        sents, toks = self.sentences, self.tokens
+        for i, (p, idx) in enumerate(zip(self.paragraphs[:max_sections], self.sections), 1):
+            title = sents[idx[0]] if idx else p[:60]
+            order = draco_summarize.rank([sents[j] for j in idx], 5, [toks[j] for j in idx])
+            outline.append({"title": f"Section {i}: " + title[:60], "bullets": [sents[idx[j]].strip() for j in order]})
+        return outline
+
+    def glossary(self, limit: int = 15) -> List[str]:
+        """Up to `limit` "Term: definition" entries, most frequent first.
+        Terms come from "Term: ..." lines and capitalized phrases, counted
+        with weighted Misra-Gries over the lines of the text, so only
+        limit * GLOSSARY_COUNTERS candidates are held at any time and each
+        kept count is at most total weight / (candidates + 1) below the
+        true one."""
+        cap = max(32, limit * GLOSSARY_COUNTERS)
+        counts: Dict[str, int] = {}
+        first: Dict[str, int] = {}
+        defs: Dict[str, str] = {}
+        seen = 0
+        for line in iter_lines(self.text):
+            for term, definition, weight in _glossary_candidates(line):
+                seen += 1
+                if term in counts:
+                    counts[term] += weight
+                elif len(counts) < cap:
+                    counts[term] = weight
+                    first[term] = seen
+                else:
+                    # full: every counter and the newcomer pay the same
+                    # amount, up to the newcomer's weight or the smallest
+                    # counter; what the newcomer keeps becomes its count
+                    paid = min(weight, min(counts.values()))
+                    for t in list(counts):
+                        counts[t] -= paid
+                        if counts[t] <= 0:
+                            del counts[t], first[t]
+                            defs.pop(t, None)
+                    weight -= paid
+                    if weight <= 0:
+                        continue
+                    counts[term] = weight
+                    first[term] = seen
+                if definition and term not in defs:
+                    defs[term] = definition
+        top = heapq.nlargest(limit, counts, key=lambda t: (counts[t], -first[t]))
+        return [f"{t}: {defs.get(t, '')}" for t in top]
+
+    def rewrite(self, tone: str) -> str:
+        # simple heuristic rewrites; non-LLM
+        tone = (tone or "").lower()
+        if tone == "simple":
+            # shorter sentences
+            return " ".join(s.split(',')[0].strip() for s in self.sentences)
+        if tone == "formal":
+            low = " " + self.text
+            for k, v in FORMAL.items():
+                low = low.replace(k, v)
+            return low.strip()
+        if tone == "academic":
+            # add connectors
+            return " ".join(("" if i == 0 else ("Furthermore, " if i % 2 else "Additionally, ")) + s
+                            for i, s in enumerate(self.sentences))
+        return self.text
+
+    def clean(self) -> str:
+        # normalize whitespace and remove duplicate consecutive lines
+        t = "\n".join([ln.strip() for ln in self.text.replace("\r\n", "\n").replace("\r", "\n").split("\n")])
+        out = []
+        last = None
+        for ln in t.split("\n"):
+            if ln and ln != last:
+                out.append(ln)
+                last = ln
+        return "\n".join(out)
@@ -0,0 +1,337 @@
+# draco_extract.py
+# Text extraction that runs outside the request thread.
+#
+# PDF pages are extracted in parallel on a draco_pool worker pool: a
+# document that hangs or balloons only gets its own worker killed and
+# replaced, never the server process or other jobs. Where fork is
+# unavailable (Windows) extraction runs in-process, as before.
+#
+# Every format is also exposed as a lazy generator of text blocks (pages,
+# slides, paragraphs), so a caller that needs only some pages (a requested
+# page range, or pages sampled across the document for an overview) parses
+# just those.
+#
+# DOCX and PPTX are read straight from the zip with lxml iterparse rather
+# than through the python-docx / python-pptx object model: each paragraph,
+# table row or shape is cleared as soon as its text is taken, so memory
+# stays flat however large the document. Table text and speaker notes are
+# included.
+#
+# Every entry point takes either a file path or the file's bytes (small
+# uploads are never written to disk); for bytes the format comes from the
+# `ext` argument instead of the file name.
+import io
+import os
+import math
+import time
+import zipfile
+import posixpath
+import threading
+from typing import Iterable, Iterator, List, Optional, Sequence, Union
+
+try:
+    from PyPDF2 import PdfReader
+except Exception:
+    PdfReader = None
+try:
+    from lxml import etree
+except Exception:
+    etree = None
+from draco_pool import make_pool, IsolatedPool
+
+EXTRACT_WORKERS = int(os.environ.get("DRACO_EXTRACT_WORKERS", str(max(1, min(4, os.cpu_count() or 1)))))
+EXTRACT_MEM_MB = int(os.environ.get("DRACO_EXTRACT_MEM_MB", "512"))
+EXTRACT_TIMEOUT = float(os.environ.get("DRACO_EXTRACT_TIMEOUT", "120"))
+MIN_PAGES_PER_JOB = 4
+MAX_PAGES_PER_LAZY_JOB = 32
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PR = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+NOTES_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/notesSlide"
+CELL_SEP = " | "
+
+Source = Union[str, bytes]
+
+
+def _open(src: Source):
+    # something PdfReader / ZipFile can read: the path itself, or the bytes
+    return io.BytesIO(src) if isinstance(src, (bytes, bytearray)) else src
+
+
+def _ext(src: Source, ext: Optional[str] = None) -> str:
+    if ext:
+        return ext.lower()
+    return os.path.splitext(src)[1].lower() if isinstance(src, str) else ""
+
+
+# ------------- worker jobs -------------
+def pdf_page_count(path: Source) -> int:
+    return len(PdfReader(_open(path)).pages)
+
+
+def pdf_pages_text(path: Source, pages: Sequence[int]) -> List[str]:
+    reader = PdfReader(_open(path))
+    n = len(reader.pages)
+    return [(reader.pages[i].extract_text() or "").strip() for i in pages if 0 <= i < n]
+
+
+_pool: Optional[IsolatedPool] = None
+_pool_made = False
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[IsolatedPool]:
+    global _pool, _pool_made
+    with _pool_lock:
+        if not _pool_made:
+            _pool = make_pool(EXTRACT_WORKERS, EXTRACT_MEM_MB)
+            _pool_made = True
+        return _pool
+
+
+def extract_pdf_text(path: Source, timeout: float = EXTRACT_TIMEOUT) -> str:
+    """Page-parallel PDF text, pages joined by newlines in document order.
+    Returns "" for unreadable, oversized or too-slow documents."""
+    if not PdfReader:
+        return ""
+    pool = get_pool()
+    try:
+        if pool is None:
+            pages = pdf_pages_text(path, range(pdf_page_count(path)))
+        else:
+            # open the file in a worker too: a malformed xref can be expensive
+            n = pool.run(pdf_page_count, (path,), timeout)
+            per_job = max(MIN_PAGES_PER_JOB, math.ceil(n / (pool.size * 2)))
+            chunks = [(path, range(s, min(n, s + per_job))) for s in range(0, n, per_job)]
+            pages = [t for part in pool.map(pdf_pages_text, chunks, timeout) for t in part]
+    except Exception as e:
+        print("PDF extraction failed:", e)
+        return ""
+    return "\n".join(t for t in pages if t)
+
+
+# ------------- lazy block generators -------------
+def iter_pdf_pages(path: Source, pages: Optional[Sequence[int]] = None, timeout: float = EXTRACT_TIMEOUT) -> Iterator[str]:
+    """Yield page texts in order, fetching small batches from the worker pool
+    (doubling in size) so an early stop only parses the pages it consumed."""
+    if not PdfReader:
+        return
+    pool = get_pool()
+    deadline = time.monotonic() + timeout
+    try:
+        def call(fn, *args):
+            if pool is None:
+                return fn(*args)
+            return pool.run(fn, args, deadline - time.monotonic())
+
+        n = call(pdf_page_count, path)
+        order = [i for i in (pages if pages is not None else range(n)) if 0 <= i < n]
+        i, size = 0, MIN_PAGES_PER_JOB
+        while i < len(order):
+            for t in call(pdf_pages_text, path, order[i:i + size]):
+                if t:
+                    yield t
+            i += size
+            size = min(size * 2, MAX_PAGES_PER_LAZY_JOB)
+    except Exception as e:
+        print("PDF extraction failed:", e)
+
+
+# ------------- OOXML (DOCX / PPTX) -------------
+def _iterparse(zf: zipfile.ZipFile, name: str, tags, events=("end",)):
+    with zf.open(name) as f:
+        yield from etree.iterparse(f, events=events, tag=tags, resolve_entities=False, no_network=True)
+
+
+def _release(el):
+    # drop the element and every already-processed sibling before it
+    el.clear()
+    parent = el.getparent()
+    if parent is not None:
+        while el.getprevious() is not None:
+            del parent[0]
+
+
+def _docx_paragraph(p) -> str:
+    out = []
+    for el in p.iter(W + "t", W + "tab", W + "br", W + "cr"):
+        if el.tag == W + "t":
+            out.append(el.text or "")
+        else:
+            out.append("\t" if el.tag == W + "tab" else "\n")
+    return "".join(out)
+
+
+def iter_docx_blocks(path: Source) -> Iterator[str]:
+    """Body paragraphs in order; each table row as one block with its cells
+    joined by " | " (nested tables flattened into their cell)."""
+    if etree is None:
+        return
+    try:
+        with zipfile.ZipFile(_open(path)) as zf:
+            depth = 0
+            for ev, el in _iterparse(zf, "word/document.xml", (W + "p", W + "tr", W + "tbl"), ("start", "end")):
+                if el.tag == W + "tbl":
+                    depth += 1 if ev == "start" else -1
+                    if ev == "end" and depth == 0:
+                        _release(el)
+                elif ev != "end":
+                    continue
+                elif el.tag == W + "p" and depth == 0:
+                    t = _docx_paragraph(el)
+                    if t.strip():
+                        yield t
+                    _release(el)
+                elif el.tag == W + "tr" and depth == 1:
+                    cells = []
+                    for tc in el.iterchildren(W + "tc"):
+                        cell = " ".join(" ".join(_docx_paragraph(p).split()) for p in tc.iter(W + "p"))
+                        if cell.strip():
+                            cells.append(cell.strip())
+                    if cells:
+                        yield CELL_SEP.join(cells)
+                    _release(el)
+    except Exception as e:
+        print("DOCX extraction failed:", e)
+
+
+def _rels(zf: zipfile.ZipFile, part: str) -> dict:
+    """rId -> (type, zip member) for a part's relationships."""
+    d, fn = posixpath.split(part)
+    name = posixpath.join(d, "_rels", fn + ".rels")
+    out = {}
+    try:
+        with zf.open(name) as f:
+            root = etree.parse(f, etree.XMLParser(resolve_entities=False, no_network=True)).getroot()
+    except KeyError:
+        return out
+    for rel in root.iter(PR + "Relationship"):
+        if rel.get("TargetMode") == "External":
+            continue
+        out[rel.get("Id")] = (rel.get("Type", ""), posixpath.normpath(posixpath.join(d, rel.get("Target", ""))))
+    return out
+
+
+def _pptx_slides(zf: zipfile.ZipFile) -> List[str]:
+    rels = _rels(zf, "ppt/presentation.xml")
+    slides = []
+    for _, el in _iterparse(zf, "ppt/presentation.xml", P + "sldId"):
+        target = rels.get(el.get(R + "id"))
+        if target:
+            slides.append(target[1])
+    return slides
+
+
+def _pptx_shapes(zf: zipfile.ZipFile, part: str, notes: bool = False) -> Iterator[str]:
+    for _, el in _iterparse(zf, part, (P + "sp", P + "graphicFrame")):
+        if el.tag == P + "sp":
+            ph = el.find(f"{P}nvSpPr/{P}nvPr/{P}ph")
+            # a notes page also holds the slide image and slide number
+            if not notes or (ph is not None and ph.get("type") == "body"):
+                paras = ["".join(t.text or "" for t in p.iter(A + "t")) for p in el.iter(A + "p")]
+                t = "\n".join(paras).strip()
+                if t:
+                    yield t
+        elif not notes:
+            for tr in el.iter(A + "tr"):
+                cells = [" ".join("".join(t.text or "" for t in tc.iter(A + "t")).split()) for tc in tr.iter(A + "tc")]
+                cells = [c for c in cells if c]
+                if cells:
+                    yield CELL_SEP.join(cells)
+        if el.getparent() is not None and el.getparent().tag == P + "spTree":
+            _release(el)  # shapes inside a group go with the group
+
+
+def iter_pptx_blocks(path: Source, slides: Optional[Sequence[int]] = None) -> Iterator[str]:
+    """Per slide: the text of each shape and each table row, then the
+    speaker notes prefixed "Notes: "."""
+    if etree is None:
+        return
+    wanted = set(slides) if slides is not None else None
+    try:
+        with zipfile.ZipFile(_open(path)) as zf:
+            for idx, part in enumerate(_pptx_slides(zf)):
+                if wanted is not None and idx not in wanted:
+                    continue
+                yield from _pptx_shapes(zf, part)
+                for typ, target in _rels(zf, part).values():
+                    if typ == NOTES_REL:
+                        for t in _pptx_shapes(zf, target, notes=True):
+                            yield "Notes: " + t
+    except Exception as e:
+        print("PPTX extraction failed:", e)
+
+
+def iter_blocks(path: Source, pages: Optional[Sequence[int]] = None, ext: Optional[str] = None) -> Iterator[str]:
+    """Text blocks of a .pdf/.docx/.pptx file. `pages` (0-based) selects
+    PDF pages or PPTX slides; DOCX has no fixed pages and ignores it."""
+    ext = _ext(path, ext)
+    if ext == ".pdf":
+        return iter_pdf_pages(path, pages)
+    if ext == ".pptx":
+        return iter_pptx_blocks(path, pages)
+    if ext == ".docx":
+        return iter_docx_blocks(path)
+    return iter(())
+
+
+def page_count(path: Source, ext: Optional[str] = None) -> Optional[int]:
+    """Pages (PDF) or slides (PPTX); None when the format has no pages."""
+    ext = _ext(path, ext)
+    try:
+        if ext == ".pdf" and PdfReader:
+            pool = get_pool()
+            return pool.run(pdf_page_count, (path,), EXTRACT_TIMEOUT) if pool else pdf_page_count(path)
+        if ext == ".pptx" and etree is not None:
+            with zipfile.ZipFile(_open(path)) as zf:
+                return len(_pptx_slides(zf))
+    except Exception:
+        pass
+    return None
+
+
+def sample_pages(total: int, k: int) -> List[int]:
+    """k page indices spread evenly across a document of `total` pages."""
+    if total <= k:
+        return list(range(total))
+    step = total / float(k)
+    return [int(step * i + step / 2) for i in range(k)]
+
+
+def take_sample(blocks: Iterable[str], n: int, parts: int) -> str:
+    """Up to n characters drawn evenly from `parts` blocks (e.g. sampled
+    pages): each block contributes at most n / parts characters."""
+    share = max(1, n // max(1, parts))
+    out = []
+    for b in blocks:
+        b = " ".join(b.split())
+        if b:
+            out.append(b[:share])
+    return "\n".join(out)
+
+
+def extract_text(path: Source, pages: Optional[Sequence[int]] = None, ext: Optional[str] = None) -> str:
+    ext = _ext(path, ext)
+    if ext == ".pdf" and pages is None:
+        return extract_pdf_text(path)
+    return "\n".join(iter_blocks(path, pages, ext))
+
+
+def extract_file_text(path: Source, timeout: float = EXTRACT_TIMEOUT, ext: Optional[str] = None) -> str:
+    """Whole-document text parsed off the serving process: PDF pages across
+    the pool, a DOCX/PPTX in a single worker. Several files extracted from
+    different threads therefore parse in parallel."""
+    ext = _ext(path, ext)
+    if ext == ".pdf":
+        return extract_pdf_text(path, timeout)
+    pool = get_pool()
+    if pool is None:
+        return extract_text(path, None, ext)
+    try:
+        return pool.run(extract_text, (path, None, ext), timeout)
+    except Exception as e:
+        print("Extraction failed:", e)
+        return ""
@@ -0,0 +1,172 @@
+# draco_janitor.py
+# Retention for generated/ and uploads/: a background thread enforces a
+# maximum file age and a total-size quota per directory.
+#
+# Files are ranked by last use, the newer of their mtime and the last time
+# they were served (touch()). Over quota, the least recently used go first.
+# Pinned files (in use by a request) and files used within `grace` seconds
+# are never removed. Only plain files directly in a directory are managed;
+# subdirectories (e.g. the extraction cache) keep their own bounds.
+import os
+import time
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class Quota:
+    def __init__(self, root: str, max_age: float, max_bytes: int, on_sweep: Optional[Callable[[], None]] = None):
+        self.root = root
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.on_sweep = on_sweep
+        self.files = 0
+        self.bytes = 0
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+
+
+class Janitor:
+    def __init__(self, interval: float = 300, grace: float = 600):
+        self.interval = interval
+        self.grace = grace
+        self.quotas: List[Quota] = []
+        self.pins: Dict[str, int] = {}
+        self.pinned_at: Dict[str, float] = {}
+        self.used: Dict[str, float] = {}  # path -> last served
+        self.lock = threading.Lock()
+        self.last_sweep = None
+        self.last_sweep_ms = None
+        self.thread = None
+
+    def add(self, root: str, max_age: float, max_bytes: int, on_sweep: Optional[Callable[[], None]] = None):
+        """Manage `root`; `on_sweep` runs after each sweep of it, for owners
+        that keep in-memory state about its files."""
+        self.quotas.append(Quota(os.path.abspath(root), max_age, max_bytes, on_sweep))
+
+    # ---- usage tracking ----
+    def touch(self, path: str):
+        with self.lock:
+            self.used[os.path.abspath(path)] = time.time()
+
+    def pin(self, path: str):
+        path = os.path.abspath(path)
+        with self.lock:
+            self.pins[path] = self.pins.get(path, 0) + 1
+            self.pinned_at.setdefault(path, time.time())
+
+    def release(self, path: str, reclaim: bool = False):
+        """Unpin; with `reclaim`, delete the file once no request uses it.
+        A file rewritten or touched since it was pinned (a concurrent upload
+        of the same content) is left to the sweeper instead."""
+        path = os.path.abspath(path)
+        with self.lock:
+            n = self.pins.get(path, 0) - 1
+            if n > 0:
+                self.pins[path] = n
+                return
+            self.pins.pop(path, None)
+            since = self.pinned_at.pop(path, 0.0)
+            if not reclaim:
+                return
+            try:
+                if os.path.getmtime(path) <= since:
+                    os.remove(path)
+                    self.used.pop(path, None)
+            except OSError:
+                pass
+
+    @contextmanager
+    def in_use(self, paths: Iterable[str], reclaim: bool = False):
+        paths = list(paths)
+        for p in paths:
+            self.pin(p)
+        try:
+            yield
+        finally:
+            for p in paths:
+                self.release(p, reclaim)
+
+    # ---- sweeping ----
+    def _sweep_one(self, q: Quota, now: float):
+        entries = []
+        try:
+            with os.scandir(q.root) as it:
+                for e in it:
+                    if not e.is_file(follow_symlinks=False):
+                        continue
+                    try:
+                        st = e.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    entries.append([max(st.st_mtime, self.used.get(e.path, 0.0)), e.path, st.st_size])
+        except OSError:
+            return
+        entries.sort()
+        total = sum(e[2] for e in entries)
+        kept_files = len(entries)
+        for last, path, size in entries:
+            expired = now - last > q.max_age
+            if not expired and total <= q.max_bytes:
+                break  # oldest first: everything after is newer still
+            with self.lock:
+                if self.pins.get(path) or now - max(last, self.used.get(path, 0.0)) < self.grace:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self.used.pop(path, None)
+            total -= size
+            kept_files -= 1
+            q.evicted_files += 1
+            q.evicted_bytes += size
+        q.files = kept_files
+        q.bytes = total
+
+    def sweep(self):
+        t0 = time.perf_counter()
+        now = time.time()
+        for q in self.quotas:
+            self._sweep_one(q, now)
+            if q.on_sweep:
+                q.on_sweep()
+        with self.lock:
+            # forget usage of files that no longer exist
+            for p in [p for p in self.used if not os.path.exists(p)]:
+                del self.used[p]
+        self.last_sweep = now
+        self.last_sweep_ms = (time.perf_counter() - t0) * 1000
+
+    def _loop(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                print("Janitor sweep failed:", e)
+            time.sleep(self.interval)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._loop, daemon=True)
+            self.thread.start()
+
+    def metrics(self):
+        dirs = []
+        for q in self.quotas:
+            try:
+                du = shutil.disk_usage(q.root)
+                free = du.free
+            except OSError:
+                free = None
+            dirs.append({
+                "path": q.root, "files": q.files, "bytes": q.bytes,
+                "max_bytes": q.max_bytes, "max_age_s": q.max_age,
+                "evicted_files": q.evicted_files, "evicted_bytes": q.evicted_bytes,
+                "disk_free_bytes": free,
+            })
+        with self.lock:
+            pinned = len(self.pins)
+        return {"dirs": dirs, "pinned": pinned, "last_sweep": self.last_sweep,
+                "last_sweep_ms": self.last_sweep_ms, "interval_s": self.interval}
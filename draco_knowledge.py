@@ -0,0 +1,119 @@
+# draco_knowledge.py
+# Local study notes answered from memory.
+#
+# Every line of knowledge/*.txt ("Topic: notes") is one entry in a BM25
+# index (draco_search.InvertedIndex, with prefix and one-typo matching)
+# built at startup. A question is answered from the notes only when the best
+# entry clears a confidence bar: a minimum BM25 score and most of the
+# question's content words found in that entry. Anything else falls through
+# to the caller (web search). The directory is re-checked at most every
+# RELOAD_INTERVAL seconds, so added or edited files are picked up without a
+# restart.
+import os
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from draco_search import InvertedIndex, tokenize
+from draco_summarize import STOPWORDS
+
+EXTENSIONS = (".txt", ".md")
+# question phrasing that says nothing about the topic
+QUERY_STOPWORDS = STOPWORDS | frozenset(
+    "how explain tell me define describe give show please help use using solve know whats".split())
+MIN_SCORE = float(os.environ.get("DRACO_KNOWLEDGE_MIN_SCORE", "1.5"))
+MIN_COVERAGE = float(os.environ.get("DRACO_KNOWLEDGE_MIN_COVERAGE", "0.5"))
+RELOAD_INTERVAL = float(os.environ.get("DRACO_KNOWLEDGE_RELOAD", "30"))
+SECOND_RATIO = 0.8             # a runner-up this close to the best is included
+MAX_ENTRIES = 2
+
+
+def content_terms(text: str) -> List[str]:
+    return [t for t in dict.fromkeys(tokenize(text)) if len(t) > 1 and t not in QUERY_STOPWORDS]
+
+
+class KnowledgeBase:
+    def __init__(self, root: str):
+        self.root = root
+        self.index = InvertedIndex(prefix=True, fuzzy=True)
+        self.files: Dict[str, float] = {}
+        self.checked = 0.0
+        self.lock = threading.Lock()
+        self.reload()
+
+    def _scan(self) -> Dict[str, float]:
+        out = {}
+        try:
+            names = sorted(os.listdir(self.root))
+        except OSError:
+            return out
+        for name in names:
+            path = os.path.join(self.root, name)
+            if name.lower().endswith(EXTENSIONS) and os.path.isfile(path):
+                out[path] = os.path.getmtime(path)
+        return out
+
+    def reload(self):
+        """Rebuild the index from the files now in the directory."""
+        files = self._scan()
+        index = InvertedIndex(prefix=True, fuzzy=True)
+        for path in files:
+            topic = os.path.splitext(os.path.basename(path))[0].replace("_", " ")
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    lines = f.read().splitlines()
+            except (OSError, UnicodeDecodeError) as e:
+                print("Knowledge file skipped:", path, e)
+                continue
+            for n, line in enumerate(lines, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                title, sep, _ = line.partition(":")
+                title = title.strip() if sep and len(title) <= 60 else ""
+                # the title counts twice and the file's topic once, so
+                # "physics momentum" finds the Momentum line of physics.txt
+                index.add((path, n), f"{title} {line} {topic}",
+                          {"topic": topic, "title": title, "text": line, "file": os.path.basename(path), "line": n})
+        with self.lock:
+            self.index = index
+            self.files = files
+            self.checked = time.monotonic()
+
+    def _maybe_reload(self):
+        if time.monotonic() - self.checked < RELOAD_INTERVAL:
+            return
+        self.checked = time.monotonic()
+        if self._scan() != self.files:
+            self.reload()
+
+    def _coverage(self, index: InvertedIndex, doc_id, terms: List[str]) -> float:
+        have = set(index.doc_terms.get(doc_id, ()))
+        hit = sum(1 for t in terms if any(v in have for v, _ in index.expand(t, prefix=True, fuzzy=True)))
+        return hit / float(len(terms))
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[dict, float, float]]:
+        """[(entry, score, coverage)] best first; coverage is the share of the
+        query's content words the entry contains (prefix/typo variants
+        included)."""
+        self._maybe_reload()
+        terms = content_terms(query)
+        index = self.index
+        if not terms or not len(index):
+            return []
+        results, _ = index.search(" ".join(terms), limit=limit, prefix=True, fuzzy=True)
+        return [(index.docs[d], s, self._coverage(index, d, terms)) for d, s in results]
+
+    def answer(self, query: str) -> Optional[Dict]:
+        """The confident answer to `query`, or None: {"text", "entries",
+        "score", "coverage"}, text being the best entry (plus a runner-up
+        scoring within SECOND_RATIO of it) prefixed with its topic."""
+        hits = self.search(query, limit=MAX_ENTRIES)
+        if not hits:
+            return None
+        best, score, coverage = hits[0]
+        if score < MIN_SCORE or coverage < MIN_COVERAGE:
+            return None
+        entries = [best] + [e for e, s, c in hits[1:] if s >= score * SECOND_RATIO and c >= MIN_COVERAGE]
+        text = " ".join(f"[{e['topic'].title()}] {e['text']}" for e in entries)
+        return {"text": text, "entries": entries, "score": round(score, 3), "coverage": round(coverage, 3)}
@@ -0,0 +1,159 @@
+# draco_pool.py
+# Fixed-size pool of forked worker processes with per-job deadlines and an
+# address-space limit per worker. Used for text extraction (draco_extract)
+# and document rendering (draco_render) so CPU-heavy or hostile inputs never
+# run in the process that serves requests and websockets.
+#
+# Workers are forked: spawned children would re-import main.py, which starts
+# threads and the voice loop at import time. make_pool() returns None where
+# fork is unavailable (Windows) and callers then run jobs in-process.
+import os
+import time
+import queue
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+from typing import Callable, List, Optional, Sequence
+
+try:
+    import resource
+except Exception:
+    resource = None
+
+
+class PoolError(Exception):
+    pass
+
+
+# ------------- worker side -------------
+def _vm_size_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return 0
+
+
+def _worker_main(conn, mem_limit: int):
+    if resource is not None and mem_limit > 0:
+        # forked children inherit the parent's mappings; budget on top of them
+        try:
+            limit = _vm_size_bytes() + mem_limit
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except Exception:
+            pass
+    while True:
+        try:
+            fn, args = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            conn.send(("ok", fn(*args)))
+        except MemoryError:
+            conn.send(("err", "memory limit exceeded"))
+        except Exception as e:
+            conn.send(("err", f"{type(e).__name__}: {e}"))
+
+
+# ------------- parent side -------------
+class _Worker:
+    def __init__(self, ctx, mem_limit: int):
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_worker_main, args=(child, mem_limit), daemon=True)
+        self.proc.start()
+        child.close()
+
+    def kill(self):
+        try:
+            self.proc.kill()
+            self.proc.join(2)
+        except Exception:
+            pass
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+class IsolatedPool:
+    """Fixed-size pool of forked workers with per-job deadlines.
+
+    run() borrows an idle worker (blocking while all are busy, which bounds
+    concurrency), sends the job over its pipe and waits up to `timeout`.
+    On timeout or worker death the worker is killed and replaced.
+    """
+
+    def __init__(self, workers: int, mem_mb: int):
+        self.size = max(1, workers)
+        self.mem_limit = mem_mb * 1024 * 1024
+        self.ctx = multiprocessing.get_context("fork")
+        self.idle = queue.Queue()
+        for _ in range(self.size):
+            self.idle.put(None)  # workers are started lazily
+
+    def run(self, fn: Callable, args: Sequence, timeout: float):
+        if timeout <= 0:
+            raise PoolError("timed out")
+        w = self.idle.get()
+        try:
+            if w is None or not w.proc.is_alive():
+                w = _Worker(self.ctx, self.mem_limit)
+            w.conn.send((fn, tuple(args)))
+            # the sentinel fires if the worker dies (e.g. killed by the OOM
+            # killer), even when a sibling still holds the pipe open
+            ready = wait([w.conn, w.proc.sentinel], timeout)
+            if not ready:
+                raise PoolError("timed out")
+            if w.conn not in ready:
+                raise EOFError(f"exit code {w.proc.exitcode}")
+            status, value = w.conn.recv()
+        except PoolError:
+            w.kill()
+            w = None
+            raise
+        except (EOFError, OSError) as e:
+            if w is not None:
+                w.kill()
+            w = None
+            raise PoolError(f"worker died: {e}")
+        finally:
+            self.idle.put(w)
+        if status != "ok":
+            raise PoolError(value)
+        return value
+
+    def map(self, fn: Callable, arg_list: List[Sequence], timeout: float) -> list:
+        """Run fn over arg_list in parallel; results keep input order.
+        Fails as a whole if any job fails or the shared deadline passes."""
+        results = [None] * len(arg_list)
+        errors = []
+        deadline = time.monotonic() + timeout
+        jobs = queue.Queue()
+        for i, a in enumerate(arg_list):
+            jobs.put((i, a))
+
+        def drain():
+            while not errors:
+                try:
+                    i, a = jobs.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    results[i] = self.run(fn, a, deadline - time.monotonic())
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=drain, daemon=True) for _ in range(min(self.size, len(arg_list)))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        if errors:
+            raise errors[0]
+        return results
+
+
+def make_pool(workers: int, mem_mb: int) -> Optional[IsolatedPool]:
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    return IsolatedPool(workers, mem_mb)
@@ -0,0 +1,874 @@
+# draco_render.py
+# DOCX / PPTX / PDF generation.
+#
+# Output is content addressed: the file name and the random choices (palette,
+# font, layouts) derive from a hash of the spec, so a repeated request reuses
+# the existing file.
+#
+# Rendering is CPU-bound pure Python that holds the GIL, so render() runs it
+# on a draco_pool worker pool from a plain-data spec and returns the file
+# path; the process serving websockets stays responsive. Where fork is
+# unavailable the spec is rendered in-process.
+import io
+import os
+import copy
+import json
+import hashlib
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+try:
+    from docx import Document
+    from docx.shared import Inches as DocxInches
+except Exception:
+    Document = None
+    DocxInches = None
+try:
+    from pptx import Presentation
+    from pptx.util import Inches, Pt
+    from pptx.dml.color import RGBColor
+    from pptx.enum.shapes import MSO_SHAPE
+    from pptx.oxml import parse_xml
+    from pptx.oxml.ns import nsdecls, qn
+except Exception:
+    Presentation = None
+    Inches = None
+    Pt = None
+    RGBColor = None
+    MSO_SHAPE = None
+    parse_xml = None
+    nsdecls = None
+    qn = None
+try:
+    from fpdf import FPDF
+except Exception:
+    FPDF = None
+try:
+    import fpdf.fpdf as _fpdf_module
+    # no .pkl metric files written next to (often read-only) system fonts;
+    # metrics are cached in-process instead (_ttf_metrics)
+    _fpdf_module.FPDF_CACHE_MODE = 1
+except Exception:
+    _fpdf_module = None
+from draco_pool import make_pool, IsolatedPool, PoolError
+from draco_text import split_sentences
+
+RENDER_WORKERS = int(os.environ.get("DRACO_RENDER_WORKERS", str(max(1, min(2, os.cpu_count() or 1)))))
+RENDER_MEM_MB = int(os.environ.get("DRACO_RENDER_MEM_MB", "512"))
+RENDER_TIMEOUT = float(os.environ.get("DRACO_RENDER_TIMEOUT", "120"))
+# an identical spec rendered within this many seconds is served from disk
+ARTIFACT_TTL = float(os.environ.get("DRACO_ARTIFACT_TTL", "3600"))
+# PDF text font: a Unicode TrueType font embedded as a per-document subset.
+# DRACO_PDF_FONT / _BOLD name the files; DRACO_PDF_FALLBACK_FONTS (path
+# list) covers scripts the main font lacks. Unset, well-known fonts are
+# looked up in the system font directories; with none found the PDF falls
+# back to the core Helvetica font (Latin-1 only).
+PDF_FONT = os.environ.get("DRACO_PDF_FONT", "")
+PDF_FONT_BOLD = os.environ.get("DRACO_PDF_FONT_BOLD", "")
+PDF_FALLBACK_FONTS = [p for p in os.environ.get("DRACO_PDF_FALLBACK_FONTS", "").split(os.pathsep) if p]
+PDF_FONT_DIRS = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts"),
+    "/usr/share/fonts", "/usr/local/share/fonts", os.path.expanduser("~/.local/share/fonts"),
+    os.path.expanduser("~/.fonts"), "/Library/Fonts", "/System/Library/Fonts/Supplemental",
+    os.path.join(os.environ.get("WINDIR", "C:\\Windows"), "Fonts"),
+]
+# (regular, bold) pairs, best first
+PDF_FONT_CANDIDATES = [
+    ("DejaVuSans.ttf", "DejaVuSans-Bold.ttf"),
+    ("NotoSans-Regular.ttf", "NotoSans-Bold.ttf"),
+    ("FreeSans.ttf", "FreeSansBold.ttf"),
+    ("LiberationSans-Regular.ttf", "LiberationSans-Bold.ttf"),
+    ("arial.ttf", "arialbd.ttf"),
+]
+# tried, in order, for paragraphs the main font cannot fully show
+PDF_FALLBACK_CANDIDATES = [
+    "NotoSansDevanagari-Regular.ttf", "Lohit-Devanagari.ttf", "Nirmala.ttf", "mangal.ttf",
+    "NotoSansMath-Regular.ttf", "NotoSansSymbols-Regular.ttf", "NotoSansSymbols2-Regular.ttf",
+    "DejaVuSans.ttf", "seguisym.ttf",
+]
+
+
+def clean_unicode(text: str, covers=None) -> str:
+    """
+    Convert unicode text into safe latin-1 ASCII because FPDF's core fonts
+    can't encode unicode. With `covers` (a predicate on characters, e.g.
+    what an embedded font has glyphs for) only characters it rejects are
+    replaced. Anything unsupported is replaced safely.
+    """
+    if text is None:
+        return ""
+
+    # ensure it's a string
+    text = str(text)
+    if covers is None:
+        covers = _latin1
+    elif all(covers(ch) for ch in set(text)):
+        return text
+
+    # common replacements
+    replacements = {
+        "\u2018": "'", "\u2019": "'",         # curved single quotes
+        "\u201c": '"', "\u201d": '"',         # curved double quotes
+        "\u2026": "...",                      # ellipsis …
+        "\u2014": "-", "\u2013": "-",         # long dashes — –
+        "\u2022": "-",                        # bullet •
+        "\u00a0": " ",                         # non-breaking space
+        "\u2192": "->", "\u2190": "<-",       # arrows
+        "\u2191": "^",  "\u2193": "v",
+        "\u2713": "✓",                        # checkmark
+        "\u2020": "*", "\u2021": "*",         # dagger
+    }
+
+    for bad, rep in replacements.items():
+        if not covers(bad):
+            text = text.replace(bad, rep)
+
+    # remove/replace any remaining characters the font can't show
+    safe = []
+    for ch in text:
+        if covers(ch):
+            safe.append(ch)
+        else:
+            safe.append("?")   # replace unsupported unicode
+
+    return "".join(safe)
+
+
+def _latin1(ch: str) -> bool:
+    return ord(ch) <= 255
+
+
+_font_index = None
+_ttf_metrics = {}   # (path, mtime) -> PyFPDF font entry minus per-document fields
+_fonts_lock = threading.Lock()
+
+
+def find_font(name: str) -> Optional[str]:
+    """Path of a font file given as a path or as a bare file name looked up
+    (case-insensitively) under PDF_FONT_DIRS; the directories are scanned
+    once per process."""
+    global _font_index
+    if not name:
+        return None
+    if os.path.isfile(name):
+        return name
+    with _fonts_lock:
+        if _font_index is None:
+            _font_index = {}
+            for d in PDF_FONT_DIRS:
+                for root, _, files in os.walk(d):
+                    for f in files:
+                        _font_index.setdefault(f.lower(), os.path.join(root, f))
+        return _font_index.get(os.path.basename(name).lower())
+
+
+def pdf_fonts():
+    """[(regular, bold or None), ...]: the main PDF font, then fallbacks.
+    Empty when no TrueType font is available."""
+    main = None
+    if PDF_FONT and find_font(PDF_FONT):
+        main = (find_font(PDF_FONT), find_font(PDF_FONT_BOLD))
+    else:
+        for reg, bold in PDF_FONT_CANDIDATES:
+            if find_font(reg):
+                main = (find_font(reg), find_font(bold))
+                break
+    if main is None:
+        return []
+    out = [main]
+    for name in PDF_FALLBACK_FONTS or PDF_FALLBACK_CANDIDATES:
+        path = find_font(name)
+        if path and all(os.path.realpath(path) != os.path.realpath(r) for r, _ in out):
+            out.append((path, None))
+    return out
+
+
+class _GlyphSet(list):
+    """PyFPDF's per-font subset list. It appends every character written and
+    tests `cid in subset` for each of 65536 code points on output, which is
+    quadratic in document length; this keeps one entry per character and
+    answers membership from a set."""
+
+    def __init__(self, items=()):
+        super().__init__()
+        self.seen = set()
+        for x in items:
+            self.append(x)
+
+    def append(self, x):
+        if x not in self.seen:
+            self.seen.add(x)
+            super().append(x)
+
+    def __contains__(self, x):
+        return x in self.seen
+
+    def __delitem__(self, i):
+        for x in (self[i] if isinstance(i, slice) else [self[i]]):
+            self.seen.discard(x)
+        super().__delitem__(i)
+
+
+def _add_ttf(pdf, family: str, style: str, path: str):
+    """pdf.add_font(..., uni=True), reusing the font's parsed metrics (a
+    64K-entry width table) across documents. Glyphs are still subset per
+    document when the PDF is written."""
+    key = (path, os.path.getmtime(path))
+    fontkey = family.lower() + style.upper()
+    cached = _ttf_metrics.get(key)
+    if cached is None or not hasattr(pdf, "font_files"):
+        pdf.add_font(family, style, path, uni=True)
+        font = pdf.fonts.get(fontkey)
+        if isinstance(font, dict) and "cw" in font and "subset" in font:
+            font["subset"] = _GlyphSet(font["subset"])
+            _ttf_metrics[key] = {k: v for k, v in font.items() if k not in ("i", "fontkey", "subset")}
+        return
+    # what PyFPDF's add_font() sets up, minus parsing the file
+    pdf.fonts[fontkey] = dict(cached, i=len(pdf.fonts) + 1, fontkey=fontkey,
+                              subset=_GlyphSet(range(0, 57 if hasattr(pdf, "str_alias_nb_pages") else 32)))
+    pdf.font_files[fontkey] = {"length1": os.path.getsize(path), "type": "TTF", "ttffile": path}
+    pdf.font_files[path] = {"type": "TTF"}
+
+
+class _PdfFonts:
+    """Font families of one PDF. Each paragraph gets the first family that
+    can show all of it (else the one covering most), registered on first
+    use, and loses only characters no family covers."""
+
+    def __init__(self, pdf, stack):
+        self.pdf = pdf
+        self.stack = stack
+        self.added = {}    # index -> width table (None: not usable)
+
+    def _family(self, i: int):
+        if i not in self.added:
+            reg, bold = self.stack[i]
+            try:
+                _add_ttf(self.pdf, f"draco{i}", "", reg)
+                _add_ttf(self.pdf, f"draco{i}", "B", bold or reg)
+                font = self.pdf.fonts.get(f"draco{i}")
+                self.added[i] = font.get("cw") if isinstance(font, dict) else None
+            except Exception as e:
+                print("PDF font unusable:", reg, e)
+                self.added[i] = False
+        return self.added[i]
+
+    def covers(self, cw):
+        if cw is None:     # fpdf2 font objects: trust the font
+            return lambda ch: True
+        n = len(cw)
+        return lambda ch: ch in "\n\r\t" or (ord(ch) < n and cw[ord(ch)] > 0)
+
+    def pick(self, text: str):
+        """(family, text with uncovered characters replaced); the core
+        Helvetica family when there is no TrueType font."""
+        text = str(text)
+        if not self.stack or self._family(0) is False:
+            return "Helvetica", clean_unicode(text)
+        chars = set(text)
+        best, best_missing = 0, None
+        for i in range(len(self.stack)):
+            cw = self._family(i)
+            if cw is False:
+                continue
+            covers = self.covers(cw)
+            missing = sum(1 for ch in chars if not covers(ch))
+            if best_missing is None or missing < best_missing:
+                best, best_missing = i, missing
+            if not missing:
+                return f"draco{i}", text
+        return f"draco{best}", clean_unicode(text, self.covers(self._family(best)))
+
+
+def render_docx(title: str, bullets, path: str) -> str:
+    if not Document:
+        raise RuntimeError("python-docx not installed.")
+    doc = Document()
+    doc.core_properties.title = title
+    try:
+        doc.core_properties.author = "Draco AI"
+        doc.core_properties.subject = "Generated Document"
+    except Exception:
+        pass
+    sec = doc.sections[0]
+    try:
+        sec.top_margin = DocxInches(1)
+        sec.bottom_margin = DocxInches(1)
+        sec.left_margin = DocxInches(1)
+        sec.right_margin = DocxInches(1)
+    except Exception:
+        pass
+    try:
+        header = sec.header
+        hpar = header.paragraphs[0] if header.paragraphs else header.add_paragraph("")
+        hpar.text = title
+        try:
+            from docx.enum.text import WD_ALIGN_PARAGRAPH
+            hpar.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        except Exception:
+            pass
+    except Exception:
+        pass
+    doc.add_heading(title, level=1)
+    for b in bullets:
+        try:
+            p = doc.add_paragraph(str(b), style="List Bullet")
+        except Exception:
+            p = doc.add_paragraph(str(b))
+    doc.save(path)
+    return path
+
+# ------------- PPTX themes -------------
+# One theme per (palette, font): a deck whose slide layouts already carry the
+# background, white card, accent bar, illustration frame and accent-coloured
+# bullet styling. Decks open a copy of the cached theme bytes and only fill
+# placeholders, instead of drawing a card and one oval per bullet per slide.
+PPTX_PALETTES = [
+    {"bg": (245, 248, 255), "accent": (62, 99, 221)},   # soft blue
+    {"bg": (250, 247, 255), "accent": (141, 82, 255)},  # soft violet
+    {"bg": (246, 252, 250), "accent": (10, 163, 127)},  # teal
+    {"bg": (254, 248, 246), "accent": (242, 95, 58)},   # coral
+    {"bg": (247, 249, 252), "accent": (45, 55, 72)},    # slate
+]
+PPTX_FONTS = ["Montserrat", "Poppins", "Roboto", "Segoe UI", "Arial"]
+PPTX_VARIANTS = ["card", "accent_bar", "two_col", "image_text"]
+THEME_LAYOUTS = ["cover"] + PPTX_VARIANTS
+
+_themes = {}
+_themes_lock = threading.Lock()
+
+
+def _hex(rgb) -> str:
+    return "%02X%02X%02X" % tuple(rgb)
+
+
+def _lst_style(size_pt: int, font: str, color=None, bold: bool = False, bullet_color=None):
+    if bullet_color is not None:
+        para = (f' marL="342900" indent="-342900" algn="l"><a:buClr><a:srgbClr val="{_hex(bullet_color)}"/></a:buClr>'
+                '<a:buFont typeface="Arial"/><a:buChar char="&#9679;"/>')
+    else:
+        para = ' marL="0" indent="0" algn="l"><a:buNone/>'
+    fill = f'<a:solidFill><a:srgbClr val="{_hex(color)}"/></a:solidFill>' if color is not None else ""
+    return parse_xml(
+        f'<a:lstStyle {nsdecls("a")}><a:lvl1pPr{para}'
+        f'<a:defRPr sz="{size_pt * 100}" b="{1 if bold else 0}">{fill}<a:latin typeface="{font}"/></a:defRPr>'
+        '</a:lvl1pPr></a:lstStyle>'
+    )
+
+
+def _set_lst_style(sp, lst_style):
+    body = sp.txBody
+    body.replace(body.find(qn("a:lstStyle")), lst_style)
+
+
+def _build_theme(palette_idx: int, font: str) -> bytes:
+    palette = PPTX_PALETTES[palette_idx]
+    bg, accent = RGBColor(*palette["bg"]), RGBColor(*palette["accent"])
+    prs = Presentation()
+    W, H = prs.slide_width, prs.slide_height
+    layouts = list(prs.slide_layouts)
+    title_src = layouts[1].placeholders[0]._element
+    body_src = layouts[1].placeholders[1]._element
+    # decoration shapes are drawn on a scratch slide, then moved into layouts
+    scratch = prs.slides.add_slide(layouts[6])
+
+    def card(margin):
+        s = scratch.shapes.add_shape(MSO_SHAPE.ROUNDED_RECTANGLE, margin, margin, W - margin * 2, H - margin * 2)
+        s.fill.solid()
+        s.fill.fore_color.rgb = RGBColor(255, 255, 255)
+        s.line.fill.background()
+        return s
+
+    def bar():
+        s = scratch.shapes.add_shape(MSO_SHAPE.RECTANGLE, 0, 0, Inches(0.35), H)
+        s.fill.solid()
+        s.fill.fore_color.rgb = accent
+        s.line.fill.background()
+        return s
+
+    def frame(left, top, width, height):
+        s = scratch.shapes.add_shape(MSO_SHAPE.RECTANGLE, left, top, width, height)
+        s.fill.solid()
+        s.fill.fore_color.rgb = RGBColor(235, 240, 255)
+        s.line.color.rgb = accent
+        cap = scratch.shapes.add_textbox(left, top + height + Inches(0.05), width, Inches(0.4))
+        p = cap.text_frame.paragraphs[0]
+        p.text = "Illustration"
+        p.font.name = font
+        p.font.size = Pt(12)
+        return [s, cap]
+
+    col_w = (W - Inches(2.2) - Inches(0.6)) // 2
+    img_left, img_top, img_w, img_h = Inches(1.1), Inches(2.2), Inches(3.6), Inches(3.0)
+    body_top = Inches(2.2)
+    body_h = H - body_top - Inches(1.0)
+    # name -> (decorations, title y, [(idx, left, top, width, height, style)])
+    body_style = _lst_style(22, font, bullet_color=accent)
+    specs = {
+        "cover": ([card(Inches(0.7))], Inches(1.5),
+                  [(1, Inches(1.1), Inches(2.3), W - Inches(2.2), Inches(0.8), _lst_style(20, font))]),
+        "card": ([card(Inches(0.6))], Inches(1.1),
+                 [(1, Inches(1.1), body_top, W - Inches(2.2), body_h, body_style)]),
+        "accent_bar": ([bar(), card(Inches(0.6))], Inches(1.1),
+                       [(1, Inches(1.1), body_top, W - Inches(2.2), body_h, body_style)]),
+        "two_col": ([card(Inches(0.6))], Inches(1.1),
+                    [(1, Inches(1.1), body_top, col_w, body_h, body_style),
+                     (2, Inches(1.1) + col_w + Inches(0.6), body_top, col_w, body_h, body_style)]),
+        "image_text": ([card(Inches(0.6))] + frame(img_left, img_top, img_w, img_h), Inches(1.1),
+                       [(1, img_left + img_w + Inches(0.6), body_top, W - img_left - img_w - Inches(1.7), body_h,
+                         body_style)]),
+    }
+    for layout, name in zip(layouts, THEME_LAYOUTS):
+        decorations, title_y, bodies = specs[name]
+        layout._element.cSld.set("name", name)
+        if name != "cover":
+            layout._element.attrib.pop("type", None)
+        tree = layout.shapes._spTree
+        for el in list(tree.iter_shape_elms()):
+            tree.remove(el)
+        layout.background.fill.solid()
+        layout.background.fill.fore_color.rgb = bg
+        for shape in decorations:
+            tree.append(shape._element)
+        t = copy.deepcopy(title_src)
+        _set_lst_style(t, _lst_style(40, font, color=accent, bold=True))
+        tree.append(t)
+        for idx, *_rest in bodies:
+            b = copy.deepcopy(body_src)
+            b.nvSpPr.nvPr.ph.set("idx", str(idx))
+            _set_lst_style(b, _rest[-1])
+            tree.append(b)
+        for n, el in enumerate(tree.iter_shape_elms()):
+            el.xpath("./*[1]/p:cNvPr")[0].set("id", str(n + 2))
+        for ph in layout.placeholders:
+            idx = ph.placeholder_format.idx
+            if idx == 0:
+                ph.left, ph.top, ph.width, ph.height = Inches(1.1), title_y, W - Inches(2.2), Inches(1.2)
+            else:
+                _, left, top, width, height, _ = next(b for b in bodies if b[0] == idx)
+                ph.left, ph.top, ph.width, ph.height = left, top, width, height
+
+    sld_ids = prs.slides._sldIdLst
+    prs.part.drop_rel(sld_ids[0].rId)
+    sld_ids.remove(sld_ids[0])
+    for layout in layouts[len(THEME_LAYOUTS):]:
+        prs.slide_layouts.remove(layout)
+    buf = io.BytesIO()
+    prs.save(buf)
+    return buf.getvalue()
+
+
+def pptx_theme(palette_idx: int, font: str) -> bytes:
+    """Bytes of the theme deck for a palette and font, built once per process."""
+    key = (palette_idx, font)
+    with _themes_lock:
+        data = _themes.get(key)
+        if data is None:
+            data = _themes[key] = _build_theme(palette_idx, font)
+        return data
+
+
+def _topic_icon(title_text: str) -> str:
+    t = (title_text or "").lower()
+    mapping = [
+        ("ai", "🤖"), ("machine learning", "🤖"), ("data", "📊"), ("analytics", "📈"),
+        ("climate", "🌍"), ("environment", "🌿"), ("biology", "🧬"), ("health", "🩺"),
+        ("medicine", "🧪"), ("finance", "💹"), ("marketing", "📣"), ("cloud", "☁️"),
+        ("security", "🔒"), ("python", "🐍"), ("java", "☕"), ("web", "🌐"),
+        ("quantum", "⚛️"), ("robot", "🤖"), ("network", "🌐"), ("database", "🗄️"),
+    ]
+    for k, e in mapping:
+        if k in t:
+            return e
+    return "✨"
+
+
+def _fill(placeholder, lines):
+    tf = placeholder.text_frame
+    tf.word_wrap = True
+    tf.text = lines[0] if lines else ""
+    for line in lines[1:]:
+        tf.add_paragraph().text = line
+
+
+def render_pptx(title: str, bullets, path: str, max_sentences_per_slide: int = 4, rng=random, sentences=None) -> str:
+    if not Presentation:
+        raise RuntimeError("python-pptx not installed.")
+    palette_idx = rng.randrange(len(PPTX_PALETTES))
+    font_name = rng.choice(PPTX_FONTS)
+    prs = Presentation(io.BytesIO(pptx_theme(palette_idx, font_name)))
+    layout = {l.name: l for l in prs.slide_layouts}
+    icon = _topic_icon(title)
+
+    cover = prs.slides.add_slide(layout["cover"])
+    cover.shapes.title.text = f"{icon}  {title}"
+    cover.placeholders[1].text = "Generated by Draco"
+
+    # Content slides: split into sentences (unless the caller already did)
+    # and batch into slides
+    all_sentences = list(sentences) if sentences is not None else []
+    for b in (bullets if sentences is None else ()):
+        # support list of paragraphs/snippets
+        all_sentences.extend(split_sentences(str(b)))
+
+    if max_sentences_per_slide <= 0:
+        max_sentences_per_slide = 4
+
+    for i in range(0, len(all_sentences), max_sentences_per_slide):
+        chunk = all_sentences[i:i + max_sentences_per_slide]
+        variant = rng.choice(PPTX_VARIANTS)
+        if variant == "two_col" and len(chunk) < 2:
+            variant = "card"
+        s = prs.slides.add_slide(layout[variant])
+        s.shapes.title.text = f"{icon}  Key Points"
+        if variant == "two_col":
+            mid = (len(chunk) + 1) // 2
+            _fill(s.placeholders[1], chunk[:mid])
+            _fill(s.placeholders[2], chunk[mid:])
+        else:
+            _fill(s.placeholders[1], chunk)
+
+    prs.save(path)
+    return path
+
+def render_pdf(title: str, paragraphs, path: str, sources=None, fonts=None, rng=random) -> str:
+    """`fonts`: [(regular, bold), ...] TrueType files, main font first;
+    default pdf_fonts(). An empty list renders with core Helvetica. `rng`
+    picks the palette; with a seeded one the same input gives the same
+    bytes (no creation date is written)."""
+    if not FPDF:
+        raise RuntimeError("fpdf not installed.")
+
+    title = str(title)
+    paragraphs = [str(p) for p in paragraphs]
+    if sources:
+        sources = [str(s) for s in sources]
+
+    class PDFReport(FPDF):
+        def __init__(self, t: str):
+            super().__init__()
+            self.t = t
+            self.theme = rng.choice([
+                {"accent": (10,163,127), "muted": (100,100,120)},
+                {"accent": (62,99,221), "muted": (110,110,140)},
+                {"accent": (242,95,58), "muted": (130,110,110)},
+                {"accent": (45,55,72), "muted": (110,110,120)},
+            ])
+            self.section_links = []
+            self.families = None
+
+        def use(self, style: str, size: int, text: str = "") -> str:
+            # set the family that can show `text`; returns it as printable
+            family, text = self.families.pick(text)
+            self.set_font(family, style, size)
+            return text
+
+        def _putinfo(self):
+            # PyFPDF stamps /CreationDate with the current time; leave it out
+            # so the file depends only on its input
+            out = self._out
+            self._out = lambda s: None if s.startswith("/CreationDate") else out(s)
+            try:
+                super()._putinfo()
+            finally:
+                del self._out
+
+        def header(self):
+            try:
+                t = self.use("", 10, self.t)
+                self.set_text_color(100)
+                self.cell(0, 8, t, ln=1, align="C")
+                self.set_draw_color(200)
+                self.set_line_width(0.2)
+                self.line(self.l_margin, self.get_y(), self.w - self.r_margin, self.get_y())
+                self.ln(2)
+            except:
+                pass
+
+        def footer(self):
+            try:
+                self.set_y(-12)
+                self.use("", 9)
+                self.set_text_color(120)
+                self.cell(0, 10, f"Page {self.page_no()}", align="C")
+            except:
+                pass
+
+    pdf = PDFReport(title)
+    pdf.families = _PdfFonts(pdf, pdf_fonts() if fonts is None else fonts)
+    pdf.set_compression(True)
+    pdf.set_margins(18,16,18)
+    pdf.set_auto_page_break(auto=True, margin=18)
+
+    try:
+        pdf.set_title(clean_unicode(title))  # info strings are written as latin-1
+        pdf.set_author("Draco AI")
+        pdf.set_subject("Generated Report")
+    except:
+        pass
+
+    # COVER PAGE
+    pdf.add_page()
+    pdf.set_text_color(0)
+    pdf.cell(0, 10, txt=pdf.use("B", 18, title), ln=True, align="C")
+
+    pdf.ln(16)
+
+    # Prepare sections
+    section_link_ids = []
+    for idx, _ in enumerate(paragraphs, 1):
+        try:
+            link_id = pdf.add_link()
+        except:
+            link_id = None
+        section_link_ids.append((f"Section {idx}", link_id))
+
+    # CONTENT SECTIONS
+    for i, p in enumerate(paragraphs, 1):
+        pdf.use("B", 14)
+        r,g,b = pdf.theme["accent"]
+        pdf.set_text_color(r,g,b)
+        header = f"Section {i}"
+
+        y_before = pdf.get_y()
+        pdf.cell(0, 8, txt=header, ln=True)
+
+        try:
+            if section_link_ids[i-1][1] is not None:
+                pdf.set_link(section_link_ids[i-1][1], y=y_before, page=pdf.page_no())
+        except:
+            pass
+
+        pdf.set_text_color(0)
+        pdf.multi_cell(0, 7, txt=pdf.use("", 12, p))
+        pdf.ln(2)
+
+    # TABLE OF CONTENTS (auto fallback)
+    try:
+        pdf.set_auto_page_break(auto=True, margin=18)
+        saved_page = pdf.page
+        pdf.page = 1
+        pdf._newpage("P")
+        pdf.page = 2
+        pdf.use("B", 16)
+        pdf.cell(0, 10, "Table of Contents", ln=True)
+        pdf.ln(4)
+        pdf.use("", 12)
+
+        for label, link_id in section_link_ids:
+            pdf.set_text_color(0,0,180)
+            try:
+                pdf.write(8, label, link=link_id)
+            except:
+                pdf.set_text_color(0)
+                pdf.cell(0, 8, label, ln=True)
+            pdf.ln(2)
+
+        pdf.page = saved_page + 1
+    except:
+        # fallback TOC at end
+        pdf.add_page()
+        pdf.use("B", 16)
+        pdf.cell(0, 10, "Table of Contents", ln=True)
+        pdf.ln(4)
+        pdf.use("", 12)
+        for label,_ in section_link_ids:
+            pdf.cell(0, 8, label, ln=True)
+            pdf.ln(2)
+
+    # SOURCES
+    if sources:
+        pdf.ln(4)
+        pdf.set_text_color(0)
+        pdf.use("B", 14)
+        pdf.cell(0, 10, "Sources", ln=True)
+
+        for u in sources:
+            u = pdf.use("", 11, u)
+            try:
+                pdf.set_text_color(0,0,180)
+                pdf.write(6, u, link=u)
+                pdf.ln(6)
+            except:
+                pdf.set_text_color(0)
+                pdf.multi_cell(0,6,txt=u)
+
+        pdf.set_text_color(0)
+
+    if isinstance(path, str):
+        pdf.output(path)
+    else:
+        data = pdf.output(dest="S")
+        # PyFPDF returns a latin-1 str, fpdf2 returns bytes
+        path.write(data.encode("latin-1") if isinstance(data, str) else bytes(data))
+
+    return path
+
+
+# bump when renderer output changes so cached artifacts are not reused
+# (3: embedded Unicode PDF fonts; 4: PDF palette from the spec hash, no cover date)
+RENDER_VERSION = 4
+STEMS = {"docx": "document", "pptx": "slides", "pdf": "report"}
+MIMETYPES = {
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    "pdf": "application/pdf",
+}
+
+
+def spec_digest(spec: dict) -> str:
+    """SHA-256 over everything that affects the output (format, title,
+    content, options), so equal specs name and seed the same artifact."""
+    key = {k: spec.get(k) for k in ("kind", "title", "bullets", "sources", "max_sentences_per_slide")}
+    key["v"] = RENDER_VERSION
+    return hashlib.sha256(json.dumps(key, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def artifact_path(spec: dict, digest: str) -> str:
+    kind = spec.get("kind")
+    title = clean_unicode(spec.get("title") or "")
+    safe = "".join(ch for ch in title if ch.isalnum() or ch in (" ","_","-")).strip() or STEMS.get(kind, "file")
+    return os.path.join(spec.get("out_dir") or "", f"{safe[:40].replace(' ','_')}_{digest[:16]}.{kind}")
+
+
+def is_fresh(path: str, ttl: float = ARTIFACT_TTL) -> bool:
+    try:
+        return time.time() - os.path.getmtime(path) < ttl
+    except OSError:
+        return False
+
+
+def _render_to(spec: dict, out, digest: str):
+    # `out` is a file path or a binary stream
+    kind = spec.get("kind")
+    title = spec.get("title") or ""
+    bullets = spec.get("bullets") or []
+    if kind == "docx":
+        render_docx(title, bullets, out)
+    elif kind == "pptx":
+        render_pptx(title, bullets, out, max_sentences_per_slide=spec.get("max_sentences_per_slide") or 4,
+                    rng=random.Random(int(digest[:16], 16)), sentences=spec.get("sentences"))
+    elif kind == "pdf":
+        render_pdf(title, bullets, out, sources=spec.get("sources"), rng=random.Random(int(digest[:16], 16)))
+    else:
+        raise ValueError(f"unknown render kind: {kind}")
+
+
+def render_local(spec: dict) -> str:
+    """Render a spec in this process. Spec keys: kind (docx|pptx|pdf), title,
+    bullets, out_dir, and optionally sources (pdf), max_sentences_per_slide
+    and sentences (pptx: the bullets already split, see split_spec). Output is written to a temp file and
+    renamed into place, so readers never see a partial artifact."""
+    kind = spec.get("kind")
+    if kind not in STEMS:
+        raise ValueError(f"unknown render kind: {kind}")
+    digest = spec_digest(spec)
+    path = artifact_path(spec, digest)
+    tmp = os.path.join(os.path.dirname(path), f".{digest[:16]}.{os.getpid()}.{kind}.part")
+    try:
+        _render_to(spec, tmp, digest)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return path
+
+
+def render_local_bytes(spec: dict) -> bytes:
+    """Render a spec into memory; nothing touches the disk."""
+    buf = io.BytesIO()
+    _render_to(spec, buf, spec_digest(spec))
+    return buf.getvalue()
+
+
+_pool: Optional[IsolatedPool] = None
+_pool_made = False
+_pool_lock = threading.Lock()
+_inflight = {}  # digest -> lock held while that artifact renders
+_inflight_lock = threading.Lock()
+
+
+def get_pool() -> Optional[IsolatedPool]:
+    global _pool, _pool_made
+    with _pool_lock:
+        if not _pool_made:
+            _pool = make_pool(RENDER_WORKERS, RENDER_MEM_MB)
+            _pool_made = True
+        return _pool
+
+
+def render(spec: dict, timeout: float = RENDER_TIMEOUT) -> str:
+    """Return the artifact for a spec, rendering it on the worker pool unless
+    an identical one was produced within ARTIFACT_TTL. Concurrent identical
+    requests render once. Worker failures are re-raised as RuntimeError."""
+    digest = spec_digest(spec)
+    path = artifact_path(spec, digest)
+    if is_fresh(path):
+        return path
+    with _inflight_lock:
+        lock = _inflight.setdefault(digest, threading.Lock())
+    try:
+        with lock:
+            if is_fresh(path):
+                return path
+            pool = get_pool()
+            if pool is None:
+                return render_local(spec)
+            try:
+                return pool.run(render_local, (spec,), timeout)
+            except PoolError as e:
+                raise RuntimeError(f"render failed: {e}")
+    finally:
+        with _inflight_lock:
+            if _inflight.get(digest) is lock and not lock.locked():
+                del _inflight[digest]
+
+
+def split_spec(spec: dict) -> dict:
+    """The spec with its bullets split into sentences here (memoized per
+    process by draco_text), so the worker does not split them again. Only
+    PPTX uses sentences; they are derived data and not part of the digest."""
+    if spec.get("kind") == "pptx" and spec.get("sentences") is None:
+        spec = dict(spec, sentences=[s for b in spec.get("bullets") or [] for s in split_sentences(str(b))])
+    return spec
+
+
+_fanout: Optional[ThreadPoolExecutor] = None
+
+
+def render_many(specs: List[dict], timeout: float = RENDER_TIMEOUT) -> List[Tuple[Optional[str], Optional[str]]]:
+    """render() for several specs at once, e.g. one content as DOCX, PDF and
+    PPTX: each waits on its own pool worker, so the formats render in
+    parallel. Returns (path, error) per spec, in order; one format failing
+    does not fail the others."""
+    global _fanout
+    with _pool_lock:
+        if _fanout is None:
+            _fanout = ThreadPoolExecutor(max_workers=len(STEMS) * 2, thread_name_prefix="render")
+    futures = [_fanout.submit(render, split_spec(spec), timeout) for spec in specs]
+    out = []
+    for fut in futures:
+        try:
+            out.append((fut.result(), None))
+        except Exception as e:
+            out.append((None, str(e)))
+    return out
+
+
+def render_bytes(spec: dict, timeout: float = RENDER_TIMEOUT):
+    """In-memory counterpart of render() for one-off outputs: returns
+    (data, filename, mimetype) without writing or caching a file. out_dir is
+    not needed."""
+    pool = get_pool()
+    if pool is None:
+        data = render_local_bytes(spec)
+    else:
+        try:
+            data = pool.run(render_local_bytes, (spec,), timeout)
+        except PoolError as e:
+            raise RuntimeError(f"render failed: {e}")
+    name = os.path.basename(artifact_path(spec, spec_digest(spec)))
+    return data, name, MIMETYPES[spec["kind"]]
@@ -0,0 +1,271 @@
+# draco_search.py
+# In-memory positional inverted index with BM25 ranking, phrase queries and
+# highlighted snippets. Used by main.py for chat history and notes search.
+import re
+import html
+import heapq
+import bisect
+import math
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+PHRASE_RE = re.compile(r'"([^"]+)"')
+
+
+def tokenize(text: str) -> List[str]:
+    return [m.group(0).lower() for m in TOKEN_RE.finditer(text or "")]
+
+
+def parse_query(query: str) -> Tuple[List[str], List[List[str]]]:
+    """Split a query into loose terms and "quoted phrases" (as token lists)."""
+    phrases = []
+    for m in PHRASE_RE.finditer(query or ""):
+        toks = tokenize(m.group(1))
+        if toks:
+            phrases.append(toks)
+    terms = tokenize(PHRASE_RE.sub(" ", query or ""))
+    return terms, phrases
+
+
+def highlight(text: str, terms, max_len: int = 180) -> Dict[str, Any]:
+    """Return an HTML-escaped snippet around the first match with <mark> tags,
+    plus the [start, end] character offsets of every match in the full text."""
+    text = text or ""
+    wanted = set(terms)
+    spans = [(m.start(), m.end()) for m in TOKEN_RE.finditer(text) if m.group(0).lower() in wanted]
+    if len(text) <= max_len:
+        lo, hi = 0, len(text)
+    else:
+        first = spans[0][0] if spans else 0
+        lo = max(0, first - max_len // 3)
+        hi = min(len(text), lo + max_len)
+        lo = max(0, hi - max_len)
+    out = []
+    pos = lo
+    for s, e in spans:
+        if s < lo or e > hi:
+            continue
+        out.append(html.escape(text[pos:s]))
+        out.append("<mark>" + html.escape(text[s:e]) + "</mark>")
+        pos = e
+    out.append(html.escape(text[pos:hi]))
+    snippet = "".join(out)
+    if lo > 0:
+        snippet = "…" + snippet
+    if hi < len(text):
+        snippet += "…"
+    return {"snippet": snippet, "spans": [[s, e] for s, e in spans]}
+
+
+def _deletes(term: str) -> List[str]:
+    return [term[:i] + term[i + 1:] for i in range(len(term))]
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    # Damerau-Levenshtein distance <= 1 (insert, delete, substitute, swap)
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la > lb:
+        a, b, la, lb = b, a, lb, la
+    i = 0
+    while i < la and a[i] == b[i]:
+        i += 1
+    if la == lb:
+        if a[i + 1:] == b[i + 1:]:
+            return True
+        return i + 1 < la and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+    return a[i:] == b[i + 1:]
+
+
+class InvertedIndex:
+    """Positional inverted index: term -> {doc_id: [positions]}.
+
+    A forward map doc_id -> terms keeps add/remove proportional to the size of
+    one document, so the index can be maintained incrementally. Queries only
+    touch the posting lists of the query terms.
+    """
+
+    K1 = 1.2
+    B = 0.75
+    PREFIX_WEIGHT = 0.7
+    FUZZY_WEIGHT = 0.5
+    MAX_EXPANSIONS = 32
+    MIN_FUZZY_LEN = 4
+
+    def __init__(self, prefix: bool = False, fuzzy: bool = False):
+        self.postings: Dict[str, Dict[Any, List[int]]] = {}
+        self.doc_terms: Dict[Any, Tuple[str, ...]] = {}
+        self.doc_len: Dict[Any, int] = {}
+        self.docs: Dict[Any, Any] = {}
+        self.total_len = 0
+        self.lock = threading.RLock()
+        # optional lookup structures, maintained only when asked for:
+        # a sorted vocabulary for prefix ranges and a deletion-neighbourhood
+        # map (SymSpell style) for one-typo matches
+        self.vocab: Optional[List[str]] = [] if prefix else None
+        self.deletes: Optional[Dict[str, set]] = {} if fuzzy else None
+
+    def _term_added(self, t: str):
+        if self.vocab is not None:
+            bisect.insort(self.vocab, t)
+        if self.deletes is not None and len(t) >= self.MIN_FUZZY_LEN:
+            for d in _deletes(t):
+                self.deletes.setdefault(d, set()).add(t)
+
+    def _term_removed(self, t: str):
+        if self.vocab is not None:
+            i = bisect.bisect_left(self.vocab, t)
+            if i < len(self.vocab) and self.vocab[i] == t:
+                del self.vocab[i]
+        if self.deletes is not None and len(t) >= self.MIN_FUZZY_LEN:
+            for d in _deletes(t):
+                bucket = self.deletes.get(d)
+                if bucket is not None:
+                    bucket.discard(t)
+                    if not bucket:
+                        del self.deletes[d]
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.doc_len
+
+    def add(self, doc_id, text: str, payload=None):
+        with self.lock:
+            if doc_id in self.doc_len:
+                self.remove(doc_id)
+            toks = tokenize(text)
+            positions: Dict[str, List[int]] = {}
+            for i, t in enumerate(toks):
+                positions.setdefault(t, []).append(i)
+            for t, pos in positions.items():
+                plist = self.postings.get(t)
+                if plist is None:
+                    plist = self.postings[t] = {}
+                    self._term_added(t)
+                plist[doc_id] = pos
+            self.doc_terms[doc_id] = tuple(positions)
+            self.doc_len[doc_id] = len(toks)
+            self.docs[doc_id] = payload
+            self.total_len += len(toks)
+
+    def remove(self, doc_id) -> bool:
+        with self.lock:
+            terms = self.doc_terms.pop(doc_id, None)
+            if terms is None:
+                return False
+            for t in terms:
+                plist = self.postings.get(t)
+                if plist is not None:
+                    plist.pop(doc_id, None)
+                    if not plist:
+                        del self.postings[t]
+                        self._term_removed(t)
+            self.total_len -= self.doc_len.pop(doc_id, 0)
+            self.docs.pop(doc_id, None)
+            return True
+
+    def expand(self, term: str, prefix: bool = False, fuzzy: bool = False) -> List[Tuple[str, float]]:
+        """Vocabulary terms matching `term` as (term, weight): the exact term,
+        then prefix completions and one-edit typo corrections."""
+        out = {}
+        if term in self.postings:
+            out[term] = 1.0
+        if prefix and self.vocab is not None:
+            i = bisect.bisect_left(self.vocab, term)
+            n = 0
+            while i < len(self.vocab) and self.vocab[i].startswith(term) and n < self.MAX_EXPANSIONS:
+                out.setdefault(self.vocab[i], self.PREFIX_WEIGHT)
+                i += 1
+                n += 1
+        if fuzzy and self.deletes is not None and len(term) >= self.MIN_FUZZY_LEN - 1:
+            cands = set(self.deletes.get(term, ()))
+            for d in _deletes(term):
+                if d in self.postings:
+                    cands.add(d)
+                cands.update(self.deletes.get(d, ()))
+            for c in list(cands)[:self.MAX_EXPANSIONS]:
+                if c not in out and _within_one_edit(term, c):
+                    out[c] = self.FUZZY_WEIGHT
+        return list(out.items())
+
+    def _phrase_docs(self, phrase: List[str]) -> set:
+        plists = [self.postings.get(t) for t in phrase]
+        if any(p is None for p in plists):
+            return set()
+        # intersect starting from the rarest term
+        order = sorted(range(len(phrase)), key=lambda k: len(plists[k]))
+        docs = set(plists[order[0]])
+        for k in order[1:]:
+            docs.intersection_update(plists[k])
+            if not docs:
+                return docs
+        hits = set()
+        for d in docs:
+            starts = set(plists[0][d])
+            for k in range(1, len(phrase)):
+                nxt = plists[k][d]
+                starts = {p for p in starts if p + k in nxt} if len(nxt) < 8 else starts & {p - k for p in nxt}
+                if not starts:
+                    break
+            if starts:
+                hits.add(d)
+        return hits
+
+    def search(self, query: str, limit: int = 20, accept: Optional[Callable[[Any], bool]] = None,
+               prefix: bool = False, fuzzy: bool = False):
+        """Rank documents for `query` with BM25.
+
+        Loose terms are OR-ed; every quoted phrase must match exactly.
+        `accept(doc_id)` can filter candidates (e.g. by chat or time range).
+        With `prefix`/`fuzzy`, loose terms also match completions and one-typo
+        variants at a reduced weight.
+        Returns (results, terms) where results is [(doc_id, score)] best first
+        and terms are the tokens worth highlighting.
+        """
+        terms, phrases = parse_query(query)
+        with self.lock:
+            n = len(self.doc_len)
+            if n == 0 or (not terms and not phrases):
+                return [], terms + [t for p in phrases for t in p]
+            required = None
+            for ph in phrases:
+                docs = self._phrase_docs(ph)
+                required = docs if required is None else (required & docs)
+                if not required:
+                    return [], terms + [t for p in phrases for t in p]
+            avgdl = self.total_len / float(n) or 1.0
+            scores: Dict[Any, float] = {}
+            groups = [self.expand(t, prefix, fuzzy) for t in dict.fromkeys(terms)]
+            groups += [[(t, 1.0)] for p in phrases for t in dict.fromkeys(p) if t not in terms]
+            score_terms = []
+            for variants in groups:
+                # a query term contributes its best-matching variant per doc
+                best: Dict[Any, float] = {}
+                for t, w in variants:
+                    plist = self.postings.get(t)
+                    if not plist:
+                        continue
+                    score_terms.append(t)
+                    idf = math.log(1.0 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+                    for d, pos in plist.items():
+                        if required is not None and d not in required:
+                            continue
+                        tf = len(pos)
+                        dl = self.doc_len[d]
+                        s = w * idf * tf * (self.K1 + 1) / (tf + self.K1 * (1 - self.B + self.B * dl / avgdl))
+                        if s > best.get(d, 0.0):
+                            best[d] = s
+                for d, s in best.items():
+                    scores[d] = scores.get(d, 0.0) + s
+            if accept is not None:
+                items = ((d, s) for d, s in scores.items() if accept(d))
+            else:
+                items = scores.items()
+            top = heapq.nlargest(max(1, limit), items, key=lambda x: x[1])
+        return top, score_terms
@@ -0,0 +1,203 @@
+# draco_similarity.py
+# Sentence-level near-duplicate detection between two documents.
+#
+# Each sentence is reduced to its content words (stopwords dropped, plural
+# "s" stripped). Sentences are sketched with MinHash over those words and
+# bucketed by LSH banding, so only sentences sharing a bucket are compared:
+# work grows with the number of sentences, not their product. Candidates
+# are scored exactly, mostly on shared words (a changed word costs little,
+# reworded order keeps the words) and partly on shared adjacent word pairs,
+# so a reordered sentence scores below a lightly edited one.
+import re
+import struct
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from draco_summarize import STOPWORDS
+
+TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+NUM_PERM = 48                  # three 64-byte BLAKE2b digests, 16 minima each
+BANDS = 16                     # 16 bands x 3 rows: Jaccard 0.5 pairs collide ~88% of the time
+ROWS = NUM_PERM // BANDS
+WORD_WEIGHT = 0.7              # share of the pair score from word overlap
+SIMILAR = 0.5                  # lowest score reported as a match
+NEAR_DUPLICATE = 0.8           # at or above: the same sentence, lightly edited
+MAX_BUCKET = 64                # larger buckets are boilerplate; skipped
+_SALTS = (b"draco-mh-0", b"draco-mh-1", b"draco-mh-2")
+_UNPACK = struct.Struct("<%dI" % NUM_PERM).unpack
+
+
+def normalize(sentence: str) -> str:
+    return " ".join(sentence.lower().split())
+
+
+def features(sentence: str) -> Tuple[frozenset, frozenset]:
+    """(content words, adjacent word pairs) of a sentence."""
+    words = [m.group(0).lower() for m in TOKEN_RE.finditer(sentence)]
+    toks = [w[:-1] if len(w) > 4 and w.endswith("s") and not w.endswith("ss") else w
+            for w in words if w not in STOPWORDS] or words
+    return frozenset(toks), frozenset(zip(toks, toks[1:]))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    inter = len(a & b)
+    return inter / float(len(a) + len(b) - inter)
+
+
+def score(fa: Tuple[frozenset, frozenset], fb: Tuple[frozenset, frozenset]) -> float:
+    return WORD_WEIGHT * jaccard(fa[0], fb[0]) + (1.0 - WORD_WEIGHT) * jaccard(fa[1], fb[1])
+
+
+class _Sketcher:
+    # token digests are reused across sentences (vocabulary is Zipfian)
+    def __init__(self):
+        self.digests: Dict[str, bytes] = {}
+
+    def signature(self, words: frozenset) -> Tuple[int, ...]:
+        if not words:
+            return (0,) * NUM_PERM
+        digests = self.digests
+        cols = []
+        for w in words:
+            d = digests.get(w)
+            if d is None:
+                b = w.encode("utf-8")
+                d = digests[w] = b"".join(hashlib.blake2b(b, digest_size=64, person=salt).digest()
+                                          for salt in _SALTS)
+            cols.append(_UNPACK(d))
+        return tuple(map(min, zip(*cols)))
+
+
+class SentenceIndex:
+    """Streaming near-duplicate filter. Sentences are added one at a time;
+    find() returns the id of an earlier sentence scoring at least
+    `threshold` against the query (the best one), or None."""
+
+    def __init__(self, threshold: float = NEAR_DUPLICATE):
+        self.threshold = threshold
+        self.sketch = _Sketcher()
+        self.exact: Dict[str, int] = {}
+        self.features: List[Tuple[frozenset, frozenset]] = []
+        self.buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+
+    def __len__(self):
+        return len(self.features)
+
+    def _bands(self, f):
+        sig = self.sketch.signature(f[0])
+        return [(band, sig[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+    def find(self, sentence: str) -> Optional[int]:
+        n = normalize(sentence)
+        if n in self.exact:
+            return self.exact[n]
+        f = features(n)
+        best, best_id = self.threshold, None
+        cand = set()
+        for key in self._bands(f):
+            hit = self.buckets.get(key)
+            if hit and len(hit) <= MAX_BUCKET:
+                cand.update(hit)
+        for j in cand:
+            sc = score(f, self.features[j])
+            if sc >= best:
+                best, best_id = sc, j
+        return best_id
+
+    def add(self, sentence: str) -> int:
+        n = normalize(sentence)
+        if n in self.exact:
+            return self.exact[n]
+        f = features(n)
+        sid = len(self.features)
+        self.features.append(f)
+        self.exact[n] = sid
+        for key in self._bands(f):
+            self.buckets.setdefault(key, []).append(sid)
+        return sid
+
+
+def _distinct(sentences: Sequence[str]) -> List[Tuple[int, str]]:
+    seen = set()
+    out = []
+    for i, s in enumerate(sentences):
+        n = normalize(s)
+        if n and n not in seen:
+            seen.add(n)
+            out.append((i, n))
+    return out
+
+
+def compare(a: Sequence[str], b: Sequence[str]) -> Dict:
+    """Match the sentences of `a` to those of `b`.
+
+    Returns one-to-one `pairs` ({"a", "b", "score", "kind"}, indices into the
+    inputs, in `a` order), the unmatched `only_a` / `only_b` indices, and two
+    whole-document scores: `similarity`, the share of text (by characters) in
+    matched pairs weighted by pair score, and `jaccard` over the two
+    vocabularies. Repeated sentences count once, at their first occurrence."""
+    da = _distinct(a)
+    db = _distinct(b)
+    b_by_text = {n: j for j, n in db}
+    scored: List[Tuple[float, int, int]] = []
+    rest_a = []
+    for i, n in da:
+        j = b_by_text.get(n)
+        if j is not None:
+            scored.append((1.0, i, j))
+        else:
+            rest_a.append((i, n))
+    exact_b = {j for _, _, j in scored}
+    rest_b = [(j, n) for j, n in db if j not in exact_b]
+
+    fa = {i: features(n) for i, n in rest_a}
+    fb = {j: features(n) for j, n in rest_b}
+    sketch = _Sketcher()
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+    for j, f in fb.items():
+        sig = sketch.signature(f[0])
+        for band in range(BANDS):
+            buckets.setdefault((band, sig[band * ROWS:(band + 1) * ROWS]), []).append(j)
+    for i, f in fa.items():
+        sig = sketch.signature(f[0])
+        cand = set()
+        for band in range(BANDS):
+            hit = buckets.get((band, sig[band * ROWS:(band + 1) * ROWS]))
+            if hit and len(hit) <= MAX_BUCKET:
+                cand.update(hit)
+        for j in cand:
+            sc = score(f, fb[j])
+            if sc >= SIMILAR:
+                scored.append((sc, i, j))
+
+    # best pairs first, each sentence used once
+    scored.sort(key=lambda t: (-t[0], t[1], t[2]))
+    used_a, used_b = set(), set()
+    pairs = []
+    for sc, i, j in scored:
+        if i in used_a or j in used_b:
+            continue
+        used_a.add(i)
+        used_b.add(j)
+        kind = "identical" if sc >= 1.0 and normalize(a[i]) == normalize(b[j]) else (
+            "near_duplicate" if sc >= NEAR_DUPLICATE else "similar")
+        pairs.append({"a": i, "b": j, "score": round(sc, 3), "kind": kind})
+    pairs.sort(key=lambda p: p["a"])
+
+    len_a = {i: len(n) for i, n in da}
+    len_b = {j: len(n) for j, n in db}
+    total = sum(len_a.values()) + sum(len_b.values())
+    matched = sum(p["score"] * (len_a[p["a"]] + len_b[p["b"]]) for p in pairs)
+    words_a = frozenset().union(*(fa[i][0] if i in fa else features(n)[0] for i, n in da))
+    words_b = frozenset().union(*(fb[j][0] if j in fb else features(n)[0] for j, n in db))
+    return {
+        "pairs": pairs,
+        "only_a": [i for i, _ in da if i not in used_a],
+        "only_b": [j for j, _ in db if j not in used_b],
+        "similarity": round(matched / total, 3) if total else 1.0,
+        "jaccard": round(jaccard(words_a, words_b), 3),
+        "sentences_a": len(da),
+        "sentences_b": len(db),
+    }
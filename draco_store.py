@@ -0,0 +1,421 @@
+# draco_store.py
+# Content-addressed upload storage, resumable chunked upload sessions and a
+# bounded cache of extracted text.
+import os
+import re
+import json
+import time
+import secrets
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class StoredUpload:
+    def __init__(self, path: Optional[str], sha256: str, size: int, name: str, ext: str, existed: bool,
+                 data: Optional[bytes] = None):
+        self.path = path          # None for an upload held in memory
+        self.sha256 = sha256
+        self.size = size
+        self.name = name          # sanitized original filename
+        self.ext = ext            # lower-case extension incl. dot
+        self.existed = existed    # same content was already stored
+        self.data = data
+
+    @property
+    def source(self):
+        """What the extractors read: the bytes if in memory, else the path."""
+        return self.data if self.data is not None else self.path
+
+    def to_dict(self):
+        return {"sha256": self.sha256, "size": self.size, "name": self.name, "ext": self.ext}
+
+
+class UploadStore:
+    """Stores uploads under <root>/<sha256><ext>.
+
+    The stream is hashed while it is copied to a temp file in the same
+    directory, then renamed into place, so identical uploads share one file
+    no matter what they were called.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, sha256: str, ext: str) -> str:
+        return os.path.join(self.root, sha256 + ext)
+
+    def save_stream(self, stream, name: str, head: bytes = b"") -> StoredUpload:
+        # `head`: bytes already read from the front of the stream
+        ext = os.path.splitext(name)[1].lower()
+        h = hashlib.sha256(head)
+        size = len(head)
+        fd, tmp = tempfile.mkstemp(prefix=".incoming_", dir=self.root)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(head)
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    h.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            digest = h.hexdigest()
+            final = self.path_for(digest, ext)
+            existed = os.path.exists(final)
+            if existed:
+                os.remove(tmp)
+                os.utime(final)
+            else:
+                os.replace(tmp, final)
+            return StoredUpload(final, digest, size, name, ext, existed)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def save(self, file_storage, name: str, max_memory: int = 0) -> StoredUpload:
+        """Store a werkzeug FileStorage (or anything with .stream/.read).
+
+        A stream of at most `max_memory` bytes is not written at all: the
+        result holds the bytes (path None) and is gone with the request.
+        """
+        stream = getattr(file_storage, "stream", file_storage)
+        head = b""
+        if max_memory > 0:
+            parts = []
+            got = 0
+            while got <= max_memory:
+                chunk = stream.read(min(CHUNK_SIZE, max_memory + 1 - got))
+                if not chunk:
+                    break
+                parts.append(chunk)
+                got += len(chunk)
+            head = b"".join(parts)
+            if len(head) <= max_memory:
+                ext = os.path.splitext(name)[1].lower()
+                return StoredUpload(None, hashlib.sha256(head).hexdigest(), len(head), name, ext, False, head)
+        return self.save_stream(stream, name, head)
+
+    def adopt(self, path: str, sha256: str, name: str) -> StoredUpload:
+        """Move an already hashed file (same filesystem) into the store."""
+        ext = os.path.splitext(name)[1].lower()
+        size = os.path.getsize(path)
+        final = self.path_for(sha256, ext)
+        existed = os.path.exists(final)
+        if existed:
+            os.remove(path)
+            os.utime(final)
+        else:
+            os.replace(path, final)
+        return StoredUpload(final, sha256, size, name, ext, existed)
+
+
+class UploadError(Exception):
+    def __init__(self, code: str, status: int = 400, **info):
+        super().__init__(code)
+        self.code = code
+        self.status = status
+        self.info = info
+
+
+class ChunkedUploads:
+    """Resumable uploads: init a session, write chunks at increasing offsets,
+    then finalize into an UploadStore.
+
+    Each session is <root>/<id>.part (the bytes) plus <id>.json (metadata).
+    The metadata offset only advances after a chunk is fully written and its
+    checksum verified, so after a crash or disconnect the part file is cut
+    back to it and the client resumes from there. Chunks are streamed to
+    disk; nothing is buffered beyond CHUNK_SIZE.
+    """
+
+    ID_RE = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+
+    def __init__(self, root: str, store: UploadStore, max_bytes: int, max_chunk: int):
+        self.root = root
+        self.store = store
+        self.max_bytes = max_bytes
+        self.max_chunk = max_chunk
+        self.lock = threading.Lock()
+        self.locks: Dict[str, threading.Lock] = {}
+        self.hashers: Dict[str, tuple] = {}  # id -> (offset, running sha256)
+        os.makedirs(root, exist_ok=True)
+
+    def part_path(self, uid: str) -> str:
+        return os.path.join(self.root, uid + ".part")
+
+    def meta_path(self, uid: str) -> str:
+        return os.path.join(self.root, uid + ".json")
+
+    def _session_lock(self, uid: str) -> threading.Lock:
+        with self.lock:
+            return self.locks.setdefault(uid, threading.Lock())
+
+    def _write_meta(self, meta: dict):
+        path = self.meta_path(meta["id"])
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def get(self, uid: str) -> dict:
+        if not self.ID_RE.match(uid or ""):
+            raise UploadError("unknown_upload", 404)
+        try:
+            with open(self.meta_path(uid), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise UploadError("unknown_upload", 404)
+
+    def init(self, name: str, size: int, sha256: Optional[str] = None) -> dict:
+        if size <= 0:
+            raise UploadError("invalid_size")
+        if size > self.max_bytes:
+            raise UploadError("too_large", 413, max_bytes=self.max_bytes)
+        if sha256 is not None and not re.match(r"^[0-9a-f]{64}$", sha256):
+            raise UploadError("invalid_sha256")
+        uid = secrets.token_urlsafe(18)
+        open(self.part_path(uid), "wb").close()
+        meta = {"id": uid, "name": name, "size": size, "sha256": sha256, "offset": 0,
+                "state": "open", "created": time.time()}
+        self._write_meta(meta)
+        return meta
+
+    def write(self, uid: str, offset: int, stream, length: Optional[int], chunk_sha256: Optional[str]) -> dict:
+        """Append one chunk at `offset`, verifying it against `chunk_sha256`
+        (hex) when given. A chunk at the wrong offset is refused with the
+        current offset so the client can resume."""
+        with self._session_lock(uid):
+            meta = self.get(uid)
+            if meta["state"] != "open":
+                raise UploadError("already_finalized", 409)
+            if offset != meta["offset"]:
+                raise UploadError("offset_mismatch", 409, offset=meta["offset"])
+            if length is not None and (length > self.max_chunk or offset + length > meta["size"]):
+                raise UploadError("chunk_too_large", 413, max_chunk=self.max_chunk)
+            path = self.part_path(uid)
+            h = hashlib.sha256()
+            # whole-file hash carried across in-order chunks; after a
+            # restart it is recomputed from disk at finalize instead
+            prev = self.hashers.get(uid)
+            full = hashlib.sha256() if offset == 0 else (prev[1].copy() if prev and prev[0] == offset else None)
+            got = 0
+            try:
+                with open(path, "r+b") as out:
+                    out.truncate(offset)  # drop any unverified tail
+                    out.seek(offset)
+                    while True:
+                        block = stream.read(CHUNK_SIZE)
+                        if not block:
+                            break
+                        got += len(block)
+                        if got > self.max_chunk or offset + got > meta["size"]:
+                            raise UploadError("chunk_too_large", 413, max_chunk=self.max_chunk)
+                        h.update(block)
+                        if full is not None:
+                            full.update(block)
+                        out.write(block)
+                    if got == 0:
+                        raise UploadError("empty_chunk")
+                    if length is not None and got != length:
+                        raise UploadError("incomplete_chunk", offset=offset)
+                    if chunk_sha256 and h.hexdigest() != chunk_sha256.lower():
+                        raise UploadError("checksum_mismatch", 422, offset=offset)
+            except UploadError:
+                with open(path, "r+b") as out:
+                    out.truncate(offset)
+                raise
+            except FileNotFoundError:
+                raise UploadError("unknown_upload", 404)
+            meta["offset"] = offset + got
+            self._write_meta(meta)
+            if full is not None:
+                self.hashers[uid] = (meta["offset"], full)
+            else:
+                self.hashers.pop(uid, None)
+            return meta
+
+    def finalize(self, uid: str) -> StoredUpload:
+        with self._session_lock(uid):
+            meta = self.get(uid)
+            if meta["state"] == "done":
+                self._forget(uid)
+                return self.stored(meta)
+            if meta["offset"] != meta["size"]:
+                raise UploadError("incomplete_upload", 409, offset=meta["offset"], size=meta["size"])
+            path = self.part_path(uid)
+            run = self.hashers.pop(uid, None)
+            if run is not None and run[0] == meta["size"]:
+                digest = run[1].hexdigest()
+            else:
+                h = hashlib.sha256()
+                with open(path, "rb") as f:
+                    for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+                        h.update(block)
+                digest = h.hexdigest()
+            if meta.get("sha256") and digest != meta["sha256"]:
+                self.discard(uid)
+                raise UploadError("checksum_mismatch", 422)
+            up = self.store.adopt(path, digest, meta["name"])
+            meta.update(state="done", sha256=digest, path=up.path, ext=up.ext)
+            self._write_meta(meta)
+            self._forget(uid)
+            return up
+
+    def stored(self, meta: dict) -> StoredUpload:
+        return StoredUpload(meta["path"], meta["sha256"], meta["size"], meta["name"], meta["ext"], True)
+
+    def _forget(self, uid: str):
+        # a finished session needs neither its lock nor a running hash; a
+        # late request for it just gets a fresh lock
+        with self.lock:
+            self.locks.pop(uid, None)
+            self.hashers.pop(uid, None)
+
+    def prune(self):
+        """Forget sessions whose files are gone (removed by the janitor)."""
+        with self.lock:
+            stale = [uid for uid in set(self.locks) | set(self.hashers) if not os.path.exists(self.meta_path(uid))]
+        for uid in stale:
+            self._forget(uid)
+
+    def discard(self, uid: str):
+        self._forget(uid)
+        for p in (self.part_path(uid), self.meta_path(uid)):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+
+class ExtractionCache:
+    """Extracted text keyed by content hash.
+
+    Two LRU tiers: an in-memory OrderedDict bounded by total characters and a
+    directory of <key>.txt files bounded by total bytes. A hit on disk is
+    promoted to memory; evictions drop the least recently used entries.
+    `version` is part of the key so changing an extractor invalidates old text.
+    """
+
+    def __init__(self, root: str, max_disk_bytes: int, max_mem_chars: int, version: str = "1"):
+        self.root = root
+        self.max_disk_bytes = max_disk_bytes
+        self.max_mem_chars = max_mem_chars
+        self.version = version
+        self.lock = threading.Lock()
+        self.mem = OrderedDict()
+        self.mem_chars = 0
+        self.disk = OrderedDict()  # key -> size, least recently used first
+        self.disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+        entries = []
+        for fn in os.listdir(root):
+            if fn.endswith(".txt"):
+                try:
+                    st = os.stat(os.path.join(root, fn))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, fn[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self.disk[key] = size
+            self.disk_bytes += size
+
+    def _key(self, sha256: str) -> str:
+        return f"{sha256}.v{self.version}"
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.root, key + ".txt")
+
+    def _remember(self, key: str, text: str):
+        # caller holds self.lock
+        if len(text) > self.max_mem_chars:
+            return
+        old = self.mem.pop(key, None)
+        if old is not None:
+            self.mem_chars -= len(old)
+        self.mem[key] = text
+        self.mem_chars += len(text)
+        while self.mem_chars > self.max_mem_chars and self.mem:
+            _, ev = self.mem.popitem(last=False)
+            self.mem_chars -= len(ev)
+
+    def contains(self, sha256: str) -> bool:
+        key = self._key(sha256)
+        with self.lock:
+            return key in self.mem or key in self.disk
+
+    def get(self, sha256: str) -> Optional[str]:
+        key = self._key(sha256)
+        with self.lock:
+            text = self.mem.get(key)
+            if text is not None:
+                self.mem.move_to_end(key)
+                if key in self.disk:
+                    self.disk.move_to_end(key)
+                self.hits += 1
+                return text
+            on_disk = key in self.disk
+        if on_disk:
+            try:
+                with open(self._file(key), "r", encoding="utf-8") as f:
+                    text = f.read()
+                os.utime(self._file(key))
+            except OSError:
+                text = None
+            with self.lock:
+                if text is None:
+                    self.disk_bytes -= self.disk.pop(key, 0)
+                else:
+                    if key in self.disk:
+                        self.disk.move_to_end(key)
+                    self._remember(key, text)
+                    self.hits += 1
+                    return text
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, sha256: str, text: str):
+        key = self._key(sha256)
+        data = text.encode("utf-8")
+        path = self._file(key)
+        if len(data) <= self.max_disk_bytes:
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        evict = []
+        with self.lock:
+            self._remember(key, text)
+            if len(data) <= self.max_disk_bytes:
+                self.disk_bytes -= self.disk.pop(key, 0)
+                self.disk[key] = len(data)
+                self.disk_bytes += len(data)
+                while self.disk_bytes > self.max_disk_bytes and len(self.disk) > 1:
+                    k, size = self.disk.popitem(last=False)
+                    self.disk_bytes -= size
+                    evict.append(k)
+        for k in evict:
+            try:
+                os.remove(self._file(k))
+            except OSError:
+                pass
+
+    def get_or_extract(self, sha256: str, extract: Callable[[], str]) -> str:
+        text = self.get(sha256)
+        if text is None:
+            text = extract() or ""
+            if text:
+                self.put(sha256, text)
+        return text
@@ -0,0 +1,224 @@
+# draco_summarize.py
+# Extractive summarization over TF-IDF sentence vectors.
+#
+# Sentences are sparse {term: weight} vectors. Short inputs are ranked with
+# TextRank (PageRank over the cosine-similarity graph); longer ones with a
+# centroid scorer: cosine to the document's TF-IDF centroid. The centroid
+# comes straight from corpus term counts, so long documents take two
+# tokenizing passes and keep only the vocabulary and a top-k heap in memory;
+# sentence vectors are never stored. The *_stream variants take a sentence
+# generator factory instead of a sequence, so the sentences themselves need
+# not be held either.
+import re
+import math
+import heapq
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+WORD_RE = re.compile(r"[^\W\d_]{2,}", re.UNICODE)
+STOPWORDS = frozenset(
+    "a an and are as at be been but by can could did do does for from had has have he her his i if in into is it its "
+    "may might more most no not of on or our she should so such than that the their them then there these they this "
+    "those to too very was we were what when where which while who will with would you your also about over "
+    "after before between both each other some any only own same just".split()
+)
+TEXTRANK_MAX_SENTENCES = 300   # above this the O(n^2) graph is not worth it
+CENTROID_TERMS = 256           # centroid truncated to its heaviest terms
+DAMPING = 0.85
+MIN_TOKENS = 4                 # shorter sentences are fragments, not points
+LONG_TOKENS = 45               # longer ones read badly as bullet points
+REDUNDANCY = 0.75              # skip picks this similar to an earlier pick
+DUPLICATE = 0.95               # similarity treated as the same sentence
+CANDIDATES = 4                 # ranked candidates examined per requested pick
+
+
+def terms(sentence: str) -> List[str]:
+    return [w for w in (m.group(0).lower() for m in WORD_RE.finditer(sentence)) if w not in STOPWORDS]
+
+
+def _counts(toks: List[str]) -> Dict[str, int]:
+    c: Dict[str, int] = {}
+    for t in toks:
+        c[t] = c.get(t, 0) + 1
+    return c
+
+
+def _vector(counts: Dict[str, int], idf: Dict[str, float]) -> Dict[str, float]:
+    v = {t: (1.0 + math.log(n)) * idf.get(t, 0.0) for t, n in counts.items()}
+    norm = math.sqrt(sum(w * w for w in v.values())) or 1.0
+    return {t: w / norm for t, w in v.items()}
+
+
+def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    # unit vectors: the dot product is the cosine
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(w * b.get(t, 0.0) for t, w in a.items())
+
+
+def _length_factor(n_tokens: int) -> float:
+    if n_tokens < MIN_TOKENS:
+        return 0.2
+    if n_tokens > LONG_TOKENS:
+        return LONG_TOKENS / float(n_tokens)
+    return 1.0
+
+
+def _idf(df: Dict[str, int], n: int) -> Dict[str, float]:
+    return {t: math.log((1.0 + n) / (1.0 + d)) + 1.0 for t, d in df.items()}
+
+
+def term_stats(toks: Iterable[List[str]]) -> Tuple[int, Dict[str, int], Dict[str, int]]:
+    """(sentences, document frequency, total count) of each term over
+    tokenized sentences; what rank() would otherwise count itself."""
+    df: Dict[str, int] = {}
+    tf: Dict[str, int] = {}
+    n = 0
+    for ts in toks:
+        for t, m in _counts(ts).items():
+            df[t] = df.get(t, 0) + 1
+            tf[t] = tf.get(t, 0) + m
+        n += 1
+    return n, df, tf
+
+
+def _textrank_scores(sentences: Sequence[str], toks: Sequence[List[str]], stats=None):
+    _, df, _ = stats or term_stats(toks)
+    idf = _idf(df, len(sentences))
+    vecs = [_vector(_counts(ts), idf) for ts in toks]
+    n = len(vecs)
+    # only pairs that share a term can have non-zero similarity
+    by_term: Dict[str, List[int]] = {}
+    for i, v in enumerate(vecs):
+        for t in v:
+            by_term.setdefault(t, []).append(i)
+    edges: List[Dict[int, float]] = [{} for _ in range(n)]
+    for i, v in enumerate(vecs):
+        for j in {j for t in v for j in by_term[t] if j > i}:
+            w = _cosine(v, vecs[j])
+            if 0.0 < w < DUPLICATE:  # repeated copies don't vote for each other
+                edges[i][j] = w
+                edges[j][i] = w
+    out_w = [sum(e.values()) or 1.0 for e in edges]
+    rank = [1.0 / n] * n
+    for _ in range(50):
+        nxt = [(1.0 - DAMPING) / n + DAMPING * sum(rank[j] * w / out_w[j] for j, w in edges[i].items())
+               for i in range(n)]
+        delta = sum(abs(a - b) for a, b in zip(nxt, rank))
+        rank = nxt
+        if delta < 1e-6:
+            break
+    # a sentence sharing no terms with the rest is off topic (boilerplate)
+    return [r * _length_factor(len(ts)) if e else 0.0 for r, ts, e in zip(rank, toks, edges)], idf
+
+
+def _centroid_top(source: Callable[[], Iterable[Tuple[str, List[str]]]], k: int, stats=None):
+    # source() yields (sentence, terms) and is consumed twice, or once when
+    # the caller has the term_stats() already
+    # pass 1: document frequency and corpus term counts
+    n, df, tf = stats or term_stats(ts for _, ts in source())
+    idf = _idf(df, n)
+    centroid = heapq.nlargest(CENTROID_TERMS, ((w * idf[t], t) for t, w in tf.items()))
+    norm = math.sqrt(sum(w * w for w, _ in centroid)) or 1.0
+    centroid = {t: w / norm for w, t in centroid}
+    # pass 2: score against the centroid, keeping only the best k
+    heap: List = []
+    for i, (s, ts) in enumerate(source()):
+        score = _cosine(_vector(_counts(ts), idf), centroid) * _length_factor(len(ts))
+        if len(heap) < k:
+            heapq.heappush(heap, (score, -i, s, ts))
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, (score, -i, s, ts))
+    return [(-neg, score, s, ts) for score, neg, s, ts in sorted(heap, reverse=True)], idf
+
+
+def _pick(top, idf, limit: int):
+    # top: (index, score, sentence, terms), best first
+    ranked = [e for e in top if e[1] > 0.0] or top[:1]
+    picked = []
+    picked_vecs: List[Dict[str, float]] = []
+    for e in ranked:
+        v = _vector(_counts(e[3]), idf)
+        if any(_cosine(v, p) > REDUNDANCY for p in picked_vecs):
+            continue
+        picked.append(e)
+        picked_vecs.append(v)
+        if len(picked) >= limit:
+            break
+    return picked
+
+
+def rank(sentences: Sequence[str], limit: int, toks: Optional[Sequence[List[str]]] = None,
+         stats=None) -> List[int]:
+    """Indices of up to `limit` representative sentences, best first, with
+    near-duplicates of earlier picks skipped. `toks` are the sentences'
+    terms() and `stats` their term_stats() when the caller already has
+    them."""
+    n = len(sentences)
+    if n == 0 or limit <= 0:
+        return []
+    want = min(n, limit * CANDIDATES)
+    if n <= TEXTRANK_MAX_SENTENCES:
+        toks = toks if toks is not None else [terms(s) for s in sentences]
+        scores, idf = _textrank_scores(sentences, toks, stats)
+        top = [(i, scores[i], sentences[i], toks[i])
+               for i in heapq.nlargest(want, range(n), key=lambda i: (scores[i], -i))]
+    elif toks is not None:
+        top, idf = _centroid_top(lambda: zip(sentences, toks), want, stats)
+    else:
+        # tokenized again on the second pass rather than kept
+        top, idf = _centroid_top(lambda: ((s, terms(s)) for s in sentences), want)
+    return [e[0] for e in _pick(top, idf, limit)]
+
+
+def rank_stream(source: Callable[[], Iterable[str]], limit: int) -> List[Tuple[int, str]]:
+    """rank() over the sentences yielded by source(), as (index, sentence).
+
+    source() is called up to three times: once to tell a short document
+    (TextRank) from a long one, then for the two centroid passes. Only the
+    vocabulary and the best limit * CANDIDATES sentences are held, never
+    the whole document."""
+    if limit <= 0:
+        return []
+    head = list(islice(source(), TEXTRANK_MAX_SENTENCES + 1))
+    if len(head) <= TEXTRANK_MAX_SENTENCES:
+        return [(i, head[i]) for i in rank(head, limit)]
+    del head
+    top, idf = _centroid_top(lambda: ((s, terms(s)) for s in source()), limit * CANDIDATES)
+    return [(e[0], e[2]) for e in _pick(top, idf, limit)]
+
+
+def key_points(sentences: Sequence[str], limit: int) -> List[str]:
+    """The `limit` most representative sentences, best first."""
+    return [sentences[i].strip() for i in rank(sentences, limit)]
+
+
+def key_points_stream(source: Callable[[], Iterable[str]], limit: int) -> List[str]:
+    """key_points() over a re-startable sentence generator (see rank_stream)."""
+    return [s.strip() for _, s in rank_stream(source, limit)]
+
+
+def summary_limit(max_chars: int) -> int:
+    # a sentence averages well over 40 characters; rank a few spare
+    return max(1, max_chars // 40)
+
+
+def summarize(sentences: Sequence[str], max_chars: int, order: Optional[List[int]] = None) -> str:
+    """Highest-ranked sentences that fit in `max_chars`, in document order.
+    `order` is a precomputed rank(sentences, summary_limit(max_chars))."""
+    if not sentences:
+        return ""
+    if order is None:
+        order = rank(sentences, summary_limit(max_chars))
+    chosen = []
+    used = 0
+    for i in order:
+        size = len(" ".join(sentences[i].split())) + 1
+        if used + size <= max_chars:
+            chosen.append(i)
+            used += size
+    if not chosen:
+        # even the best sentence is over budget: cut it
+        best = " ".join(sentences[order[0]].split()) if order else ""
+        return best[:max(1, max_chars - 1)].rstrip() + "…"
+    return " ".join(" ".join(sentences[i].split()) for i in sorted(chosen))
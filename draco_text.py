@@ -0,0 +1,104 @@
+# draco_text.py
+# Sentence tokenizer shared by every text path (summaries, key points,
+# compare, slides).
+#
+# One precompiled pattern finds candidate boundaries: terminal punctuation
+# followed by whitespace, CJK / Devanagari / Arabic full stops (which need no
+# space after them) and blank lines. A "." candidate is rejected when the
+# token before it is a known abbreviation, a dotted initialism (e.g., U.S.,
+# z.B.) or a single initial, or when the next word starts in lower case or
+# with a digit. Results for recently seen texts are memoized.
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterator, Tuple
+
+ABBREVIATIONS = frozenset("""
+mr mrs ms dr prof sr jr st mt rev gen col lt sgt capt gov sen rep hon
+vs no nos fig figs eq eqs al ref refs vol vols pp ed eds ch sec art approx est misc dept
+inc ltd co corp bros jan feb mar apr jun jul aug sep sept oct nov dec
+""".split())
+
+_CLOSERS = "\"'’”)\\]»」』"
+# every candidate starts with one character from a single class, which lets
+# the regex engine skip ahead quickly; the branch is then picked by look-behind
+_BOUNDARY_RE = re.compile(
+    r"[.!?…。！？।॥۔؟\n]"
+    r"(?:(?<=[.!?…])[.!?…]*[" + _CLOSERS + r"]*(?=\s|$)"   # Latin-style, needs a space after
+    r"|(?<=[。！？।॥۔؟])[。！？।॥۔؟]*[" + _CLOSERS + r"]*"   # stops that need no space
+    r"|(?<=\n)[ \t]*\n\s*)"                                # blank line
+)
+_LATIN_STOPS = ".!?…"
+_INITIALISM_RE = re.compile(r"^(?:[^\W\d_]\.)+[^\W\d_]$")
+_LEADING = "(\"'[“‘"
+
+MEMO_CHARS = 4 * 1024 * 1024       # total characters of memoized input
+MEMO_MAX_TEXT = 512 * 1024         # longer texts are not memoized
+_memo = OrderedDict()
+_memo_chars = 0
+_memo_lock = threading.Lock()
+
+
+def _latin_boundary(text: str, m) -> bool:
+    end = m.group(0).rstrip(_CLOSERS)
+    if end != "." and end != "…" and end != "...":
+        return True  # ! ? and mixed runs always end a sentence
+    e = m.end()
+    nxt = text[e:e + 8].lstrip()[:1]
+    if nxt and (nxt.islower() or nxt.isdigit()):
+        return False
+    if end != ".":
+        return True
+    st = m.start()
+    lo = max(0, st - 40)
+    ws = max(text.rfind(" ", lo, st), text.rfind("\n", lo, st), text.rfind("\t", lo, st))
+    word = text[(ws + 1 if ws >= 0 else lo):st].lstrip(_LEADING)
+    if len(word) <= 1:
+        return not (word.isalpha() and word.isupper())  # an initial
+    return not (word.lower() in ABBREVIATIONS or _INITIALISM_RE.match(word))
+
+
+def iter_sentences(text: str) -> Iterator[str]:
+    """Yield the sentences of `text` lazily, whitespace-trimmed, in order."""
+    if not text:
+        return
+    start = 0
+    for m in _BOUNDARY_RE.finditer(text):
+        c = text[m.start()]
+        if c == "\n":
+            cut = m.start()  # blank line: the break itself is not content
+        elif c in _LATIN_STOPS and not _latin_boundary(text, m):
+            continue
+        else:
+            cut = m.end()
+        s = text[start:cut].strip()
+        if s:
+            yield s
+        start = m.end()
+    s = text[start:].strip()
+    if s:
+        yield s
+
+
+def split_sentences(text: str, min_len: int = 0) -> Tuple[str, ...]:
+    """All sentences of `text` (those of at least `min_len` characters).
+    Repeated calls on the same text are served from a bounded memo."""
+    global _memo_chars
+    text = text or ""
+    with _memo_lock:
+        sents = _memo.get(text)
+        if sents is not None:
+            _memo.move_to_end(text)
+    if sents is None:
+        sents = tuple(iter_sentences(text))
+        if len(text) <= MEMO_MAX_TEXT:
+            with _memo_lock:
+                if text not in _memo:
+                    _memo[text] = sents
+                    _memo_chars += len(text)
+                    while _memo_chars > MEMO_CHARS:
+                        old, _ = _memo.popitem(last=False)
+                        _memo_chars -= len(old)
+    if min_len > 0:
+        return tuple(s for s in sents if len(s) >= min_len)
+    return sents
@@ -8,45 +8,32 @@ import sys
 import time
 import json
 import random
+import io
 import datetime
+import mimetypes
 import threading
+import bisect
+import heapq
+import queue
 import subprocess
 import platform
 import webbrowser
+import tempfile
 from urllib.parse import quote as url_quote
 from urllib.parse import urlparse
-from collections import deque
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 import re
 from flask import session
-from flask import Flask, send_from_directory, request, session, redirect, url_for, jsonify
+from flask import Flask, send_from_directory, send_file, request, session, redirect, url_for, jsonify
 from flask_socketio import SocketIO, emit
+from flask import Request
 from werkzeug.utils import secure_filename
 try:
     from docx import Document
 except Exception:
     Document = None
-try:
-    from pptx import Presentation
-    from pptx.util import Inches, Pt
-    from pptx.enum.text import PP_ALIGN
-    from pptx.dml.color import RGBColor
-    from pptx.enum.shapes import MSO_SHAPE
-except Exception:
-    Presentation = None
-    Inches = None
-    Pt = None
-    PP_ALIGN = None
-    RGBColor = None
-    MSO_SHAPE = None
-try:
-    from fpdf import FPDF
-except Exception:
-    FPDF = None
-try:
-    from PyPDF2 import PdfReader
-except Exception:
-    PdfReader = None
 import sympy as sp
 # optional imports (best-effort)
 try:
@@ -94,6 +81,16 @@ try:
     import draco_chat
 except Exception:
     draco_chat = None
+from draco_search import InvertedIndex, highlight
+from draco_store import UploadStore, ExtractionCache, ChunkedUploads, UploadError
+from draco_janitor import Janitor
+from draco_knowledge import KnowledgeBase
+from draco_document import DocumentModel
+import draco_document
+import draco_extract
+import draco_render
+import draco_similarity
+import draco_text
 
 ON_RENDER = os.environ.get("RENDER") is not None
 ON_SERVER = ON_RENDER or (os.environ.get("PORT") is not None) or (os.environ.get("RENDER_EXTERNAL_URL") is not None)
@@ -101,7 +98,20 @@ ON_SERVER = ON_RENDER or (os.environ.get("PORT") is not None) or (os.environ.get
 # ------------- Flask / SocketIO -------------
 # Force Flask-SocketIO to use threading instead of eventlet or gevent
 os.environ["FLASK_SOCKETIO_ASYNC_MODE"] = "threading"
+# uploads up to this size are parsed from memory and never touch the disk;
+# larger ones spill to a temp file and are stored in UPLOADS_DIR
+UPLOAD_MEMORY_KB = int(os.environ.get("DRACO_UPLOAD_MEMORY_KB", "1024"))
+
+
+class SpooledRequest(Request):
+    # werkzeug spools multipart files to disk past 500 KB; keep them in
+    # memory up to UPLOAD_MEMORY_KB instead
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_MEMORY_KB * 1024, mode="rb+")
+
+
 app = Flask(__name__, static_folder=".", template_folder=".")
+app.request_class = SpooledRequest
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "dev-secret-change-me")
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
 # Limit uploads to 20 MB
@@ -111,6 +121,7 @@ app.config["MAX_CONTENT_LENGTH"] = 20 * 1024 * 1024
 MEMORY_FILE = "memory.json"
 NOTES_FILE = "notes.json"
 REMINDERS_FILE = "reminders.json"
+REMINDER_OUTBOX_FILE = "reminder_outbox.json"
 WEATHER_API_KEY = ""   # add your OpenWeatherMap key if desired
 NEWSAPI_KEY = ""       # add your News API key if desired
 USERS_DIR = os.path.join(os.getcwd(), "users")
@@ -205,58 +216,29 @@ def _create_new_chat(email: str):
     _set_current_chat_id(cid)
     return chat
 
+# per-user ChatSearchIndex (see below). Chat writes and index builds share
+# _chat_indexes_lock, so an index built from chats.json never misses a line
+# saved while it was being built.
+_chat_indexes = {}
+_chat_indexes_lock = threading.Lock()
+
 def _clear_current_chat(email: str):
-    chats = _load_chats(email)
-    cid = _current_chat_id()
-    for c in chats:
-        if c.get("id") == cid:
-            c["items"] = []
-            c["updated_at"] = time.time()
-            _save_chats(email, chats)
-            return True
-    return False
+    with _chat_indexes_lock:
+        chats = _load_chats(email)
+        cid = _current_chat_id()
+        for c in chats:
+            if c.get("id") == cid:
+                c["items"] = []
+                c["updated_at"] = time.time()
+                _save_chats(email, chats)
+                idx = _chat_indexes.get(email)
+                if idx is not None:
+                    idx.drop_chat(cid)
+                return True
+        return False
 
 STOPWORDS = set("the a an and or to for in of on with at by from as be is are was were it this that these those i you he she we they them our your my mine ours yours their his her its about into than too very just can could should would will shall may might do does did not no yes ok please hey hi hello how what when where which who why".split())
 
-def clean_unicode(text: str) -> str:
-    """
-    Convert unicode text into safe latin-1 ASCII because FPDF can't encode unicode.
-    Anything unsupported is replaced safely.
-    """
-    if text is None:
-        return ""
-
-    # ensure it's a string
-    text = str(text)
-
-    # common replacements
-    replacements = {
-        "\u2018": "'", "\u2019": "'",         # curved single quotes
-        "\u201c": '"', "\u201d": '"',         # curved double quotes
-        "\u2026": "...",                      # ellipsis …
-        "\u2014": "-", "\u2013": "-",         # long dashes — –
-        "\u2022": "-",                        # bullet •
-        "\u00a0": " ",                         # non-breaking space
-        "\u2192": "->", "\u2190": "<-",       # arrows
-        "\u2191": "^",  "\u2193": "v",
-        "\u2713": "✓",                        # checkmark
-        "\u2020": "*", "\u2021": "*",         # dagger
-    }
-
-    for bad, rep in replacements.items():
-        text = text.replace(bad, rep)
-
-    # remove/replace any remaining characters not in latin-1
-    safe = []
-    for ch in text:
-        if ord(ch) <= 255:
-            safe.append(ch)
-        else:
-            safe.append("?")   # replace unsupported unicode
-
-    return "".join(safe)
-
-
 def _summarize_chat_name(items):
     # items: list of {who, text}
     texts = [x.get("text", "") for x in items if x.get("who") == "user"]
@@ -283,19 +265,23 @@ def _summarize_chat_name(items):
     return name[:80]
 
 def save_chat_line(email: str, who: str, text: str):
-    chats = _load_chats(email)
-    chat = _get_or_create_current_chat(email)
-    # refresh chats after current selection (IDs)
-    cid = chat.get("id")
-    for c in chats:
-        if c.get("id") == cid:
-            c.setdefault("items", []).append({"ts": time.time(), "who": who, "text": text})
-            # set name on first meaningful lines
-            if (not c.get("name")) or c.get("name") in ("New chat", ""):
-                c["name"] = _summarize_chat_name(c["items"]) or "New Chat"
-            c["updated_at"] = time.time()
-            break
-    _save_chats(email, chats)
+    with _chat_indexes_lock:
+        chats = _load_chats(email)
+        chat = _get_or_create_current_chat(email)
+        # refresh chats after current selection (IDs)
+        cid = chat.get("id")
+        for c in chats:
+            if c.get("id") == cid:
+                c.setdefault("items", []).append({"ts": time.time(), "who": who, "text": text})
+                # set name on first meaningful lines
+                if (not c.get("name")) or c.get("name") in ("New chat", ""):
+                    c["name"] = _summarize_chat_name(c["items"]) or "New Chat"
+                c["updated_at"] = time.time()
+                idx = _chat_indexes.get(email)
+                if idx is not None:
+                    idx.add_line(cid, c.get("name"), len(c["items"]) - 1, c["items"][-1])
+                break
+        _save_chats(email, chats)
 
 def get_chat_history(email: str, chat_id: Optional[str] = None):
     chats = _load_chats(email)
@@ -311,6 +297,67 @@ def get_chat_history(email: str, chat_id: Optional[str] = None):
         return chats[0].get("items", [])
     return []
 
+# ------------- Chat history search -------------
+class ChatSearchIndex:
+    """Per-user full-text index over chat messages.
+
+    Built from chats.json on first use, then kept current by save_chat_line
+    and _clear_current_chat so queries never rescan the chat files. Built
+    and published under _chat_indexes_lock, which those writers hold too.
+    """
+
+    def __init__(self, email: str):
+        self.index = InvertedIndex()
+        self.names = {}
+        self.chat_docs = {}
+        for c in _load_chats(email):
+            cid = c.get("id")
+            self.names[cid] = c.get("name")
+            for i, item in enumerate(c.get("items", [])):
+                self.add_line(cid, None, i, item)
+
+    def add_line(self, cid, name, pos: int, item: dict):
+        if name:
+            self.names[cid] = name
+        doc_id = f"{cid}:{pos}"
+        payload = {"chat_id": cid, "pos": pos, "who": item.get("who"), "ts": item.get("ts"), "text": item.get("text", "")}
+        self.index.add(doc_id, payload["text"], payload)
+        self.chat_docs.setdefault(cid, []).append(doc_id)
+
+    def drop_chat(self, cid):
+        for doc_id in self.chat_docs.pop(cid, []):
+            self.index.remove(doc_id)
+
+    def search(self, query: str, limit: int = 20, chat_id: Optional[str] = None):
+        accept = None
+        if chat_id:
+            prefix = f"{chat_id}:"
+            accept = lambda d: d.startswith(prefix)
+        hits, terms = self.index.search(query, limit=limit, accept=accept)
+        out = []
+        for doc_id, score in hits:
+            p = self.index.docs.get(doc_id) or {}
+            hl = highlight(p.get("text", ""), terms)
+            out.append({
+                "chat_id": p.get("chat_id"),
+                "chat_name": self.names.get(p.get("chat_id")) or "New Chat",
+                "pos": p.get("pos"),
+                "who": p.get("who"),
+                "ts": p.get("ts"),
+                "score": round(score, 4),
+                "snippet": hl["snippet"],
+                "spans": hl["spans"],
+            })
+        return out
+
+def _chat_search_index(email: str) -> ChatSearchIndex:
+    with _chat_indexes_lock:
+        idx = _chat_indexes.get(email)
+        if idx is None:
+            idx = ChatSearchIndex(email)
+            _chat_indexes[email] = idx
+        return idx
+
 def get_user_profile(email: str):
     p = user_paths(email)
     return safe_read_json(p["profile"], {})
@@ -407,65 +454,398 @@ def speak(text):
             print("TTS error:", e)
 
 # ------------- Notes / Reminders -------------
+class JsonJournal:
+    """Snapshot + append-only journal for id-keyed records.
+
+    `path` holds a JSON list snapshot; each change is appended to
+    <name>.journal.jsonl as {"op": "put", "rec": {...}} or {"op": "del", "id": ..}
+    instead of rewriting the whole file. Once the journal outgrows the record
+    count it is folded back into the snapshot, so writes cost O(1) amortised.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.journal_path = os.path.splitext(path)[0] + ".journal.jsonl"
+        self.ops = 0
+
+    def load(self):
+        records = {}
+        for rec in safe_read_json(self.path, []):
+            if isinstance(rec, dict) and rec.get("id") is not None:
+                records[rec["id"]] = rec
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except Exception:
+                        continue  # torn last line after a crash
+                    if op.get("op") == "put" and op.get("rec"):
+                        records[op["rec"]["id"]] = op["rec"]
+                    elif op.get("op") == "del":
+                        records.pop(op.get("id"), None)
+                    self.ops += 1
+        return records
+
+    def append(self, op, count: int) -> bool:
+        """Log one op. Returns True once the journal has outgrown `count`
+        live records and the caller should compact()."""
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(op) + "\n")
+        self.ops += 1
+        return self.ops > max(256, count)
+
+    @staticmethod
+    def put_op(rec):
+        return {"op": "put", "rec": rec}
+
+    @staticmethod
+    def del_op(rid):
+        return {"op": "del", "id": rid}
+
+    def compact(self, records):
+        tmp = self.path + ".tmp"
+        safe_write_json(tmp, list(records.values()))
+        os.replace(tmp, self.path)
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+        self.ops = 0
+
+def _next_ms_id(last: int) -> int:
+    # ms timestamp ids, kept unique and increasing
+    return max(int(time.time() * 1000), last + 1)
+
 class NotesManager:
+    """Id-keyed notes with a text index, persisted through a JsonJournal."""
+
     def __init__(self, path=NOTES_FILE):
         self.path = path
-        self.notes = safe_read_json(self.path, [])
+        self.lock = threading.RLock()
+        self.store = JsonJournal(path)
+        self.notes = {}
+        self.index = InvertedIndex(prefix=True, fuzzy=True)
+        self._by_time = []  # sorted (created_ts, id); stale ids skipped lazily
+        self._last_id = 0
+        for n in self.store.load().values():
+            self._apply_add(n)
+        self._by_time.sort()
+
+    def _apply_add(self, note):
+        nid = note.get("id")
+        try:
+            ts = datetime.datetime.fromisoformat(note.get("created", "")).timestamp()
+        except Exception:
+            ts = nid / 1000.0
+        self.notes[nid] = note
+        self._last_id = max(self._last_id, nid)
+        self.index.add(nid, note.get("text", ""), ts)
+        self._by_time.append((ts, nid))
+
+    def _compact(self):
+        self.store.compact(self.notes)
+        self._by_time = sorted((self.index.docs[nid], nid) for nid in self.notes)
 
     def add(self, text):
-        nid = int(time.time() * 1000)
-        self.notes.append({"id": nid, "text": text, "created": datetime.datetime.now().isoformat()})
-        safe_write_json(self.path, self.notes)
-        return nid
+        with self.lock:
+            nid = _next_ms_id(self._last_id)
+            note = {"id": nid, "text": text, "created": datetime.datetime.now().isoformat()}
+            self._apply_add(note)
+            if len(self._by_time) > 1 and self._by_time[-1] < self._by_time[-2]:
+                self._by_time.sort()  # clock went backwards
+            if self.store.append(JsonJournal.put_op(note), len(self.notes)):
+                self._compact()
+            return nid
 
     def delete(self, nid):
-        self.notes = [n for n in self.notes if n["id"] != nid]
-        safe_write_json(self.path, self.notes)
+        with self.lock:
+            # _by_time is cleaned up lazily (on compaction)
+            if self.notes.pop(nid, None) is None:
+                return
+            self.index.remove(nid)
+            if self.store.append(JsonJournal.del_op(nid), len(self.notes)):
+                self._compact()
+
+    def get(self, nid):
+        return self.notes.get(nid)
 
     def list(self):
-        return list(self.notes)
+        return list(self.notes.values())
+
+    def _ids_between(self, since=None, until=None):
+        lo = 0 if since is None else bisect.bisect_left(self._by_time, (since, -1))
+        hi = len(self._by_time) if until is None else bisect.bisect_right(self._by_time, (until, float("inf")))
+        return {nid for _, nid in self._by_time[lo:hi] if nid in self.notes}
+
+    def search(self, query: str, limit: int = 10, since: Optional[float] = None, until: Optional[float] = None):
+        """Ranked notes for `query` (prefix and one-typo tolerant), optionally
+        limited to notes created between the `since`/`until` timestamps.
+        An empty query lists the newest notes in the range."""
+        with self.lock:
+            accept = None
+            if since is not None or until is not None:
+                allowed = self._ids_between(since, until)
+                accept = allowed.__contains__
+            if not (query or "").strip():
+                ids = sorted(allowed if accept else self.notes, key=lambda n: self.index.docs[n], reverse=True)
+                return [dict(self.notes[n], score=0.0) for n in ids[:limit]]
+            hits, _ = self.index.search(query, limit=limit, accept=accept, prefix=True, fuzzy=True)
+            return [dict(self.notes[nid], score=round(score, 4)) for nid, score in hits]
 
 class ReminderManager:
-    def __init__(self, path=REMINDERS_FILE):
+    """Min-heap reminder scheduler.
+
+    The scheduler thread sleeps on a condition variable exactly until the
+    earliest due time and is woken early when an earlier reminder is added.
+    Removals are lazy: stale heap entries are skipped when they surface, so
+    add, remove and fire are all O(log n). Fired reminders are handed to a
+    delivery thread and journal writes to a writer thread, so neither a slow
+    speak() nor a compaction ever delays the next reminder.
+    Reminders with "repeat" (seconds) are rescheduled after firing.
+    `deliver(reminder)` is called on the delivery thread for each firing.
+    """
+
+    def __init__(self, path=REMINDERS_FILE, deliver=None):
         self.path = path
-        self.reminders = safe_read_json(self.path, [])
+        self.deliver = deliver or (lambda r: speak(f"Reminder: {r['text']}"))
+        self.store = JsonJournal(path)
+        self.cond = threading.Condition()
+        self.reminders = {}
+        self._heap = []  # (due_ts, id)
+        self._last_id = 0
+        for r in self.store.load().values():
+            try:
+                due = datetime.datetime.fromisoformat(r["at"]).timestamp()
+            except Exception:
+                continue
+            self.reminders[r["id"]] = r
+            self._last_id = max(self._last_id, r["id"])
+            self._heap.append((due, r["id"]))
+        heapq.heapify(self._heap)
+        self._outbox = queue.Queue()
+        self._writes = queue.Queue()
         self._start_loop()
 
-    def add(self, text, when: datetime.datetime):
-        rid = int(time.time() * 1000)
-        self.reminders.append({"id": rid, "text": text, "at": when.isoformat()})
-        safe_write_json(self.path, self.reminders)
-        return rid
+    def add(self, text, when: datetime.datetime, repeat: Optional[float] = None, owner: Optional[str] = None):
+        with self.cond:
+            rid = _next_ms_id(self._last_id)
+            self._last_id = rid
+            r = {"id": rid, "text": text, "at": when.isoformat()}
+            if repeat:
+                r["repeat"] = float(repeat)
+            if owner:
+                r["owner"] = owner
+            self._schedule(r, when.timestamp())
+            return rid
+
+    def _schedule(self, r, due: float):
+        # caller holds self.cond
+        self.reminders[r["id"]] = r
+        self._writes.put(JsonJournal.put_op(r))
+        earliest = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (due, r["id"]))
+        if earliest is None or due < earliest:
+            self.cond.notify()
 
     def remove(self, rid):
-        self.reminders = [r for r in self.reminders if r["id"] != rid]
-        safe_write_json(self.path, self.reminders)
+        with self.cond:
+            if self.reminders.pop(rid, None) is not None:
+                self._writes.put(JsonJournal.del_op(rid))
 
     def list(self):
-        return list(self.reminders)
+        with self.cond:
+            return sorted(self.reminders.values(), key=lambda r: r["at"])
 
     def _start_loop(self):
-        t = threading.Thread(target=self._loop, daemon=True)
-        t.start()
+        threading.Thread(target=self._loop, daemon=True).start()
+        threading.Thread(target=self._deliver_loop, daemon=True).start()
+        threading.Thread(target=self._write_loop, daemon=True).start()
 
     def _loop(self):
+        with self.cond:
+            while True:
+                # drop entries whose reminder was removed
+                while self._heap and self._heap[0][1] not in self.reminders:
+                    heapq.heappop(self._heap)
+                if not self._heap:
+                    self.cond.wait()
+                    continue
+                due, rid = self._heap[0]
+                delay = due - time.time()
+                if delay > 0:
+                    self.cond.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                r = self.reminders[rid]
+                self._outbox.put(dict(r))
+                repeat = r.get("repeat")
+                if repeat and repeat > 0:
+                    nxt = due + repeat
+                    now = time.time()
+                    if nxt <= now:  # skip occurrences missed while offline
+                        nxt += ((now - nxt) // repeat + 1) * repeat
+                    r = dict(r, at=datetime.datetime.fromtimestamp(nxt).isoformat())
+                    self._schedule(r, nxt)
+                else:
+                    del self.reminders[rid]
+                    self._writes.put(JsonJournal.del_op(rid))
+
+    def _write_loop(self):
+        # ops are idempotent, so compacting from a snapshot that already
+        # includes still-queued changes is safe
         while True:
-            now = datetime.datetime.now()
-            to_fire = []
-            for r in list(self.reminders):
-                try:
-                    at = datetime.datetime.fromisoformat(r["at"])
-                    if now >= at:
-                        to_fire.append(r)
-                except Exception:
+            op = self._writes.get()
+            try:
+                if self.store.append(op, len(self.reminders)):
+                    with self.cond:
+                        snapshot = dict(self.reminders)
+                    self.store.compact(snapshot)
+            except Exception as e:
+                print("Reminder save error:", e)
+
+    def _deliver_loop(self):
+        while True:
+            r = self._outbox.get()
+            try:
+                self.deliver(r)
+            except Exception as e:
+                print("Reminder delivery error:", e)
+
+class ReminderOutbox:
+    """Delivers fired reminders to the owning browser over Socket.IO.
+
+    Each client (a stable id kept in the browser's localStorage) has a
+    bounded pending queue; the oldest entry is dropped when it overflows.
+    A single sender thread emits at most WINDOW unacknowledged reminders per
+    client and resends them after ACK_TIMEOUT or on reconnect. The browser
+    answers "reminder_ack" to remove an entry. Pending entries are journaled,
+    so reminders that fire while a client is offline are replayed when it
+    comes back, even across restarts. deliver() only enqueues, so a slow or
+    disconnected browser never blocks the reminder threads.
+    """
+
+    MAX_PENDING = 100
+    WINDOW = 4
+    ACK_TIMEOUT = 15.0
+
+    def __init__(self, path=REMINDER_OUTBOX_FILE):
+        self.store = JsonJournal(path)
+        self.cond = threading.Condition()
+        self.pending = {}   # client_id -> OrderedDict(delivery_id -> payload)
+        self.inflight = {}  # client_id -> {delivery_id: sent_at}
+        self.sids = {}      # client_id -> [sid, ...] (latest last)
+        self.client_of = {} # sid -> client_id
+        self.dropped = 0
+        self._records = self.store.load()
+        for rec in sorted(self._records.values(), key=lambda x: x.get("payload", {}).get("fired_at", 0)):
+            self.pending.setdefault(rec["client"], OrderedDict())[rec["id"]] = rec["payload"]
+        threading.Thread(target=self._send_loop, daemon=True).start()
+
+    def _log(self, op):
+        if self.store.append(op, len(self._records)):
+            self.store.compact(self._records)
+
+    def deliver(self, r):
+        client = r.get("owner")
+        payload = {
+            "id": f"{r['id']}:{r['at']}",
+            "reminder_id": r["id"],
+            "text": r.get("text", ""),
+            "at": r.get("at"),
+            "fired_at": time.time(),
+        }
+        with self.cond:
+            q = self.pending.setdefault(client, OrderedDict())
+            q[payload["id"]] = payload
+            rec = {"id": payload["id"], "client": client, "payload": payload}
+            self._records[rec["id"]] = rec
+            self._log(JsonJournal.put_op(rec))
+            while len(q) > self.MAX_PENDING:
+                old, _ = q.popitem(last=False)
+                self.inflight.get(client, {}).pop(old, None)
+                self._records.pop(old, None)
+                self._log(JsonJournal.del_op(old))
+                self.dropped += 1
+            self.cond.notify()
+
+    def connect(self, client_id: str, sid: str):
+        with self.cond:
+            self.client_of[sid] = client_id
+            self.sids.setdefault(client_id, []).append(sid)
+            self.inflight.pop(client_id, None)  # replay anything unacked
+            self.cond.notify()
+
+    def disconnect(self, sid: str):
+        with self.cond:
+            client_id = self.client_of.pop(sid, None)
+            if client_id is None:
+                return
+            live = [x for x in self.sids.get(client_id, []) if x != sid]
+            if live:
+                self.sids[client_id] = live
+            else:
+                self.sids.pop(client_id, None)
+                self.inflight.pop(client_id, None)
+
+    def ack(self, client_id: str, delivery_id: str):
+        with self.cond:
+            q = self.pending.get(client_id)
+            if q is None or q.pop(delivery_id, None) is None:
+                return False
+            self.inflight.get(client_id, {}).pop(delivery_id, None)
+            if not q:
+                del self.pending[client_id]
+            self._records.pop(delivery_id, None)
+            self._log(JsonJournal.del_op(delivery_id))
+            self.cond.notify()
+            return True
+
+    def _send_loop(self):
+        while True:
+            batch = []
+            with self.cond:
+                now = time.time()
+                for client_id, q in self.pending.items():
+                    sids = self.sids.get(client_id)
+                    if not sids:
+                        continue
+                    sent = self.inflight.setdefault(client_id, {})
+                    for did, at in list(sent.items()):
+                        if now - at > self.ACK_TIMEOUT:
+                            del sent[did]
+                    for did, payload in q.items():
+                        if len(sent) >= self.WINDOW:
+                            break
+                        if did not in sent:
+                            sent[did] = now
+                            batch.append((sids[-1], payload))
+                if not batch:
+                    self.cond.wait(self.ACK_TIMEOUT if self.inflight else None)
                     continue
-            for r in to_fire:
-                speak(f"Reminder: {r['text']}")
-                self.remove(r["id"])
-            time.sleep(6)
+            for sid, payload in batch:
+                try:
+                    socketio.emit("reminder", payload, to=sid)
+                except Exception as e:
+                    print("Reminder emit error:", e)
+
+def _deliver_reminder(r):
+    if not r.get("owner"):
+        # no browser owns it (voice/local command): speak and broadcast
+        speak(f"Reminder: {r['text']}")
+        emit_to_ui("reminder", {"id": None, "reminder_id": r["id"], "text": r.get("text", ""), "at": r.get("at")})
+        return
+    if not ON_SERVER:
+        speak(f"Reminder: {r['text']}")
+    reminder_outbox.deliver(r)
 
 notes_mgr = NotesManager()
-reminder_mgr = ReminderManager()
+reminder_outbox = ReminderOutbox()
+reminder_mgr = ReminderManager(deliver=_deliver_reminder)
+
+# study notes (knowledge/*.txt) answered locally before a web search
+KNOWLEDGE_DIR = os.environ.get("DRACO_KNOWLEDGE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge"))
+knowledge = KnowledgeBase(KNOWLEDGE_DIR)
 
 # ------------- System utilities -------------
 def system_status_summary():
@@ -874,6 +1254,46 @@ def duckduck_fallback(query: str, limit: int = 3):
         return f"Bro fallback error: {e}"
     
 # ------------- Command processing (centralised) -------------
+# id of the browser that sent the command being processed (None for voice)
+_command_ctx = threading.local()
+
+def _current_client_id() -> Optional[str]:
+    return getattr(_command_ctx, "client_id", None)
+
+_CLIENT_ID_RE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+def _valid_client_id(value) -> Optional[str]:
+    value = str(value or "")
+    return value if _CLIENT_ID_RE.match(value) else None
+
+def _parse_when(text: str, end: bool = False) -> Optional[float]:
+    """Parse 'today', 'yesterday', 'last N days|weeks' or an ISO date into a
+    timestamp (start of day, or end of day when `end`)."""
+    t = (text or "").strip().lower()
+    today = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    day = None
+    if t == "today":
+        day = today
+    elif t == "yesterday":
+        day = today - datetime.timedelta(days=1)
+    elif t in ("last week", "a week ago"):
+        day = today - datetime.timedelta(days=7)
+    else:
+        m = re.match(r"last\s+(\d+)\s+(day|week)s?$", t)
+        if m:
+            n = int(m.group(1)) * (7 if m.group(2) == "week" else 1)
+            day = today - datetime.timedelta(days=n)
+        else:
+            try:
+                day = datetime.datetime.fromisoformat(t)
+            except Exception:
+                return None
+            if len(t) > 10:
+                return day.timestamp()  # explicit time given
+    if end:
+        day = day + datetime.timedelta(days=1) - datetime.timedelta(microseconds=1)
+    return day.timestamp()
+
 def process_command(raw_cmd: str) -> str:
     """
     Central router: map raw user phrases to functions. Returns a string that will be both emitted and spoken.
@@ -909,9 +1329,56 @@ def process_command(raw_cmd: str) -> str:
         speak(reply)
         return reply
     
+    # notes search (before the generic "notes" generation intent below)
+    # "search notes <term> [since|from <when>] [until|to <when>]"
+    if cmd.startswith("search notes") or cmd.startswith("find notes") or cmd.startswith("search my notes"):
+        q = re.sub(r"^(search|find)\s+(my\s+)?notes\s*(for\s+)?", "", cmd)
+        since = until = None
+        m = re.search(r"\s(?:until|to)\s+(.+)$", q)
+        if m and _parse_when(m.group(1)) is not None:
+            until = _parse_when(m.group(1), end=True)
+            q = q[:m.start()]
+        m = re.search(r"(?:^|\s)(?:since|from)\s+(.+)$", q)
+        if m and _parse_when(m.group(1)) is not None:
+            since = _parse_when(m.group(1))
+            q = q[:m.start()]
+        q = q.strip()
+        found = notes_mgr.search(q, limit=6, since=since, until=until)
+        if not found:
+            return "No matching notes."
+        reply = "; ".join(f"{i+1}. {n['text']}" for i, n in enumerate(found))
+        speak(f"Found {len(found)} notes.")
+        return reply
+
+    # several formats on one topic ("generate slides and a pdf on X"): one
+    # research pass, all formats rendered together
+    m = re.match(r"^(?:generate|create|make)\s+(.+?)\s+on\s+(.+)$", cmd)
+    if m:
+        try:
+            kinds = _parse_formats([re.sub(r"\b(?:a|an|the|both)\b", " ", m.group(1))])
+        except ValueError:
+            kinds = []
+        topic = m.group(2).strip()
+        if len(kinds) > 1 and topic:
+            files, errors, sources = _generate_topic(topic, kinds)
+            if not files:
+                return f"Could not generate files: {'; '.join(errors.values())}"
+            speak("Your files are ready.")
+            labeled = []
+            for u in sources:
+                try:
+                    d = urlparse(u).netloc or u
+                except Exception:
+                    d = u
+                labeled.append({"label": d, "url": u})
+            links = ", ".join(f"{k.upper()}: {url}" for k, url in files.items())
+            return {"text": f"Generated {len(files)} files for {topic}. {links}", "action": "open_url",
+                    "url": next(iter(files.values())), "files": files, "errors": errors,
+                    "sources": sources, "sources_labeled": labeled}
+
         # ---- Intent Detection for File Generation Before DeepSeek ----
     if any(x in cmd for x in ["ppt", "slides", "presentation"]):
-        topic = raw_cmd.replace("ppt", "").replace("slides", "").replace("presentation", "").strip()
+        topic = _command_topic(raw_cmd, ("ppt", "pptx", "slides", "presentation"))
         if topic:
             points, sources = research_query_to_texts_with_sources(topic, limit=8)
             path = _generate_pptx(f"{topic.title()} - Slides", points)
@@ -920,7 +1387,7 @@ def process_command(raw_cmd: str) -> str:
             return {"text": f"PPT Generated for {topic}.", "action": "open_url", "url": url}
 
     if any(x in cmd for x in ["pdf", "report"]):
-        topic = raw_cmd.replace("pdf", "").replace("report", "").strip()
+        topic = _command_topic(raw_cmd, ("pdf", "report"))
         if topic:
             points, sources = research_query_to_texts_with_sources(topic, limit=12)
             path = _generate_pdf(f"{topic.title()} - Report", points, sources=sources)
@@ -929,7 +1396,7 @@ def process_command(raw_cmd: str) -> str:
             return {"text": f"PDF Generated for {topic}.", "action": "open_url", "url": url}
 
     if any(x in cmd for x in ["doc", "notes"]):
-        topic = raw_cmd.replace("doc", "").replace("notes", "").strip()
+        topic = _command_topic(raw_cmd, ("doc", "docx", "notes"))
         if topic:
             points, sources = research_query_to_texts_with_sources(topic, limit=10)
             path = _generate_docx(f"{topic.title()} - Notes", points)
@@ -1308,21 +1775,32 @@ def process_command(raw_cmd: str) -> str:
         return short
 
     if "set reminder" in cmd or "remind me" in cmd:
-        # naive parse: "remind me to call mom at 19:30"
-        if " at " in cmd:
+        # naive parse: "remind me to call mom at 19:30 [every day]"
+        #              "remind me to drink water every 2 hours"
+        repeat = None
+        m = re.search(r"\s+every\s+(\d+\s+)?(minute|hour|day|week)s?\b|\s+(daily|hourly|weekly)\b", cmd)
+        if m:
+            unit = m.group(2) or {"daily": "day", "hourly": "hour", "weekly": "week"}[m.group(3)]
+            repeat = int((m.group(1) or "1").strip()) * {"minute": 60, "hour": 3600, "day": 86400, "week": 604800}[unit]
+            cmd = (cmd[:m.start()] + cmd[m.end():]).strip()
+        if " at " in cmd or repeat:
             try:
-                before, atpart = cmd.rsplit(" at ", 1)
-                text = before.replace("remind me to", "").replace("set reminder to", "").strip()
                 now = datetime.datetime.now()
-                if ":" in atpart and len(atpart.split()) == 1:
-                    hour, minute = map(int, atpart.split(":"))
-                    when = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
-                    if when < now:
-                        when += datetime.timedelta(days=1)
+                if " at " in cmd:
+                    before, atpart = cmd.rsplit(" at ", 1)
+                    if ":" in atpart and len(atpart.split()) == 1:
+                        hour, minute = map(int, atpart.split(":"))
+                        when = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+                        if when < now:
+                            when += datetime.timedelta(days=1)
+                    else:
+                        when = datetime.datetime.fromisoformat(atpart.strip())
                 else:
-                    when = datetime.datetime.fromisoformat(atpart.strip())
-                rid = reminder_mgr.add(text, when)
-                r = f"Reminder set for {when.isoformat()}"
+                    before = cmd
+                    when = now + datetime.timedelta(seconds=repeat)
+                text = before.replace("remind me to", "").replace("set reminder to", "").strip()
+                rid = reminder_mgr.add(text, when, repeat=repeat, owner=_current_client_id())
+                r = f"Reminder set for {when.isoformat()}" + (" (repeating)" if repeat else "")
                 speak(r)
                 return r
             except Exception as e:
@@ -1333,6 +1811,12 @@ def process_command(raw_cmd: str) -> str:
     # web search
     if cmd.startswith("search for ") or cmd.startswith("what is ") or cmd.startswith("who is "):
         q = cmd.replace("search for ", "").replace("what is ", "").replace("who is ", "")
+        # questions the study notes cover are answered locally; an explicit
+        # "search for" always goes to the web
+        hit = None if cmd.startswith("search for ") else knowledge.answer(q)
+        if hit:
+            speak(hit["text"])
+            return hit["text"]
         res = web_search_duckduckgo(q)
         speak("Here's what I found.")
         return res
@@ -1380,7 +1864,7 @@ def process_command(raw_cmd: str) -> str:
     
         # ---- Intent Detection for File Generation Before DeepSeek ----
     if any(x in cmd for x in ["ppt", "slides", "presentation"]):
-        topic = raw_cmd.replace("ppt", "").replace("slides", "").replace("presentation", "").strip()
+        topic = _command_topic(raw_cmd, ("ppt", "pptx", "slides", "presentation"))
         if topic:
             points, sources = research_query_to_texts_with_sources(topic, limit=8)
             path = _generate_pptx(f"{topic.title()} - Slides", points)
@@ -1389,7 +1873,7 @@ def process_command(raw_cmd: str) -> str:
             return {"text": f"PPT Generated for {topic}.", "action": "open_url", "url": url}
 
     if any(x in cmd for x in ["pdf", "report"]):
-        topic = raw_cmd.replace("pdf", "").replace("report", "").strip()
+        topic = _command_topic(raw_cmd, ("pdf", "report"))
         if topic:
             points, sources = research_query_to_texts_with_sources(topic, limit=12)
             path = _generate_pdf(f"{topic.title()} - Report", points, sources=sources)
@@ -1398,7 +1882,7 @@ def process_command(raw_cmd: str) -> str:
             return {"text": f"PDF Generated for {topic}.", "action": "open_url", "url": url}
 
     if any(x in cmd for x in ["doc", "notes"]):
-        topic = raw_cmd.replace("doc", "").replace("notes", "").strip()
+        topic = _command_topic(raw_cmd, ("doc", "docx", "notes"))
         if topic:
             points, sources = research_query_to_texts_with_sources(topic, limit=10)
             path = _generate_docx(f"{topic.title()} - Notes", points)
@@ -1467,6 +1951,12 @@ def process_command(raw_cmd: str) -> str:
             pass  # If chat engine fails, fallback will handle it
 
 
+    # ------------------- LOCAL KNOWLEDGE --------------------
+    hit = knowledge.answer(raw_cmd)
+    if hit:
+        speak(hit["text"])
+        return hit["text"]
+
     # ------------------- FINAL FALLBACK --------------------
     try:
         reply = duckduck_fallback(cmd)  # pass the actual query
@@ -1581,6 +2071,27 @@ def api_chats_list():
     out.sort(key=lambda x: x.get("updated_at", 0), reverse=True)
     return {"ok": True, "chats": out, "current": _current_chat_id()}
 
+@app.route("/api/chats/search", methods=["GET"])
+def api_chats_search():
+    """
+    Query: ?q=terms or "exact phrase"&limit=20&chat_id=optional
+    Returns ranked messages with highlighted snippets.
+    """
+    email = get_logged_in_email()
+    if not email:
+        return {"ok": False, "error": "not_authenticated"}, 401
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return {"ok": False, "error": "missing_query"}, 400
+    try:
+        limit = max(1, min(100, int(request.args.get("limit", 20))))
+    except Exception:
+        limit = 20
+    t0 = time.perf_counter()
+    results = _chat_search_index(email).search(q, limit=limit, chat_id=request.args.get("chat_id"))
+    took = (time.perf_counter() - t0) * 1000.0
+    return {"ok": True, "query": q, "results": results, "took_ms": round(took, 2)}
+
 @app.route("/api/chats/new", methods=["POST"]) 
 def api_chats_new():
     email = get_logged_in_email()
@@ -1619,6 +2130,36 @@ GENERATED_DIR = os.path.join(os.getcwd(), "generated")
 ensure_dir(GENERATED_DIR)
 UPLOADS_DIR = os.path.join(os.getcwd(), "uploads")
 ensure_dir(UPLOADS_DIR)
+# uploads are stored by content hash; extracted text is cached per hash
+TEXT_CACHE_DISK_MB = int(os.environ.get("DRACO_TEXT_CACHE_DISK_MB", "256"))
+TEXT_CACHE_MEM_CHARS = int(os.environ.get("DRACO_TEXT_CACHE_MEM_CHARS", str(32 * 1024 * 1024)))
+# bump TEXT_CACHE_VERSION when extractor output changes (2: DOCX/PPTX tables and notes)
+TEXT_CACHE_VERSION = "2"
+upload_store = UploadStore(UPLOADS_DIR)
+text_cache = ExtractionCache(os.path.join(UPLOADS_DIR, ".text"), TEXT_CACHE_DISK_MB * 1024 * 1024, TEXT_CACHE_MEM_CHARS,
+                             TEXT_CACHE_VERSION)
+# resumable chunked uploads for files over MAX_CONTENT_LENGTH; each chunk
+# is one request, so UPLOAD_CHUNK_MB must stay below it
+UPLOAD_MAX_MB = int(os.environ.get("DRACO_UPLOAD_MAX_MB", "200"))
+UPLOAD_CHUNK_MB = int(os.environ.get("DRACO_UPLOAD_CHUNK_MB", "8"))
+UPLOAD_SESSION_MAX_AGE_H = float(os.environ.get("DRACO_UPLOAD_SESSION_MAX_AGE_H", "24"))
+UPLOAD_PARTIAL_MAX_MB = int(os.environ.get("DRACO_UPLOAD_PARTIAL_MAX_MB", "1024"))
+PARTIAL_DIR = os.path.join(UPLOADS_DIR, ".partial")
+chunked_uploads = ChunkedUploads(PARTIAL_DIR, upload_store, UPLOAD_MAX_MB * 1024 * 1024, UPLOAD_CHUNK_MB * 1024 * 1024)
+# retention: files past their max age, or the least recently used once a
+# directory is over its size quota, are removed by a background janitor
+GENERATED_MAX_AGE_H = float(os.environ.get("DRACO_GENERATED_MAX_AGE_H", "24"))
+GENERATED_MAX_MB = int(os.environ.get("DRACO_GENERATED_MAX_MB", "512"))
+UPLOADS_MAX_AGE_H = float(os.environ.get("DRACO_UPLOADS_MAX_AGE_H", "6"))
+UPLOADS_MAX_MB = int(os.environ.get("DRACO_UPLOADS_MAX_MB", "512"))
+JANITOR_INTERVAL = float(os.environ.get("DRACO_JANITOR_INTERVAL", "300"))
+JANITOR_GRACE = float(os.environ.get("DRACO_JANITOR_GRACE", "600"))
+janitor = Janitor(interval=JANITOR_INTERVAL, grace=JANITOR_GRACE)
+janitor.add(GENERATED_DIR, GENERATED_MAX_AGE_H * 3600, GENERATED_MAX_MB * 1024 * 1024)
+janitor.add(UPLOADS_DIR, UPLOADS_MAX_AGE_H * 3600, UPLOADS_MAX_MB * 1024 * 1024)
+janitor.add(PARTIAL_DIR, UPLOAD_SESSION_MAX_AGE_H * 3600, UPLOAD_PARTIAL_MAX_MB * 1024 * 1024,
+            on_sweep=chunked_uploads.prune)
+janitor.start()
 
 def research_query_to_texts(query: str, limit: int = 6):
     text = web_search_duckduckgo(query, limit=limit)
@@ -1627,10 +2168,39 @@ def research_query_to_texts(query: str, limit: int = 6):
         return parts[:limit] if parts else [text]
     return [str(text)]
 
+# research results per query, reused within RESEARCH_TTL so a repeated
+# "generate ppt on X" skips the web search and hits the artifact cache. At
+# least RESEARCH_FETCH results are fetched and smaller limits are served
+# from them, so slides (8), notes (10) and a report (12) on one topic search
+# the web once.
+RESEARCH_TTL = float(os.environ.get("DRACO_RESEARCH_TTL", "900"))
+RESEARCH_CACHE_SIZE = 256
+RESEARCH_FETCH = 12
+_research_cache = OrderedDict()
+_research_lock = threading.Lock()
+
 def research_query_to_texts_with_sources(query: str, limit: int = 6):
     """Return (texts, sources_urls) using DDGS when available.
     Falls back to research_query_to_texts without sources.
     """
+    key = " ".join(query.lower().split())
+    now = time.time()
+    with _research_lock:
+        hit = _research_cache.get(key)
+        if hit and now - hit[0] < RESEARCH_TTL and hit[3] >= limit:
+            _research_cache.move_to_end(key)
+            return list(hit[1][:limit]), list(hit[2][:limit])
+    fetched = max(limit, RESEARCH_FETCH)
+    texts, urls = _research_with_sources(query, fetched)
+    if urls:  # only cache real search results, not fallbacks
+        with _research_lock:
+            _research_cache[key] = (now, list(texts), list(urls), fetched)
+            _research_cache.move_to_end(key)
+            while len(_research_cache) > RESEARCH_CACHE_SIZE:
+                _research_cache.popitem(last=False)
+    return texts[:limit], urls[:limit]
+
+def _research_with_sources(query: str, limit: int):
     if DDGS is None:
         return research_query_to_texts(query, limit=limit), []
     texts = []
@@ -1693,561 +2263,408 @@ def api_research():
             out["doc_error"] = err or "failed_to_write_doc"
     return out
 
+# Downloads: send_file answers If-None-Match / If-Modified-Since with 304 and
+# serves Range requests. Content-addressed artifacts (<name>_<16 hex>.<ext>)
+# never change under their name and are marked immutable. DRACO_SENDFILE
+# hands the transfer to the front proxy: "x-accel" (nginx, internal location
+# DRACO_ACCEL_PREFIX mapped to generated/) or "x-sendfile" (Apache/lighttpd).
+SENDFILE_MODE = os.environ.get("DRACO_SENDFILE", "").strip().lower()
+ACCEL_PREFIX = "/" + os.environ.get("DRACO_ACCEL_PREFIX", "/_generated/").strip("/") + "/"
+IMMUTABLE_RE = re.compile(r"_[0-9a-f]{16}\.(?:docx|pptx|pdf)$")
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+if SENDFILE_MODE == "x-sendfile":
+    app.config["USE_X_SENDFILE"] = True
+
 @app.route("/download/<path:filepath>", methods=["GET"])
 def download_generated(filepath):
     # Only allow files inside GENERATED_DIR
-    abs_path = os.path.abspath(os.path.join(os.getcwd(), filepath))
-    if not abs_path.startswith(os.path.abspath(GENERATED_DIR)):
+    root = os.path.realpath(GENERATED_DIR)
+    abs_path = os.path.realpath(os.path.join(os.getcwd(), filepath))
+    if os.path.commonpath([root, abs_path]) != root:
         return {"ok": False, "error": "forbidden"}, 403
-    try:
-        directory = os.path.dirname(abs_path)
-        filename = os.path.basename(abs_path)
-        return send_from_directory(directory, filename, as_attachment=True)
-    except Exception as e:
-        return {"ok": False, "error": str(e)}, 404
-
-def _extract_text_from_docx(path: str) -> str:
-    if not Document:
-        return ""
-    try:
-        doc = Document(path)
-        return "\n".join(p.text for p in doc.paragraphs if p.text.strip())
-    except Exception:
-        return ""
-
-def _extract_text_from_pptx(path: str) -> str:
-    if not Presentation:
-        return ""
-    try:
-        prs = Presentation(path)
-        texts = []
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if hasattr(shape, "text"):
-                    t = (shape.text or "").strip()
-                    if t:
-                        texts.append(t)
-        return "\n".join(texts)
-    except Exception:
-        return ""
-
-def _extract_text_from_pdf(path: str) -> str:
-    if not PdfReader:
-        return ""
-    try:
-        reader = PdfReader(path)
-        texts = []
-        for page in reader.pages:
-            t = page.extract_text() or ""
-            if t.strip():
-                texts.append(t.strip())
-        return "\n".join(texts)
-    except Exception:
-        return ""
+    if not os.path.isfile(abs_path):
+        return {"ok": False, "error": "not_found"}, 404
+    filename = os.path.basename(abs_path)
+    immutable = bool(IMMUTABLE_RE.search(filename))
+    janitor.touch(abs_path)
+    if SENDFILE_MODE == "x-accel":
+        # nginx serves the bytes (with its own ETag, Range and 304 handling)
+        rv = app.response_class(mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+        rv.headers["X-Accel-Redirect"] = ACCEL_PREFIX + url_quote(os.path.relpath(abs_path, root).replace("\\", "/"))
+        rv.headers["Content-Disposition"] = f"attachment; filename*=UTF-8''{url_quote(filename)}"
+    else:
+        try:
+            rv = send_file(abs_path, as_attachment=True, conditional=True, etag=True,
+                           max_age=IMMUTABLE_MAX_AGE if immutable else 0)
+        except OSError as e:
+            return {"ok": False, "error": str(e)}, 404
+    if immutable:
+        rv.headers["Cache-Control"] = f"private, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        rv.headers["Cache-Control"] = "private, no-cache"
+    return rv
+
+@app.route("/api/disk", methods=["GET"])
+def api_disk():
+    """Disk usage of generated/ and uploads/ as of the last janitor sweep,
+    plus extraction-cache counters."""
+    out = janitor.metrics()
+    out["text_cache"] = {"disk_bytes": text_cache.disk_bytes, "max_disk_bytes": text_cache.max_disk_bytes,
+                         "mem_chars": text_cache.mem_chars, "hits": text_cache.hits, "misses": text_cache.misses}
+    return out
 
 def _summarize_text(text: str, max_len: int = 1200) -> str:
-    # naive summarizer: keep first N chars and compress whitespace
-    if not text:
-        return "No content to summarize."
-    s = " ".join(text.split())
-    return s[:max_len] + ("…" if len(s) > max_len else "")
+    # extractive: the most representative sentences that fit in max_len
+    return DocumentModel(text).summary(max_len)
 
 def _split_sentences(text: str):
-    try:
-        parts = re.split(r"(?<=[.!?])\s+", text.strip())
-        return [p.strip() for p in parts if p and len(p.strip()) > 3]
-    except Exception:
-        return [text]
+    # shared abbreviation-aware tokenizer (memoized); drops fragments <= 3 chars
+    return draco_text.split_sentences(text, min_len=4)
 
 def _extract_key_points(text: str, limit: int = 8):
-    sents = _split_sentences(text)
-    # heuristic: prefer sentences containing key verbs and shorter than 200 chars
-    keys = [" is ", " are ", " was ", " were ", " include ", " consists", " uses ", " means ", " defines ", " key ", " important "]
-    scored = []
-    for s in sents:
-        score = 0
-        ln = len(s)
-        score += max(0, 200 - ln) / 50.0
-        low = " " + s.lower() + " "
-        score += sum(1 for k in keys if k in low)
-        scored.append((score, s))
-    scored.sort(key=lambda x: x[0], reverse=True)
-    pts = [s for _, s in scored[:max(1, limit)]]
-    return pts
-
-def _make_flashcards(text: str, limit: int = 8):
-    pts = _extract_key_points(text, limit=limit)
-    cards = []
-    for p in pts:
-        pl = p.strip().rstrip(".?!")
-        # Build simple Q from clause
-        q = "What is: " + (pl[:80] + ("…" if len(pl) > 80 else ""))
-        a = pl
-        cards.append({"q": q, "a": a})
-    return cards
-
-def _outline_text(text: str, max_sections: int = 6):
-    paras = [p.strip() for p in text.split("\n\n") if p.strip()]
-    outline = []
-    for i, p in enumerate(paras[:max_sections], 1):
-        title = _split_sentences(p)[0] if _split_sentences(p) else p[:60]
-        bullets = _extract_key_points(p, limit=5)
-        outline.append({"title": f"Section {i}: " + title[:60], "bullets": bullets})
-    return outline
-
-def _clean_text(text: str):
-    # normalize whitespace and remove duplicate consecutive lines
-    t = "\n".join([ln.strip() for ln in text.replace("\r\n", "\n").replace("\r", "\n").split("\n")])
-    lines = [ln for ln in t.split("\n") if ln]
-    out = []
-    last = None
-    for ln in lines:
-        if ln != last:
-            out.append(ln)
-            last = ln
-    return "\n".join(out)
-
-def _rewrite_tone(text: str, tone: str):
-    # Simple heuristic rewrites; non-LLM
-    t = text
-    tone = (tone or "").lower()
-    if tone == "simple":
-        # shorter sentences
-        sents = _split_sentences(t)
-        sents = [s.split(',')[0].strip() for s in sents]
-        return " ".join(sents)
-    if tone == "formal":
-        repl = {
-            " can't ": " cannot ",
-            " won't ": " will not ",
-            " it's ": " it is ",
-            " isn't ": " is not ",
-            " don't ": " do not ",
-            " doesn't ": " does not ",
-            " i'm ": " I am ",
-        }
-        low = " " + t
-        for k,v in repl.items():
-            low = low.replace(k, v)
-        return low.strip()
-    if tone == "academic":
-        # add connectors
-        sents = _split_sentences(t)
-        enh = []
-        for i, s in enumerate(sents):
-            prefix = "" if i == 0 else ("Furthermore, " if i % 2 else "Additionally, ")
-            enh.append(prefix + s)
-        return " ".join(enh)
-    return t
-
-def _extract_glossary(text: str, limit: int = 15):
-    # heuristic: terms before ':' or capitalized words sequences
-    terms = set()
-    for ln in text.split("\n"):
-        if ':' in ln:
-            k = ln.split(':',1)[0].strip()
-            if 2 <= len(k) <= 60:
-                terms.add(k)
-    words = re.findall(r"\b([A-Z][a-zA-Z]{2,}(?:\s+[A-Z][a-zA-Z]{2,})*)\b", text)
-    for w in words:
-        if 2 <= len(w) <= 40:
-            terms.add(w)
-    terms = list(terms)
-    terms.sort(key=lambda x: x.lower())
-    items = [f"{t}: " for t in terms[:limit]]
-    return items
+    # TextRank / TF-IDF centroid ranking, near-duplicates dropped; streams
+    # sentences through a top-k heap (draco_document.key_points_of)
+    return draco_document.key_points_of(text, limit)
+
+# Generators build a plain-data spec and hand it to draco_render, which
+# renders on a worker process so the event loop is never blocked.
+def _format_spec(kind: str, title: str, bullets, sources=None, max_sentences_per_slide: int = 4) -> dict:
+    spec = {"kind": kind, "title": str(title), "bullets": [str(b) for b in bullets], "out_dir": GENERATED_DIR}
+    if kind == "pdf":
+        spec["sources"] = [str(x) for x in sources] if sources else None
+    elif kind == "pptx":
+        spec["max_sentences_per_slide"] = max_sentences_per_slide
+    return spec
 
 def _generate_docx(title: str, bullets) -> str:
-    if not Document:
-        raise RuntimeError("python-docx not installed.")
-    doc = Document()
-    doc.core_properties.title = title
-    try:
-        doc.core_properties.author = "Draco AI"
-        doc.core_properties.subject = "Generated Document"
-    except Exception:
-        pass
-    sec = doc.sections[0]
-    try:
-        sec.top_margin, sec.bottom_margin, sec.left_margin, sec.right_margin = [sp.Inches(1)] * 4  # type: ignore
-    except Exception:
-        try:
-            from docx.shared import Inches as _In
-            sec.top_margin = _In(1)
-            sec.bottom_margin = _In(1)
-            sec.left_margin = _In(1)
-            sec.right_margin = _In(1)
-        except Exception:
-            pass
-    try:
-        header = sec.header
-        hpar = header.paragraphs[0] if header.paragraphs else header.add_paragraph("")
-        hpar.text = title
-        try:
-            from docx.enum.text import WD_ALIGN_PARAGRAPH
-            hpar.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        except Exception:
-            pass
-    except Exception:
-        pass
-    doc.add_heading(title, level=1)
-    for b in bullets:
-        try:
-            p = doc.add_paragraph(str(b), style="List Bullet")
-        except Exception:
-            p = doc.add_paragraph(str(b))
-    safe = "".join(ch for ch in title if ch.isalnum() or ch in (" ","_","-")).strip() or "document"
-    name = f"{safe[:40].replace(' ','_')}_{int(time.time())}.docx"
-    path = os.path.join(GENERATED_DIR, name)
-    doc.save(path)
-    return path
+    return draco_render.render(_format_spec("docx", title, bullets))
 
 def _generate_pptx(title: str, bullets, max_sentences_per_slide: int = 4) -> str:
-    if not Presentation:
-        raise RuntimeError("python-pptx not installed.")
-    prs = Presentation()
-
-    # palettes and fonts for a modern look
-    palettes = [
-        {"bg": RGBColor(245, 248, 255), "accent": RGBColor(62, 99, 221)},  # soft blue
-        {"bg": RGBColor(250, 247, 255), "accent": RGBColor(141, 82, 255)},  # soft violet
-        {"bg": RGBColor(246, 252, 250), "accent": RGBColor(10, 163, 127)},  # teal
-        {"bg": RGBColor(254, 248, 246), "accent": RGBColor(242, 95, 58)},   # coral
-        {"bg": RGBColor(247, 249, 252), "accent": RGBColor(45, 55, 72)},    # slate
-    ]
-    fonts = ["Montserrat", "Poppins", "Roboto", "Segoe UI", "Arial"]
-    palette = random.choice(palettes)
-    font_name = random.choice(fonts)
-
-    # helper to create a white rounded card
-    def add_card(slide, margin=Inches(0.6)):
-        left = margin
-        top = margin
-        width = prs.slide_width - margin * 2
-        height = prs.slide_height - margin * 2
-        card = slide.shapes.add_shape(MSO_SHAPE.ROUNDED_RECTANGLE, left, top, width, height)
-        card.fill.solid()
-        card.fill.fore_color.rgb = RGBColor(255, 255, 255)
-        card.line.fill.background()
-        return card
-
-    # infer a simple icon from the title/topic and add title
-    def get_topic_icon(title_text: str) -> str:
-        t = (title_text or "").lower()
-        mapping = [
-            ("ai", "🤖"), ("machine learning", "🤖"), ("data", "📊"), ("analytics", "📈"),
-            ("climate", "🌍"), ("environment", "🌿"), ("biology", "🧬"), ("health", "🩺"),
-            ("medicine", "🧪"), ("finance", "💹"), ("marketing", "📣"), ("cloud", "☁️"),
-            ("security", "🔒"), ("python", "🐍"), ("java", "☕"), ("web", "🌐"),
-            ("quantum", "⚛️"), ("robot", "🤖"), ("network", "🌐"), ("database", "🗄️"),
-        ]
-        for k, e in mapping:
-            if k in t:
-                return e
-        return "✨"
-
-    def add_title(slide, text, y=Inches(1.0)):
-        tx = slide.shapes.add_textbox(Inches(1.1), y, prs.slide_width - Inches(2.2), Inches(1.2))
-        tf = tx.text_frame
-        tf.clear()
-        p = tf.paragraphs[0]
-        p.text = f"{get_topic_icon(title)}  {text}"
-        p.alignment = PP_ALIGN.LEFT
-        run = p.runs[0]
-        run.font.name = font_name
-        run.font.size = Pt(40)
-        run.font.bold = True
-        run.font.color.rgb = palette["accent"]
-        return tx
-
-    def add_icon_bullets(slide, count, top=Inches(2.1), left=Inches(0.95)):
-        line_h = Inches(0.42)
-        size = Inches(0.12)
-        for idx in range(count):
-            y = top + Inches(0.2) + line_h * idx
-            dot = slide.shapes.add_shape(MSO_SHAPE.OVAL, left, y, size, size)
-            dot.fill.solid()
-            dot.fill.fore_color.rgb = palette["accent"]
-            dot.line.fill.background()
-        return True
+    return draco_render.render(_format_spec("pptx", title, bullets, max_sentences_per_slide=max_sentences_per_slide))
 
-    def add_bullets(slide, items, top=Inches(2.1), left=Inches(1.1), width=None):
-        if width is None:
-            width = prs.slide_width - Inches(2.2)
-        tx = slide.shapes.add_textbox(left, top, width, prs.slide_height - top - Inches(1.0))
-        tf = tx.text_frame
-        tf.clear()
-        tf.word_wrap = True
-        for idx, line in enumerate(items):
-            if idx == 0:
-                p = tf.paragraphs[0]
-            else:
-                p = tf.add_paragraph()
-            p.text = line
-            p.level = 0
-            p.font.name = font_name
-            p.font.size = Pt(22)
-        add_icon_bullets(slide, len(items), top, left - Inches(0.15))
-        return tx
-
-    # Cover slide
-    cover_layout = prs.slide_layouts[6] if len(prs.slide_layouts) > 6 else prs.slide_layouts[0]
-    cover = prs.slides.add_slide(cover_layout)
-    # background
+def _generate_pdf(title: str, paragraphs, sources=None) -> str:
+    return draco_render.render(_format_spec("pdf", title, paragraphs, sources))
+
+def _download_url(path: str) -> str:
+    return "/download/" + os.path.relpath(path, os.getcwd()).replace("\\", "/")
+
+# Fan-out: one content rendered in several formats at once, each format on
+# its own render worker. Research-backed documents fetch the topic once;
+# every format takes its usual number of snippets from that one result, so
+# its artifact matches (and reuses) the single-format command's.
+GENERATE_KINDS = ("docx", "pdf", "pptx")
+TOPIC_FORMATS = {"pptx": (" - Slides", 8), "pdf": (" - Report", 12), "docx": (" - Notes", 10)}
+FORMAT_ALIASES = {"ppt": "pptx", "pptx": "pptx", "slides": "pptx", "presentation": "pptx",
+                  "pdf": "pdf", "report": "pdf", "doc": "docx", "docx": "docx", "notes": "docx", "word": "docx"}
+
+def _generate_many(specs):
+    """({kind: download url}, {kind: error}) for specs rendered together."""
+    files, errors = {}, {}
+    for spec, (path, err) in zip(specs, draco_render.render_many(specs)):
+        if path:
+            files[spec["kind"]] = _download_url(path)
+        else:
+            errors[spec["kind"]] = err
+    return files, errors
+
+def _generate_topic(topic: str, kinds, max_sentences_per_slide: int = 4):
+    """Research `topic` once and render it as each of `kinds` concurrently.
+    Returns (files, errors, sources) as _generate_many plus the source URLs."""
+    points, sources = research_query_to_texts_with_sources(topic, limit=max(TOPIC_FORMATS[k][1] for k in kinds))
+    # each format gets the points and sources its single-format command
+    # would fetch, so both paths render the same artifact
+    specs = [_format_spec(k, topic.title() + TOPIC_FORMATS[k][0], points[:TOPIC_FORMATS[k][1]],
+                          sources[:TOPIC_FORMATS[k][1]], max_sentences_per_slide) for k in kinds]
+    files, errors = _generate_many(specs)
+    return files, errors, sources
+
+def _command_topic(raw_cmd: str, words) -> str:
+    """Topic of a free-form request ("make slides on black holes"): the
+    command without its format words and a leading verb and "on"/"about",
+    so the same topic asked for in another format researches the same query."""
+    t = re.sub(r"\b(?:%s)\b" % "|".join(map(re.escape, words)), " ", raw_cmd, flags=re.I)
+    t = re.sub(r"^\s*(?:(?:please|generate|create|make|build|give|me|a|an|the)\s+)*(?:(?:on|about|for)\s+)?", "",
+               t, flags=re.I)
+    return " ".join(t.split())
+
+def _parse_formats(values):
+    """Render kinds named in `values` (aliases, comma/space/"and"-separated),
+    in GENERATE_KINDS order; ValueError names an unknown one."""
+    kinds = set()
+    for v in values:
+        for w in re.split(r"[\s,+&/]+|\band\b", str(v).lower()):
+            if not w:
+                continue
+            if w not in FORMAT_ALIASES:
+                raise ValueError(w)
+            kinds.add(FORMAT_ALIASES[w])
+    return [k for k in GENERATE_KINDS if k in kinds]
+
+@app.route("/api/generate", methods=["POST"])
+def api_generate():
+    """
+    Render one content as several documents at once.
+    Body (JSON or form):
+      - formats: any of docx, pdf, pptx (list, or comma-separated); default all
+      - topic: researched once and shared by every format, or
+      - title + content: text (one bullet per paragraph) or a list of points
+      - sources: optional URLs listed in the PDF
+      - max_sentences_per_slide: PPTX density, 1-8 (default 4)
+    Returns all download URLs together: {"ok", "files": {kind: url},
+    "errors": {kind: message}, "sources"}.
+    """
+    data = request.get_json(silent=True) or request.form
+    raw = (data.getlist("formats") if hasattr(data, "getlist") else data.get("formats")) or list(GENERATE_KINDS)
+    try:
+        kinds = _parse_formats(raw if isinstance(raw, list) else [raw])
+    except ValueError as e:
+        return {"ok": False, "error": "unknown_format", "format": str(e), "supported": list(GENERATE_KINDS)}, 400
+    if not kinds:
+        return {"ok": False, "error": "no_formats"}, 400
+    try:
+        msps = max(1, min(8, int(data.get("max_sentences_per_slide") or 4)))
+    except (TypeError, ValueError):
+        return {"ok": False, "error": "invalid_max_sentences_per_slide"}, 400
+    topic = str(data.get("topic") or "").strip()
+    content = data.get("content")
+    if topic and not content:
+        files, errors, sources = _generate_topic(topic, kinds, msps)
+    else:
+        title = str(data.get("title") or topic or "").strip()
+        if isinstance(content, list):
+            points = [str(c) for c in content if str(c).strip()]
+        else:
+            points = DocumentModel(str(content or "")).paragraphs
+        if not title or not points:
+            return {"ok": False, "error": "need_topic_or_title_and_content"}, 400
+        sources = data.get("sources") or []
+        if isinstance(sources, str):
+            sources = [u for u in sources.split() if u]
+        files, errors = _generate_many([_format_spec(k, title, points, sources, msps) for k in kinds])
+    out = {"ok": bool(files), "files": files, "sources": sources}
+    if errors:
+        out["errors"] = errors
+    return out, (200 if files else 500)
+
+# In-memory mode for one-off outputs: the document is rendered into a buffer
+# and returned in the same response (delivery=inline) or over Socket.IO,
+# skipping the disk write, the disk read and the /download round trip.
+def _render_bytes(kind: str, title: str, bullets, sources=None):
+    """(data, filename, mimetype) for a document rendered in memory."""
+    return draco_render.render_bytes({"kind": kind, "title": str(title), "bullets": [str(b) for b in bullets],
+                                      "sources": [str(x) for x in sources] if sources else None})
+
+def _inline_delivery() -> bool:
+    return (request.values.get("delivery") or "").strip().lower() == "inline"
+
+def _send_generated(data: bytes, name: str, mimetype: str):
+    rv = send_file(io.BytesIO(data), mimetype=mimetype, as_attachment=True, download_name=name,
+                   conditional=False, etag=False)
+    rv.headers["Cache-Control"] = "no-store"
+    return rv
+
+def _doc_reply(title: str, lines, payload: dict):
+    """Attach a generated DOCX to a JSON reply as a /download link; with
+    delivery=inline the document itself is the response body instead."""
     try:
-        cover.background.fill.solid()
-        cover.background.fill.fore_color.rgb = palette["bg"]
+        if _inline_delivery():
+            return _send_generated(*_render_bytes("docx", title, lines))
+        out = _generate_docx(title, lines)
+        rel = os.path.relpath(out, os.getcwd()).replace("\\", "/")
+        payload["doc"] = f"/download/{rel}"
     except Exception:
         pass
-    add_card(cover, margin=Inches(0.7))
-    add_title(cover, title, y=Inches(1.5))
-    # subtitle
-    sub = cover.shapes.add_textbox(Inches(1.1), Inches(2.3), prs.slide_width - Inches(2.2), Inches(0.8))
-    stf = sub.text_frame
-    stf.clear()
-    sp = stf.paragraphs[0]
-    sp.text = "Generated by Draco"
-    sp.alignment = PP_ALIGN.LEFT
-    srun = sp.runs[0]
-    srun.font.name = font_name
-    srun.font.size = Pt(20)
-
-    # Content slides: split into sentences and batch into slides
-    def split_sentences(text: str):
-        raw = [s.strip() for s in re.split(r"(?<=[.!?۔؟！。]|।)\s+", text) if s.strip()]
-        abbr = {"e.g.", "i.e.", "etc.", "mr.", "mrs.", "ms.", "dr.", "prof.", "sr.", "jr.", "vs.", "no.", "fig.", "al.", "u.s.", "u.k.", "dept.",
-                "inc.", "ltd.", "co.", "est.", "approx.", "misc.", "ref.", "ed.", "pp.", "vol.", "jan.", "feb.", "mar.", "apr.", "jun.", "jul.", "aug.", "sep.", "oct.", "nov.", "dec."}
-        merged = []
-        for seg in raw:
-            if merged and (merged[-1].lower().endswith(tuple(abbr)) or len(merged[-1]) <= 2 or re.search(r"\b[A-Z]\.\s*$", merged[-1])):
-                merged[-1] = (merged[-1] + " " + seg).strip()
-            else:
-                merged.append(seg)
-        return merged
-
-    all_sentences = []
-    for b in bullets:
-        # support list of paragraphs/snippets
-        all_sentences.extend(split_sentences(str(b)))
-
-    if max_sentences_per_slide <= 0:
-        max_sentences_per_slide = 4
-
-    # batch sentences into slides
-    for i in range(0, len(all_sentences), max_sentences_per_slide):
-        chunk = all_sentences[i:i + max_sentences_per_slide]
-        slide_palette = random.choice(palettes)
-        layout = prs.slide_layouts[6] if len(prs.slide_layouts) > 6 else prs.slide_layouts[1]
-        s = prs.slides.add_slide(layout)
-        try:
-            s.background.fill.solid()
-            s.background.fill.fore_color.rgb = slide_palette["bg"]
-        except Exception:
-            pass
-        variant = random.choice(["card", "accent_bar", "two_col", "image_text"])  # more variety
-        if variant == "accent_bar":
-            bar = s.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(0), Inches(0), Inches(0.35), prs.slide_height)
-            bar.fill.solid()
-            bar.fill.fore_color.rgb = slide_palette["accent"]
-            bar.line.fill.background()
-        card = add_card(s, margin=Inches(0.6))
-        add_title(s, "Key Points", y=Inches(1.1))
-        if variant == "two_col" and len(chunk) >= 2:
-            mid = (len(chunk) + 1) // 2
-            left_items = chunk[:mid]
-            right_items = chunk[mid:]
-            col_width = (prs.slide_width - Inches(2.2) - Inches(0.6)) / 2
-            add_bullets(s, left_items, top=Inches(2.2), left=Inches(1.1), width=col_width)
-            add_bullets(s, right_items, top=Inches(2.2), left=Inches(1.1) + col_width + Inches(0.6), width=col_width)
-        elif variant == "image_text":
-            # left image placeholder, right text
-            img_left = Inches(1.1)
-            img_top = Inches(2.2)
-            img_w = Inches(3.6)
-            img_h = Inches(3.0)
-            ph = s.shapes.add_shape(MSO_SHAPE.RECTANGLE, img_left, img_top, img_w, img_h)
-            ph.fill.solid()
-            ph.fill.fore_color.rgb = RGBColor(235, 240, 255)
-            ph.line.color.rgb = slide_palette["accent"]
-            txt = s.shapes.add_textbox(img_left, img_top + img_h + Inches(0.05), img_w, Inches(0.4))
-            ttf = txt.text_frame
-            ttf.clear()
-            tp = ttf.paragraphs[0]
-            tp.text = "Illustration"
-            tp.font.name = font_name
-            tp.font.size = Pt(12)
-            # bullets on right
-            add_bullets(s, chunk, top=Inches(2.2), left=img_left + img_w + Inches(0.6))
-        else:
-            add_bullets(s, chunk, top=Inches(2.2))
+    return payload
 
-    safe = "".join(ch for ch in title if ch.isalnum() or ch in (" ","_","-")).strip() or "slides"
-    name = f"{safe[:40].replace(' ','_')}_{int(time.time())}.pptx"
-    path = os.path.join(GENERATED_DIR, name)
-    prs.save(path)
-    return path
+SUMMARY_PRESETS = {"short": 700, "medium": 1200, "detailed": 2200, "overview": 1200}
+SAMPLE_PAGES = 8
+SAMPLE_CHARS = 24000           # text read for an overview, spread over the sampled pages
 
-def _generate_pdf(title: str, paragraphs, sources=None) -> str:
-    if not FPDF:
-        raise RuntimeError("fpdf not installed.")
-
-    # Clean ALL text BEFORE pdf starts
-    title = clean_unicode(title)
-    paragraphs = [clean_unicode(str(p)) for p in paragraphs]
-    if sources:
-        sources = [clean_unicode(str(s)) for s in sources]
-
-    class PDFReport(FPDF):
-        def __init__(self, t: str):
-            super().__init__()
-            self.t = t
-            self.theme = random.choice([
-                {"accent": (10,163,127), "muted": (100,100,120)},
-                {"accent": (62,99,221), "muted": (110,110,140)},
-                {"accent": (242,95,58), "muted": (130,110,110)},
-                {"accent": (45,55,72), "muted": (110,110,120)},
-            ])
-            self.section_links = []
-
-        def header(self):
-            try:
-                self.set_font("Helvetica", "", 10)
-                self.set_text_color(100)
-                self.cell(0, 8, clean_unicode(self.t), ln=1, align="C")
-                self.set_draw_color(200)
-                self.set_line_width(0.2)
-                self.line(self.l_margin, self.get_y(), self.w - self.r_margin, self.get_y())
-                self.ln(2)
-            except:
-                pass
-
-        def footer(self):
-            try:
-                self.set_y(-12)
-                self.set_font("Helvetica", "", 9)
-                self.set_text_color(120)
-                self.cell(0, 10, f"Page {self.page_no()}", align="C")
-            except:
-                pass
-
-    pdf = PDFReport(title)
-    pdf.set_margins(18,16,18)
-    pdf.set_auto_page_break(auto=True, margin=18)
+def _summary_budget(instruction: str) -> Optional[int]:
+    """Characters a summary-style instruction may output, or None for other
+    instructions."""
+    if "summarize" in instruction or "summary" in instruction:
+        kind = (instruction.partition(":")[2].split() or [""])[0]
+        return SUMMARY_PRESETS.get(kind, 1200)
+    if "shorten" in instruction:
+        return 800
+    return None
 
+# operations that can be combined in one upload_process request; they all
+# run on one DocumentModel, so the text is parsed and ranked once
+UPLOAD_OPERATIONS = ("summarize", "keypoints", "flashcards", "outline", "glossary", "rewrite")
+MAX_UPLOAD_OPERATIONS = 12
+
+def _parse_operations(values):
+    """['summarize:short, keypoints', 'rewrite:formal'] -> normalized,
+    de-duplicated operation list. Raises ValueError on an unknown name."""
+    ops = []
+    for v in values:
+        for op in str(v).split(","):
+            op = " ".join(op.strip().lower().split())
+            if not op:
+                continue
+            name, _, arg = op.partition(":")
+            name = name.strip()
+            if name not in UPLOAD_OPERATIONS or (name == "rewrite" and arg.strip() not in draco_document.TONES):
+                raise ValueError(op)
+            op = f"{name}:{arg.strip()}" if arg.strip() else name
+            if op not in ops:
+                ops.append(op)
+    return ops
+
+def _upload_operation(model: DocumentModel, op: str, title: str, budget: Optional[int] = None):
+    """(document title, document lines, JSON fields) for one operation."""
+    name, _, arg = op.partition(":")
+    arg = arg.strip()
+    if name == "summarize":
+        summary = model.summary(budget or SUMMARY_PRESETS.get(arg.split()[0] if arg else "", 1200))
+        return f"Summary of {title}", [summary], {"summary": summary}
+    if name == "keypoints":
+        pts = model.key_points(10)
+        preview = "\n".join(f"- {p}" for p in pts)
+        return f"Key Points - {title}", pts, {"text": preview[:3000], "points": pts}
+    if name == "flashcards":
+        cards = model.flashcards(10)
+        preview = "\n\n".join([f"Q: {c['q']}\nA: {c['a']}" for c in cards])
+        # Save as Q/A lines in DOCX
+        lines = []
+        for c in cards:
+            lines.append(f"Q: {c['q']}")
+            lines.append(f"A: {c['a']}")
+            lines.append("")
+        return f"Flashcards - {title}", lines, {"text": preview[:3000], "cards": cards}
+    if name == "outline":
+        flat = []
+        for sec in model.outline(max_sections=6):
+            flat.append(sec["title"])
+            flat.extend(["  - " + b for b in sec["bullets"]])
+            flat.append("")
+        return f"Outline - {title}", flat, {"text": "\n".join(flat)[:3000]}
+    if name == "glossary":
+        items = model.glossary(limit=20)
+        return f"Glossary - {title}", items, {"text": "\n".join(items)[:3000]}
+    if name == "rewrite":
+        rewritten = model.rewrite(arg)
+        return f"Rewritten ({arg or 'neutral'}) - {title}", [rewritten], {"text": rewritten[:3000]}
+    raise ValueError(op)
+
+def _parse_page_selection(instruction: str):
+    """'pages 3-7', 'page 2' or 'slides 1-4' -> 0-based indices, else None."""
+    m = re.search(r"\b(?:pages?|slides?)\s+(\d+)(?:\s*-\s*(\d+))?", instruction)
+    if not m:
+        return None
+    a = int(m.group(1))
+    b = int(m.group(2) or a)
+    a, b = max(1, min(a, b)), max(a, b)
+    return list(range(a - 1, min(b, a - 1 + 1000)))
+
+def _read_upload_text(up, pages=None, sample: bool = False) -> str:
+    """Text for an upload. Whole-document requests go through the
+    extraction cache; with `pages` only those pages are parsed, and with
+    `sample` (summarize:overview) only SAMPLE_PAGES pages spread evenly
+    across a PDF/PPTX, each contributing up to an equal share of
+    SAMPLE_CHARS. Partial text is never cached. Other summaries read the
+    whole document: their preset only limits the output length."""
+    if pages is None and sample:
+        total = draco_extract.page_count(up.source, up.ext)
+        if total:
+            pages = draco_extract.sample_pages(total, SAMPLE_PAGES)
+            return draco_extract.take_sample(draco_extract.iter_blocks(up.source, pages, up.ext),
+                                             SAMPLE_CHARS, len(pages))
+    if pages is None:
+        return _extract_upload_text(up)
+    return "\n".join(draco_extract.iter_blocks(up.source, pages, up.ext))
+
+
+# ------------- Resumable chunked uploads -------------
+# POST /api/uploads {name, size, sha256?} opens a session; PUT
+# /api/uploads/<id>?offset=N sends raw chunk bytes (X-Chunk-SHA256: hex
+# digest to verify); GET /api/uploads/<id> reports the offset to resume
+# from; POST /api/uploads/<id>/finalize stores the file. The id is then
+# accepted by upload_process (upload_id), compare (uploadA/uploadB) and
+# merge (upload_ids).
+UPLOAD_TYPES = (".docx", ".pptx", ".pdf")
+
+def _upload_error(e: UploadError):
+    return dict({"ok": False, "error": e.code}, **e.info), e.status
+
+def _upload_status(meta: dict):
+    return {"ok": True, "upload_id": meta["id"], "name": meta["name"], "size": meta["size"],
+            "offset": meta["offset"], "state": meta["state"]}
+
+@app.route("/api/uploads", methods=["POST"])
+def api_uploads_init():
+    data = request.get_json(silent=True) or request.form
+    name = secure_filename(str(data.get("name") or "")) or "upload"
+    if os.path.splitext(name)[1].lower() not in UPLOAD_TYPES:
+        return {"ok": False, "error": "unsupported_type"}, 400
     try:
-        pdf.set_title(title)
-        pdf.set_author("Draco AI")
-        pdf.set_subject("Generated Report")
-    except:
-        pass
-
-    # COVER PAGE
-    pdf.add_page()
-    pdf.set_text_color(0)
-    pdf.set_font("Helvetica", "B", 18)
-    pdf.cell(0, 10, txt=title, ln=True, align="C")
-
-    pdf.ln(2)
+        size = int(data.get("size") or 0)
+        sha = str(data["sha256"]).lower() if data.get("sha256") else None
+        meta = chunked_uploads.init(name, size, sha)
+    except ValueError:
+        return {"ok": False, "error": "invalid_size"}, 400
+    except UploadError as e:
+        return _upload_error(e)
+    out = _upload_status(meta)
+    out["chunk_size"] = chunked_uploads.max_chunk
+    return out, 201
+
+@app.route("/api/uploads/<uid>", methods=["GET"])
+def api_uploads_status(uid):
     try:
-        now_str = datetime.datetime.now().strftime("%b %d, %Y")
-        pdf.set_font("Helvetica", "", 11)
-        pdf.set_text_color(80)
-        pdf.cell(0, 8, txt=now_str, ln=True, align="C")
-    except:
-        pass
-
-    pdf.ln(6)
+        return _upload_status(chunked_uploads.get(uid))
+    except UploadError as e:
+        return _upload_error(e)
 
-    # Prepare sections
-    section_link_ids = []
-    for idx, _ in enumerate(paragraphs, 1):
-        try:
-            link_id = pdf.add_link()
-        except:
-            link_id = None
-        section_link_ids.append((f"Section {idx}", link_id))
-
-    # CONTENT SECTIONS
-    pdf.set_font("Helvetica", "", 12)
-    for i, p in enumerate(paragraphs, 1):
-        pdf.set_font("Helvetica", "B", 14)
-        r,g,b = pdf.theme["accent"]
-        pdf.set_text_color(r,g,b)
-        header = f"Section {i}"
-
-        y_before = pdf.get_y()
-        pdf.cell(0, 8, txt=header, ln=True)
-
-        try:
-            if section_link_ids[i-1][1] is not None:
-                pdf.set_link(section_link_ids[i-1][1], y=y_before, page=pdf.page_no())
-        except:
-            pass
-
-        pdf.set_text_color(0)
-        pdf.set_font("Helvetica", "", 12)
-        pdf.multi_cell(0, 7, txt=p)
-        pdf.ln(2)
-
-    # TABLE OF CONTENTS (auto fallback)
+@app.route("/api/uploads/<uid>", methods=["PUT"])
+def api_uploads_chunk(uid):
     try:
-        pdf.set_auto_page_break(auto=True, margin=18)
-        saved_page = pdf.page
-        pdf.page = 1
-        pdf._newpage("P")
-        pdf.page = 2
-        pdf.set_font("Helvetica", "B", 16)
-        pdf.cell(0, 10, "Table of Contents", ln=True)
-        pdf.ln(4)
-        pdf.set_font("Helvetica", "", 12)
-
-        for label, link_id in section_link_ids:
-            pdf.set_text_color(0,0,180)
-            try:
-                pdf.write(8, label, link=link_id)
-            except:
-                pdf.set_text_color(0)
-                pdf.cell(0, 8, label, ln=True)
-            pdf.ln(2)
-
-        pdf.page = saved_page + 1
-    except:
-        # fallback TOC at end
-        pdf.add_page()
-        pdf.set_font("Helvetica", "B", 16)
-        pdf.cell(0, 10, "Table of Contents", ln=True)
-        pdf.ln(4)
-        pdf.set_font("Helvetica", "", 12)
-        for label,_ in section_link_ids:
-            pdf.cell(0, 8, label, ln=True)
-            pdf.ln(2)
-
-    # SOURCES
-    if sources:
-        pdf.ln(4)
-        pdf.set_text_color(0)
-        pdf.set_font("Helvetica", "B", 14)
-        pdf.cell(0, 10, "Sources", ln=True)
-
-        pdf.set_font("Helvetica", "", 11)
-        for u in sources:
-            u = clean_unicode(u)
-            try:
-                pdf.set_text_color(0,0,180)
-                pdf.write(6, u, link=u)
-                pdf.ln(6)
-            except:
-                pdf.set_text_color(0)
-                pdf.multi_cell(0,6,txt=u)
-
-        pdf.set_text_color(0)
+        offset = int(request.args.get("offset", request.headers.get("Upload-Offset", "-1")))
+    except ValueError:
+        offset = -1
+    if offset < 0:
+        return {"ok": False, "error": "missing_offset"}, 400
+    try:
+        part = chunked_uploads.part_path(uid)
+        with janitor.in_use([part, chunked_uploads.meta_path(uid)]):
+            meta = chunked_uploads.write(uid, offset, request.stream, request.content_length,
+                                         request.headers.get("X-Chunk-SHA256"))
+    except UploadError as e:
+        return _upload_error(e)
+    return _upload_status(meta)
+
+@app.route("/api/uploads/<uid>/finalize", methods=["POST"])
+def api_uploads_finalize(uid):
+    try:
+        up = chunked_uploads.finalize(uid)
+    except UploadError as e:
+        return _upload_error(e)
+    janitor.touch(up.path)
+    out = _upload_status(chunked_uploads.get(uid))
+    out["sha256"] = up.sha256
+    return out
 
-    safe = "".join(ch for ch in title if ch.isalnum() or ch in (" ","_","-")).strip() or "report"
-    name = f"{safe[:40].replace(' ','_')}_{int(time.time())}.pdf"
-    path = os.path.join(GENERATED_DIR, name)
-    pdf.output(path)
+def _request_upload(file_field: str, id_value: Optional[str], default_name: str):
+    """(StoredUpload, reclaim) from a multipart file or a finalized chunked
+    upload id; None when neither was sent. A chunked upload is kept after
+    processing (reclaim False) so it can serve further requests."""
+    uid = (id_value or "").strip()
+    if uid:
+        meta = chunked_uploads.get(uid)
+        if meta["state"] != "done":
+            raise UploadError("incomplete_upload", 409, offset=meta["offset"], size=meta["size"])
+        up = chunked_uploads.stored(meta)
+        if not os.path.exists(up.path) and not text_cache.contains(up.sha256):
+            raise UploadError("upload_expired", 410)
+        return up, False
+    f = request.files.get(file_field) if file_field else None
+    if not f:
+        return None
+    name = secure_filename(f.filename or default_name) or default_name
+    return upload_store.save(f, name, UPLOAD_MEMORY_KB * 1024), True
 
-    return path
 
 @app.route("/api/upload_process", methods=["POST"])
 def api_upload_process():
@@ -2255,66 +2672,83 @@ def api_upload_process():
     Accept a user file and optional instruction.
     Returns processed summary or a modified file for download.
     Form fields:
-      - file: uploaded file
+      - file: uploaded file (or upload_id: a finalized chunked upload)
       - instruction: optional text instructions (e.g., "summarize", "shorten", etc.)
+        "pages 3-7" / "slides 1-4" restricts processing to those pages;
+        "summarize:overview" summarizes SAMPLE_PAGES pages spread across a
+        PDF/PPTX instead of parsing all of it (a DOCX is read whole)
+      - operations: several of summarize[:preset], keypoints, flashcards,
+        outline, glossary, rewrite:<simple|formal|academic>, comma-separated
+        or repeated; all run on one parse and return one combined document
+      - delivery: "inline" returns the generated DOCX as the response body
+        instead of JSON with a /download link
     """
-    if "file" not in request.files:
-        return {"ok": False, "error": "no_file"}, 400
-    f = request.files["file"]
-    if f.filename == "":
-        return {"ok": False, "error": "empty_filename"}, 400
+    uid = request.form.get("upload_id")
+    f = request.files.get("file")
+    if not uid:
+        if f is None:
+            return {"ok": False, "error": "no_file"}, 400
+        if f.filename == "":
+            return {"ok": False, "error": "empty_filename"}, 400
     instruction = (request.form.get("instruction") or "").strip().lower()
-    filename = secure_filename(f.filename)
-    path = os.path.join(UPLOADS_DIR, filename)
-    f.save(path)
-
-    ext = os.path.splitext(filename)[1].lower()
-    text = ""
-    if ext == ".docx":
-        text = _extract_text_from_docx(path)
-    elif ext == ".pptx":
-        text = _extract_text_from_pptx(path)
-    elif ext == ".pdf":
-        text = _extract_text_from_pdf(path)
-    else:
+    try:
+        operations = _parse_operations(request.form.getlist("operations"))
+    except ValueError as e:
+        return {"ok": False, "error": "unknown_operation", "operation": str(e),
+                "supported": list(UPLOAD_OPERATIONS)}, 400
+    if len(operations) > MAX_UPLOAD_OPERATIONS:
+        return {"ok": False, "error": "too_many_operations", "max_operations": MAX_UPLOAD_OPERATIONS}, 400
+    if not uid and os.path.splitext(secure_filename(f.filename) or "")[1].lower() not in UPLOAD_TYPES:
         return {"ok": False, "error": "unsupported_type"}, 400
+    try:
+        up, reclaim = _request_upload("file", uid, "upload")
+    except UploadError as e:
+        return _upload_error(e)
+    filename = up.name
+    # output length of summarize/shorten; only an overview reads a sample
+    # of pages instead of the whole document
+    budget = None if operations else _summary_budget(instruction)
+    if operations:
+        sample = all(op == "summarize:overview" for op in operations)
+    else:
+        sample = budget is not None and "overview" in instruction
+    # the raw upload is only needed until its text is read; whole-document
+    # text stays in text_cache for repeat uploads
+    with janitor.in_use([up.path] if up.path else [], reclaim=reclaim):
+        text = _read_upload_text(up, _parse_page_selection(instruction), sample=sample)
 
     if not text:
         return {"ok": False, "error": "no_text_found"}, 400
 
     # simple processing
     title = os.path.splitext(filename)[0]
+    model = DocumentModel(text)
+    if operations:
+        lines = []
+        results = {}
+        for op in operations:
+            heading, body, fields = _upload_operation(model, op, title)
+            lines.append(f"=== {heading} ===")
+            lines += body
+            lines.append("")
+            results[op] = fields
+        preview = "\n".join(lines)
+        return _doc_reply(f"Processed - {title}", lines,
+                          {"ok": True, "operations": operations, "results": results, "text": preview[:3000]})
+
+    def single(op, budget=None):
+        heading, body, fields = _upload_operation(model, op, title, budget)
+        fields["ok"] = True
+        fields.pop("points", None)
+        return _doc_reply(heading, body, fields)
+
     if "summarize" in instruction or "summary" in instruction:
-        # Support presets like summarize:short|medium|detailed
-        max_len = 1200
-        try:
-            if ":" in instruction:
-                _, kind = instruction.split(":", 1)
-                kind = (kind or "").strip().lower()
-                if kind == "short":
-                    max_len = 700
-                elif kind == "medium":
-                    max_len = 1200
-                elif kind == "detailed":
-                    max_len = 2200
-        except Exception:
-            pass
-        summary = _summarize_text(text, max_len=max_len)
-        try:
-            out = _generate_docx(f"Summary of {title}", [summary])
-            rel = os.path.relpath(out, os.getcwd()).replace("\\", "/")
-            return {"ok": True, "summary": summary, "doc": f"/download/{rel}"}
-        except Exception:
-            return {"ok": True, "summary": summary}
+        # Support presets like summarize:short|medium|detailed|overview
+        return single("summarize", budget)
 
     if "shorten" in instruction:
-        short = _summarize_text(text, max_len=800)
-        try:
-            out = _generate_docx(f"Shortened - {title}", [short])
-            rel = os.path.relpath(out, os.getcwd()).replace("\\", "/")
-            return {"ok": True, "text": short, "doc": f"/download/{rel}"}
-        except Exception:
-            return {"ok": True, "text": short}
+        short = model.summary(budget)
+        return _doc_reply(f"Shortened - {title}", [short], {"ok": True, "text": short})
 
     if "lengthen" in instruction:
         augmented = text
@@ -2324,239 +2758,212 @@ def api_upload_process():
                 augmented = (text + "\n\n" + extra)[:8000]
         except Exception:
             pass
-        try:
-            out = _generate_docx(f"Extended - {title}", [augmented])
-            rel = os.path.relpath(out, os.getcwd()).replace("\\", "/")
-            return {"ok": True, "text": augmented[:3000], "doc": f"/download/{rel}"}
-        except Exception:
-            return {"ok": True, "text": augmented[:3000]}
+        return _doc_reply(f"Extended - {title}", [augmented], {"ok": True, "text": augmented[:3000]})
 
     if "search" in instruction:
         try:
             results = web_search_duckduckgo(title, limit=5)
         except Exception as e:
             results = f"Search error: {e}"
-        try:
-            out = _generate_docx(f"Search Results - {title}", [str(results)])
-            rel = os.path.relpath(out, os.getcwd()).replace("\\", "/")
-            return {"ok": True, "text": str(results)[:3000], "doc": f"/download/{rel}"}
-        except Exception:
-            return {"ok": True, "text": str(results)[:3000]}
+        return _doc_reply(f"Search Results - {title}", [str(results)], {"ok": True, "text": str(results)[:3000]})
 
     if "keypoints" in instruction or "key points" in instruction:
-        pts = _extract_key_points(text, limit=10)
-        preview = "\n".join(f"- {p}" for p in pts)
-        try:
-            out = _generate_docx(f"Key Points - {title}", pts)
-            rel = os.path.relpath(out, os.getcwd()).replace("\\", "/")
-            return {"ok": True, "text": preview[:3000], "doc": f"/download/{rel}"}
-        except Exception:
-            return {"ok": True, "text": preview[:3000]}
+        return single("keypoints")
 
     if "flashcards" in instruction or "cards" in instruction:
-        cards = _make_flashcards(text, limit=10)
-        preview = "\n\n".join([f"Q: {c['q']}\nA: {c['a']}" for c in cards])
-        try:
-            # Save as Q/A lines in DOCX
-            lines = []
-            for c in cards:
-                lines.append(f"Q: {c['q']}")
-                lines.append(f"A: {c['a']}")
-                lines.append("")
-            out = _generate_docx(f"Flashcards - {title}", lines)
-            rel = os.path.relpath(out, os.getcwd()).replace("\\", "/")
-            return {"ok": True, "text": preview[:3000], "cards": cards, "doc": f"/download/{rel}"}
-        except Exception:
-            return {"ok": True, "text": preview[:3000], "cards": cards}
+        return single("flashcards")
 
     if "outline" in instruction:
-        outline = _outline_text(text, max_sections=6)
-        flat = []
-        for sec in outline:
-            flat.append(sec["title"]) 
-            flat.extend(["  - " + b for b in sec["bullets"]])
-            flat.append("")
-        preview = "\n".join(flat)
-        try:
-            out = _generate_docx(f"Outline - {title}", flat)
-            rel = os.path.relpath(out, os.getcwd()).replace("\\", "/")
-            return {"ok": True, "text": preview[:3000], "doc": f"/download/{rel}"}
-        except Exception:
-            return {"ok": True, "text": preview[:3000]}
+        return single("outline")
 
     if "clean" in instruction or "cleanup" in instruction:
-        cleaned = _clean_text(text)
-        try:
-            out = _generate_docx(f"Cleaned - {title}", [cleaned])
-            rel = os.path.relpath(out, os.getcwd()).replace("\\", "/")
-            return {"ok": True, "text": cleaned[:3000], "doc": f"/download/{rel}"}
-        except Exception:
-            return {"ok": True, "text": cleaned[:3000]}
+        cleaned = model.clean()
+        return _doc_reply(f"Cleaned - {title}", [cleaned], {"ok": True, "text": cleaned[:3000]})
 
     if instruction.startswith("rewrite:") or instruction.startswith("tone:"):
-        try:
-            tone = instruction.split(":",1)[1].strip().lower()
-        except Exception:
-            tone = ""
-        rewritten = _rewrite_tone(text, tone)
-        try:
-            out = _generate_docx(f"Rewritten ({tone or 'neutral'}) - {title}", [rewritten])
-            rel = os.path.relpath(out, os.getcwd()).replace("\\", "/")
-            return {"ok": True, "text": rewritten[:3000], "doc": f"/download/{rel}"}
-        except Exception:
-            return {"ok": True, "text": rewritten[:3000]}
+        return single("rewrite:" + instruction.split(":", 1)[1].strip())
 
     if "glossary" in instruction:
-        items = _extract_glossary(text, limit=20)
-        preview = "\n".join(items)
-        try:
-            out = _generate_docx(f"Glossary - {title}", items)
-            rel = os.path.relpath(out, os.getcwd()).replace("\\", "/")
-            return {"ok": True, "text": preview[:3000], "doc": f"/download/{rel}"}
-        except Exception:
-            return {"ok": True, "text": preview[:3000]}
+        return single("glossary")
 
     # default: return content and optionally repackage to docx
-    try:
-        out = _generate_docx(f"Processed - {title}", [text[:6000]])
-        rel = os.path.relpath(out, os.getcwd()).replace("\\", "/")
-        return {"ok": True, "text": text[:3000], "doc": f"/download/{rel}"}
-    except Exception:
-        return {"ok": True, "text": text[:3000]}
+    return _doc_reply(f"Processed - {title}", [text[:6000]], {"ok": True, "text": text[:3000]})
 
 
 
-def _extract_text_auto(path: str) -> str:
-    ext = os.path.splitext(path)[1].lower()
-    if ext == ".docx":
-        return _extract_text_from_docx(path)
-    if ext == ".pptx":
-        return _extract_text_from_pptx(path)
-    if ext == ".pdf":
-        return _extract_text_from_pdf(path)
+def _extract_text_auto(path, ext: Optional[str] = None) -> str:
+    # path, or the file's bytes with its extension; DOCX/PPTX parse in one
+    # pool worker, PDF page-parallel (see draco_extract)
+    ext = (ext or os.path.splitext(path)[1]).lower()
+    if ext in (".docx", ".pptx", ".pdf"):
+        return draco_extract.extract_file_text(path, ext=ext)
     return ""
 
-def _sentences_set(text: str):
-    sents = _split_sentences(text)
-    # normalize
-    return set([" ".join(s.lower().split()) for s in sents if s.strip()])
+def _extract_upload_text(up) -> str:
+    # repeat uploads of the same bytes skip parsing entirely
+    return text_cache.get_or_extract(up.sha256, lambda: _extract_text_auto(up.source, up.ext))
 
 @app.route("/api/compare", methods=["POST"])
 def api_compare():
     try:
-        fA = request.files.get("fileA")
-        fB = request.files.get("fileB")
         out_fmt = (request.form.get("format") or "both").lower()
-        if not fA or not fB:
+        # fileA/fileB, or uploadA/uploadB naming finalized chunked uploads
+        try:
+            a = _request_upload("fileA", request.form.get("uploadA"), "A")
+            b = _request_upload("fileB", request.form.get("uploadB"), "B")
+        except UploadError as e:
+            return _upload_error(e)
+        if not a or not b:
             return {"ok": False, "error": "need_two_files"}, 400
-        nameA = secure_filename(fA.filename or "A")
-        nameB = secure_filename(fB.filename or "B")
-        pA = os.path.join(UPLOADS_DIR, f"cmp_A_{int(time.time())}_{nameA}")
-        pB = os.path.join(UPLOADS_DIR, f"cmp_B_{int(time.time())}_{nameB}")
-        fA.save(pA); fB.save(pB)
-        tA = _extract_text_auto(pA)
-        tB = _extract_text_auto(pB)
+        upA, upB = a[0], b[0]
+        nameA, nameB = upA.name, upB.name
+        with janitor.in_use([up.path for up, r in (a, b) if r and up.path], reclaim=True), \
+                janitor.in_use([up.path for up, r in (a, b) if not r]):
+            tA = _extract_upload_text(upA)
+            tB = _extract_upload_text(upB)
         if not tA and not tB:
             return {"ok": False, "error": "no_text_in_files"}, 400
-        setA = _sentences_set(tA)
-        setB = _sentences_set(tB)
-        onlyA = [s for s in setA - setB][:20]
-        onlyB = [s for s in setB - setA][:20]
-        common = [s for s in setA & setB][:20]
+        sA = _split_sentences(tA)
+        sB = _split_sentences(tB)
+        sim = draco_similarity.compare(sA, sB)
+        pairs = sim["pairs"]
+        common = [sA[p["a"]] for p in pairs if p["kind"] == "identical"]
+        # most different first, in both the document and the JSON pairs
+        changed = sorted((p for p in pairs if p["kind"] != "identical"), key=lambda p: (p["score"], p["a"]))
+        near = sum(1 for p in changed if p["kind"] == "near_duplicate")
         # Build preview and lines
         title = f"Compare - {os.path.splitext(nameA)[0]} vs {os.path.splitext(nameB)[0]}"
         lines = []
         lines.append("Summary:")
-        lines.append(f"Only in {nameA}: {len(onlyA)}")
-        lines.append(f"Only in {nameB}: {len(onlyB)}")
+        lines.append(f"Similarity: {round(sim['similarity'] * 100)}% (shared vocabulary {round(sim['jaccard'] * 100)}%)")
+        lines.append(f"Only in {nameA}: {len(sim['only_a'])}")
+        lines.append(f"Only in {nameB}: {len(sim['only_b'])}")
         lines.append(f"Common: {len(common)}")
+        lines.append(f"Near-duplicates: {near}")
+        lines.append(f"Reworded: {len(changed) - near}")
         lines.append("")
         lines.append(f"Only in {nameA}:")
-        lines += [" - " + s for s in onlyA]
+        lines += [" - " + sA[i] for i in sim["only_a"][:20]]
         lines.append("")
         lines.append(f"Only in {nameB}:")
-        lines += [" - " + s for s in onlyB]
+        lines += [" - " + sB[j] for j in sim["only_b"][:20]]
+        lines.append("")
+        lines.append("Changed (most different first):")
+        for p in changed[:20]:
+            lines.append(f" - [{round(p['score'] * 100)}%] {sA[p['a']]}")
+            lines.append(f"   -> {sB[p['b']]}")
         lines.append("")
         lines.append("Common Points:")
-        lines += [" - " + s for s in common]
+        lines += [" - " + s for s in common[:20]]
         lines.append("")
         # unified notes as key points from both texts
-        uni = _extract_key_points((tA + "\n\n" + tB)[:16000], limit=12)
+        uni = _extract_key_points(tA + "\n\n" + tB, limit=12)
         lines.append("Unified Notes:")
         lines += [" - " + s for s in uni]
         preview = "\n".join(lines[:60])
-        out = {"ok": True, "preview": preview[:3000]}
-        if out_fmt in ("docx", "both"):
-            try:
-                doc_path = _generate_docx(title, lines)
-                rel = os.path.relpath(doc_path, os.getcwd()).replace("\\", "/")
-                out["doc"] = f"/download/{rel}"
-            except Exception:
-                pass
-        if out_fmt in ("pdf", "both"):
-            try:
-                pdf_path = _generate_pdf(title, lines)
-                rel = os.path.relpath(pdf_path, os.getcwd()).replace("\\", "/")
-                out["pdf"] = f"/download/{rel}"
-            except Exception:
-                pass
+        if _inline_delivery():
+            return _send_generated(*_render_bytes("pdf" if out_fmt == "pdf" else "docx", title, lines))
+        out = {"ok": True, "preview": preview[:3000], "similarity": {
+            "score": sim["similarity"], "jaccard": sim["jaccard"],
+            "sentences_a": sim["sentences_a"], "sentences_b": sim["sentences_b"],
+            "identical": len(common), "near_duplicate": near, "similar": len(changed) - near,
+            "only_a": len(sim["only_a"]), "only_b": len(sim["only_b"]),
+        }, "pairs": [{"a": sA[p["a"]], "b": sB[p["b"]], "score": p["score"], "kind": p["kind"]}
+                     for p in changed[:50]]}
+        # "both" renders the DOCX and the PDF concurrently
+        kinds = [k for k in ("docx", "pdf") if out_fmt in (k, "both")]
+        files, _ = _generate_many([_format_spec(k, title, lines) for k in kinds])
+        out.update({("doc" if k == "docx" else k): url for k, url in files.items()})
         return out
     except Exception as e:
         return {"ok": False, "error": str(e)}, 500
 
+# merge: files are extracted and key-pointed concurrently; their points
+# are then deduplicated, in upload order, against one shared index
+MERGE_MAX_FILES = int(os.environ.get("DRACO_MERGE_MAX_FILES", "32"))
+MERGE_WORKERS = int(os.environ.get("DRACO_MERGE_WORKERS", "4"))
+MERGE_POINTS = 12
+_merge_executor = ThreadPoolExecutor(max_workers=MERGE_WORKERS, thread_name_prefix="merge")
+
+def _merge_file_points(up):
+    # parsing and ranking both run in draco_extract pool workers, so the
+    # files of one merge proceed in parallel instead of queueing on the GIL
+    txt = _extract_upload_text(up)
+    if not txt:
+        return []
+    pool = draco_extract.get_pool()
+    if pool is None:
+        return draco_document.key_points_of(txt, MERGE_POINTS)
+    return pool.run(draco_document.key_points_of, (txt, MERGE_POINTS), draco_extract.EXTRACT_TIMEOUT)
+
 @app.route("/api/merge", methods=["POST"])
 def api_merge():
     try:
         out_fmt = (request.form.get("format") or "both").lower()
-        # accept files as file1,file2,... or multiple under 'files'
+        # accept files as file1,file2,... or multiple under 'files', plus
+        # finalized chunked uploads as upload_ids (repeated or comma-separated)
         files = []
         if "files" in request.files:
             files = request.files.getlist("files")
         else:
-            for i in range(1, 8):
+            for i in range(1, MERGE_MAX_FILES + 1):
                 f = request.files.get(f"file{i}")
                 if f: files.append(f)
-        if len(files) < 2:
+        ids = [u.strip() for v in request.form.getlist("upload_ids") for u in v.split(",") if u.strip()]
+        if len(files) + len(ids) < 2:
             return {"ok": False, "error": "need_two_or_more_files"}, 400
+        if len(files) + len(ids) > MERGE_MAX_FILES:
+            return {"ok": False, "error": "too_many_files", "max_files": MERGE_MAX_FILES}, 400
+        ups = []
+        kept = []
+        try:
+            for uid in ids:
+                up, _ = _request_upload(None, uid, "upload")
+                ups.append(up)
+                kept.append(up.path)
+        except UploadError as e:
+            return _upload_error(e)
+        for idx, f in enumerate(files, len(ids) + 1):
+            nm = secure_filename(f.filename or f"file{idx}") or f"file{idx}"
+            ups.append(upload_store.save(f, nm, UPLOAD_MEMORY_KB * 1024))
+        refs = [up.name for up in ups]
         merged_lines = []
-        refs = []
-        for idx, f in enumerate(files, 1):
-            nm = secure_filename(f.filename or f"file{idx}")
-            p = os.path.join(UPLOADS_DIR, f"merge_{int(time.time())}_{idx}_{nm}")
-            f.save(p)
-            txt = _extract_text_auto(p)
-            refs.append(nm)
-            if txt:
-                merged_lines.append(f"=== {nm} ===")
-                pts = _extract_key_points(txt, limit=12)
-                merged_lines += [" - " + s for s in pts]
-                merged_lines.append("")
+        seen = draco_similarity.SentenceIndex()
+        dropped = 0
+        with janitor.in_use([up.path for up in ups if up.path and up.path not in kept], reclaim=True), \
+                janitor.in_use(kept):
+            futures = [_merge_executor.submit(_merge_file_points, up) for up in ups]
+            # consume in upload order so earlier files keep shared points
+            for nm, fut in zip(refs, futures):
+                try:
+                    pts = fut.result()
+                except Exception as e:
+                    print("Merge extraction failed:", nm, e)
+                    pts = []
+                fresh = []
+                for s in pts:
+                    if seen.find(s) is None:
+                        seen.add(s)
+                        fresh.append(s)
+                    else:
+                        dropped += 1
+                if fresh:
+                    merged_lines.append(f"=== {nm} ===")
+                    merged_lines += [" - " + s for s in fresh]
+                    merged_lines.append("")
         if not merged_lines:
             return {"ok": False, "error": "no_text_in_files"}, 400
-        # De-dup lines
-        seen = set(); uniq = []
-        for ln in merged_lines:
-            norm = " ".join(ln.lower().split())
-            if norm in seen: continue
-            seen.add(norm); uniq.append(ln)
-        uniq.append(""); uniq.append("References:")
+        uniq = merged_lines
+        uniq.append("References:")
         uniq += [" - " + r for r in refs]
         title = "Merged Report"
-        out = {"ok": True, "preview": "\n".join(uniq[:80])[:3000]}
-        if out_fmt in ("docx", "both"):
-            try:
-                doc_path = _generate_docx(title, uniq)
-                rel = os.path.relpath(doc_path, os.getcwd()).replace("\\", "/")
-                out["doc"] = f"/download/{rel}"
-            except Exception:
-                pass
-        if out_fmt in ("pdf", "both"):
-            try:
-                pdf_path = _generate_pdf(title, uniq)
-                rel = os.path.relpath(pdf_path, os.getcwd()).replace("\\", "/")
-                out["pdf"] = f"/download/{rel}"
-            except Exception:
-                pass
+        if _inline_delivery():
+            return _send_generated(*_render_bytes("pdf" if out_fmt == "pdf" else "docx", title, uniq))
+        out = {"ok": True, "preview": "\n".join(uniq[:80])[:3000], "files": len(refs), "duplicates_removed": dropped}
+        # "both" renders the DOCX and the PDF concurrently
+        kinds = [k for k in ("docx", "pdf") if out_fmt in (k, "both")]
+        files, _ = _generate_many([_format_spec(k, title, uniq) for k in kinds])
+        out.update({("doc" if k == "docx" else k): url for k, url in files.items()})
         return out
     except Exception as e:
         return {"ok": False, "error": str(e)}, 500
@@ -2570,7 +2977,11 @@ def api_command():
     data = request.json or {}
     text = str(data.get("text", ""))
     try:
-        resp = process_command(text)
+        _command_ctx.client_id = _valid_client_id(data.get("client_id"))
+        try:
+            resp = process_command(text)
+        finally:
+            _command_ctx.client_id = None
         # persist bot reply in user's chat history
         user_email = get_logged_in_email()
         if user_email and not isinstance(resp, dict):
@@ -2587,20 +2998,56 @@ def api_command():
         return {"ok": False, "error": str(e)}, 500
 
 @socketio.on("connect")
-def ws_connect():
+def ws_connect(auth=None):
     print("Client connected")
+    client_id = _valid_client_id((auth or {}).get("client_id") if isinstance(auth, dict) else None)
+    if client_id:
+        reminder_outbox.connect(client_id, request.sid)
     emit("draco_response", {"text": "Draco is online and ready!"})
 
 @socketio.on("disconnect")
 def ws_disconnect():
     print("Client disconnected")
+    reminder_outbox.disconnect(request.sid)
+
+@socketio.on("reminder_ack")
+def ws_reminder_ack(payload):
+    client_id = reminder_outbox.client_of.get(request.sid)
+    if client_id and isinstance(payload, dict):
+        reminder_outbox.ack(client_id, str(payload.get("id", "")))
+
+@socketio.on("generate_file")
+def ws_generate_file(payload):
+    """{kind: pptx|pdf|docx, topic} -> a "file" event carrying the rendered
+    document bytes, so no file is stored and no download request follows."""
+    payload = payload or {}
+    kind = str(payload.get("kind") or "").lower()
+    topic = str(payload.get("topic") or "").strip()
+    if kind not in ("pptx", "pdf", "docx") or not topic:
+        emit("draco_response", {"text": "Please provide a file type and a topic."})
+        return
+    try:
+        limit = {"pptx": 8, "pdf": 12, "docx": 10}[kind]
+        points, sources = research_query_to_texts_with_sources(topic, limit=limit)
+        title = f"{topic.title()} - " + {"pptx": "Slides", "pdf": "Report", "docx": "Notes"}[kind]
+        data, name, mimetype = _render_bytes(kind, title, points, sources=sources if kind == "pdf" else None)
+        labeled = [{"label": urlparse(u).netloc or u, "url": u} for u in sources]
+        emit("file", {"name": name, "mimetype": mimetype, "data": data,
+                      "text": f"Generated {kind.upper()} for {topic}.", "sources_labeled": labeled})
+    except Exception as e:
+        print("Error handling generate_file:", e)
+        emit("draco_response", {"text": f"Could not generate {kind.upper()}: {e}"})
 
 @socketio.on("user_command")
 def ws_user_command(payload):
     try:
         text = payload.get("text", "")
         print("Received command from web:", text)
-        response = process_command(text)
+        _command_ctx.client_id = reminder_outbox.client_of.get(request.sid)
+        try:
+            response = process_command(text)
+        finally:
+            _command_ctx.client_id = None
         # send a structured response (allow dict for web actions)
         if isinstance(response, dict):
             emit("draco_response", response)